@@ -1,7 +1,28 @@
-import ply.lex as lex
-import ply.yacc as yacc
+import operator
+import os
+import sys
+import threading
+
+# cache_ply.py e scanner.py são comuns às duas partes e ficam em comum/
+_COMUM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'comum')
+if _COMUM not in sys.path:
+    sys.path.append(_COMUM)
+
+from cache_ply import cached_lexer, cached_parser
+from scanner import Scanner
+
+np = None  # numpy é opcional e só é importado por eval_batch
 
 # Lexer
+# div, mod e exp são palavras reservadas, reconhecidas por t_ID (como em
+# sintatica.py e no scanner): uma regra t_DIVINT = r'div' nunca seria
+# tentada, porque o PLY testa as regras em função (t_ID) antes das em texto
+reserved = {
+    'div': 'DIVINT',
+    'mod': 'MOD',
+    'exp': 'EXP',
+}
+
 tokens = (
     'PLUS', 'MINUS', 'TIMES', 'DIV', 'DIVINT', 'MOD', 'EXP',
     'LT', 'GT', 'LE', 'GE', 'EQ', 'NE',
@@ -13,9 +34,6 @@ t_PLUS   = r'\+'
 t_MINUS  = r'-'
 t_TIMES  = r'\*'
 t_DIV    = r'/'
-t_DIVINT = r'div'
-t_MOD    = r'mod'
-t_EXP    = r'exp'
 
 t_LT = r'<'
 t_GT = r'>'
@@ -36,13 +54,16 @@ def t_NUMBER(t):
 
 def t_ID(t):
     r'[a-zA-Z_][a-zA-Z0-9_]*'
+    t.type = reserved.get(t.value, 'ID')
     return t
 
 def t_error(t):
     print(f"Caractere inválido: {t.value[0]}")
     t.lexer.skip(1)
 
-lexer = lex.lex()
+lexer = cached_lexer(sys.modules[__name__])
+# alternativa mais rápida ao lexer do PLY: parser.parse(s, lexer=scanner)
+scanner = Scanner.from_module(sys.modules[__name__])
 
 # Parser
 def p_expression_number(p):
@@ -76,49 +97,262 @@ def p_expression_defun(p):
 def p_error(p):
     print("Erro de sintaxe!")
 
-parser = yacc.yacc()
+parser = cached_parser(sys.modules[__name__])
 
 # Interpretador
+# ambiente usado por eval_expr e evaluate quando não recebem um
 env = {}
 
-def eval_expr(expr):
+def eval_expr(expr, env=None):
+    if env is None:
+        env = globals()['env']
+    # pilha explícita em vez de recursão, para expressões aninhadas a
+    # qualquer profundidade: 'pending' tem nós a visitar e operadores (str)
+    # a aplicar sobre os dois últimos valores; o operando esquerdo é
+    # avaliado antes do direito
+    pending = [expr]
+    values = []
+    while pending:
+        item = pending.pop()
+        if item.__class__ is str:
+            rval = values.pop()
+            lval = values.pop()
+            values.append(BINOPS[item](lval, rval))
+            continue
+
+        etype = item[0]
+
+        if etype == 'number':
+            values.append(item[1])
+
+        elif etype == 'id':
+            values.append(env.get(item[1], f"Erro: variável {item[1]} não definida"))
+
+        elif etype == 'binop' and item[1] in BINOPS:
+            pending.append(item[1])
+            pending.append(item[3])
+            pending.append(item[2])
+
+        else:
+            values.append(None)
+
+    return values[0]
+
+
+# lexer e parser de cada thread: o parser do PLY guarda a pilha do parse no
+# próprio objeto e o scanner guarda a entrada, então não são compartilhados
+_thread = threading.local()
+
+def parse(source):
+    """AST de source (None se houver erro de sintaxe); segura entre threads."""
+    if not hasattr(_thread, 'parser'):
+        _thread.scanner = Scanner.from_module(sys.modules[__name__])
+        _thread.parser = cached_parser(sys.modules[__name__])
+    return _thread.parser.parse(source, lexer=_thread.scanner)
+
+def evaluate(source, env=None):
+    """
+    Avalia a expressão source no ambiente env (None: o env do módulo). Com
+    um env por chamada, pode ser usada de várias threads ao mesmo tempo.
+    """
+    expr = parse(source)
+    if expr is None:
+        return None
+    return eval_expr(expr, env)
+
+
+# Compilação para closures
+#
+# compile_expr percorre a AST uma única vez e devolve uma função f(env):
+# o tipo de cada nó e o operador já estão resolvidos, então avaliar a mesma
+# expressão com ambientes diferentes não repete o despacho por nó. Cada
+# nível de aninhamento é uma chamada de closure, então expressões mais
+# fundas que CLOSURE_MAX_DEPTH são avaliadas por eval_expr (pilha
+# explícita) em vez de virar closures.
+BINOPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    'div': operator.floordiv,
+    'mod': operator.mod,
+    'exp': operator.pow,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '=': operator.eq,
+    '!=': operator.ne,
+}
+
+CLOSURE_MAX_DEPTH = 200
+
+def expr_depth(expr):
+    """Profundidade da AST expr (1 para uma folha), sem recursão."""
+    deepest = 0
+    pending = [(expr, 1)]
+    while pending:
+        item, depth = pending.pop()
+        if depth > deepest:
+            deepest = depth
+        if item[0] == 'binop':
+            pending.append((item[2], depth + 1))
+            pending.append((item[3], depth + 1))
+    return deepest
+
+def compile_expr(expr):
+    if expr_depth(expr) > CLOSURE_MAX_DEPTH:
+        return lambda env: eval_expr(expr, env)
+    return _compile_closure(expr)
+
+def _compile_closure(expr):
     etype = expr[0]
 
     if etype == 'number':
-        return expr[1]
+        value = expr[1]
+        return lambda env: value
 
     elif etype == 'id':
-        return env.get(expr[1], f"Erro: variável {expr[1]} não definida")
+        name = expr[1]
+        missing = f"Erro: variável {name} não definida"
+        return lambda env: env.get(name, missing)
 
     elif etype == 'binop':
-        op, left, right = expr[1], expr[2], expr[3]
-        lval, rval = eval_expr(left), eval_expr(right)
-
-        if op == '+': return lval + rval
-        elif op == '-': return lval - rval
-        elif op == '*': return lval * rval
-        elif op == '/': return lval / rval
-        elif op == 'div': return lval // rval
-        elif op == 'mod': return lval % rval
-        elif op == 'exp': return lval ** rval
-        elif op == '<': return lval < rval
-        elif op == '>': return lval > rval
-        elif op == '<=': return lval <= rval
-        elif op == '>=': return lval >= rval
-        elif op == '=': return lval == rval
-        elif op == '!=': return lval != rval
-
-    return None
+        fn = BINOPS.get(expr[1])
+        if fn is None:
+            return lambda env: None
+        left, right = _compile_closure(expr[2]), _compile_closure(expr[3])
+        # operandos literais entram direto na closure, sem chamada extra
+        if expr[3][0] == 'number':
+            b = expr[3][1]
+            if expr[2][0] == 'number':
+                a = expr[2][1]
+                return lambda env: fn(a, b)
+            return lambda env: fn(left(env), b)
+        if expr[2][0] == 'number':
+            a = expr[2][1]
+            return lambda env: fn(a, right(env))
+        return lambda env: fn(left(env), right(env))
 
+    return lambda env: None
 
-# Testes
-while True:
+
+def eval_compiled(expr, envs):
+    """Compila expr uma vez e avalia com cada ambiente de envs."""
+    code = compile_expr(expr)
+    return [code(e) for e in envs]
+
+
+# Avaliação vetorizada
+#
+# eval_batch avalia a mesma expressão sobre colunas de valores (um array
+# NumPy por variável) com uma operação de array por nó da AST. Diferenças
+# em relação a eval_expr: inteiros são de 64 bits (sem precisão arbitrária),
+# divisão por zero gera inf/nan em vez de exceção e variável ausente é erro.
+def _vector_pow(a, b):
+    # NumPy não eleva inteiro a expoente inteiro negativo; Python dá float
+    if np.issubdtype(np.result_type(b), np.integer) and np.any(np.asarray(b) < 0):
+        return np.power(np.asarray(a, dtype=float), b)
+    return np.power(a, b)
+
+VECTOR_BINOPS = {}
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+        VECTOR_BINOPS.update({
+            '+': np.add,
+            '-': np.subtract,
+            '*': np.multiply,
+            '/': np.true_divide,
+            'div': np.floor_divide,
+            'mod': np.mod,
+            'exp': _vector_pow,
+            '<': np.less,
+            '>': np.greater,
+            '<=': np.less_equal,
+            '>=': np.greater_equal,
+            '=': np.equal,
+            '!=': np.not_equal,
+        })
+
+_VECTOR_COMPARISONS = {'<', '>', '<=', '>=', '=', '!='}
+
+def _as_number(value):
+    # em Python True + True == 2; em NumPy soma de booleanos é "ou"
+    if getattr(value, 'dtype', None) == np.bool_:
+        return value.astype(np.int64)
+    return value
+
+def _eval_vector(expr, columns):
+    # mesma pilha explícita de eval_expr: nós a visitar e operadores (str)
+    pending = [expr]
+    values = []
+    while pending:
+        item = pending.pop()
+        if item.__class__ is str:
+            right = values.pop()
+            left = values.pop()
+            if item not in _VECTOR_COMPARISONS:
+                left, right = _as_number(left), _as_number(right)
+            values.append(VECTOR_BINOPS[item](left, right))
+            continue
+
+        etype = item[0]
+
+        if etype == 'number':
+            values.append(item[1])
+
+        elif etype == 'id':
+            if item[1] not in columns:
+                raise NameError(f"Erro: variável {item[1]} não definida")
+            values.append(columns[item[1]])
+
+        elif etype == 'binop':
+            if item[1] not in VECTOR_BINOPS:
+                raise ValueError(f"Operador não suportado em lote: {item[1]}")
+            pending.append(item[1])
+            pending.append(item[3])
+            pending.append(item[2])
+
+        else:
+            raise ValueError(f"Expressão não suportada em lote: {etype}")
+
+    return values[0]
+
+
+def eval_batch(expr, columns):
+    """
+    Avalia expr para todas as linhas de columns (nome -> array NumPy, todos
+    do mesmo tamanho) e devolve um array com um resultado por linha.
+    """
     try:
-        s = input("lisp> ")
-    except EOFError:
-        break
-    if not s:
-        continue
-    result = parser.parse(s)
-    print("AST:", result)
-    print("Resultado:", eval_expr(result))
+        _load_numpy()
+    except ImportError:
+        raise ImportError("eval_batch requer o pacote numpy") from None
+    columns = {name: np.asarray(col) for name, col in columns.items()}
+    sizes = {len(col) for col in columns.values()}
+    if len(sizes) > 1:
+        raise ValueError("Todas as colunas devem ter o mesmo tamanho")
+    n = sizes.pop() if sizes else 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = _eval_vector(expr, columns)
+    return np.broadcast_to(result, (n,)).copy()
+
+
+# Testes
+if __name__ == "__main__":
+    while True:
+        try:
+            s = input("lisp> ")
+        except EOFError:
+            break
+        if not s:
+            continue
+        result = parser.parse(s, lexer=lexer)
+        if result is None:
+            continue
+        print("AST:", result)
+        print("Resultado:", compile_expr(result)(env))
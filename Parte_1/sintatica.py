@@ -1,5 +1,13 @@
-import ply.lex as lex
-import ply.yacc as yacc
+import os
+import sys
+
+# cache_ply.py e scanner.py são comuns às duas partes e ficam em comum/
+_COMUM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'comum')
+if _COMUM not in sys.path:
+    sys.path.append(_COMUM)
+
+from cache_ply import cached_lexer, cached_parser
+from scanner import Scanner
 
 reserved = {
     'defun': 'DEFUN',
@@ -10,12 +18,16 @@ reserved = {
     'cons': 'CONS',
     'eq': 'EQSYM',
     'nil': 'NIL',
-    't': 'T'
+    't': 'T',
+    # reconhecidos por t_ID: o PLY testa t_ID antes das regras em texto
+    'div': 'DIVINT',
+    'mod': 'MOD',
+    'exp': 'EXP',
 }
 
 tokens = [
     'LPAREN', 'RPAREN', 'QUOTE', 'NUMBER', 'ID',
-    'PLUS', 'MINUS', 'TIMES', 'DIV', 'DIVINT', 'MOD', 'EXP',
+    'PLUS', 'MINUS', 'TIMES', 'DIV',
     'LT', 'GT', 'LE', 'GE', 'EQUAL', 'NEQ'
 ] + list(reserved.values())
 
@@ -28,9 +40,6 @@ t_PLUS = r'\+'
 t_MINUS = r'-'
 t_TIMES = r'\*'
 t_DIV = r'/'
-t_DIVINT = r'div'
-t_MOD = r'mod'
-t_EXP = r'exp'
 
 t_LT = r'<'
 t_GT = r'>'
@@ -67,11 +76,14 @@ def p_program(p):
     '''program : expr_list'''
     p[0] = ("program", p[1])
 
+# As listas são recursivas à esquerda: cada item é acrescentado à lista já
+# montada (tempo linear) e a pilha do parser não cresce com o tamanho dela.
 def p_expr_list(p):
-    '''expr_list : expr expr_list
+    '''expr_list : expr_list expr
                  | expr'''
     if len(p) == 3:
-        p[0] = [p[1]] + p[2]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = [p[1]]
 
@@ -113,13 +125,11 @@ def p_list_defun(p):
     p[0] = ("defun", p[3], p[5], p[7])
 
 def p_arg_list(p):
-    '''arg_list : ID arg_list
-                | ID
+    '''arg_list : arg_list ID
                 | empty'''
     if len(p) == 3:
-        p[0] = [p[1]] + p[2]
-    elif len(p) == 2 and p[1] is not None:
-        p[0] = [p[1]]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = []
 
@@ -143,7 +153,10 @@ def p_error(p):
     else:
         print("Erro de sintaxe no fim do arquivo")
 
-parser = yacc.yacc()
+lexer = cached_lexer(sys.modules[__name__])
+# alternativa mais rápida ao lexer do PLY: parser.parse(data, lexer=scanner)
+scanner = Scanner.from_module(sys.modules[__name__])
+parser = cached_parser(sys.modules[__name__])
 
 #teste
 if __name__ == "__main__":
@@ -155,5 +168,5 @@ if __name__ == "__main__":
         0)
     """
 
-    result = parser.parse(data)
+    result = parser.parse(data, lexer=lexer)
     print("AST resultante:\n", result)
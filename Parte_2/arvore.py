@@ -0,0 +1,268 @@
+# arvore.py
+# Nós da AST de codigo_intermediario.py.
+#
+# Cada nó é um objeto com __slots__ (sem dict por instância) e imutável:
+#   Number(value)                      número (real só na avaliação parcial)
+#   Symbol(token, lexeme)              identificador ou palavra reservada
+#   Nil()                              nil e ()
+#   If(cond, then, else_)              (if c a b); sem b, else_ é Nil
+#   Defun(name, params, body)          params é uma tupla de nomes
+#   Application(operator, args)        args é uma tupla de nós
+# Os nós são criados por uma NodeTable, que faz hash-consing: pedir de novo
+# um nó com os mesmos campos (e os mesmos filhos, que já passaram pela
+# tabela) devolve o mesmo objeto. Assim cada 'x' ou '+' do programa existe
+# uma vez só, subárvores repetidas são compartilhadas e, entre nós da mesma
+# tabela, igualdade estrutural é 'is'. A AST passa a ser um DAG; quem a
+# percorre visita uma subárvore compartilhada uma vez por ocorrência.
+#
+# O campo type (igual ao "type" do formato antigo em dicts) continua
+# existindo, e as_dict devolve o nó nesse formato, que é o usado no JSON.
+#
+# _walk é a travessia com pilha explícita usada pelas passadas sobre a AST
+# (análise semântica, geração de código, avaliação parcial). dumps_json
+# escreve o JSON também com pilha explícita: o json.dumps da biblioteca
+# recursa e não passa de alguns milhares de níveis.
+import json
+
+
+class Node:
+    __slots__ = ()
+    type = None
+
+    def as_dict(self):
+        """O nó como dict, com os filhos ainda como nós (serve de default= do json)."""
+        d = {"type": self.type}
+        for name in self.__slots__:
+            d["else" if name == "else_" else name] = getattr(self, name)
+        return d
+
+    def __repr__(self):
+        fields = ", ".join(repr(getattr(self, name)) for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+
+class Number(Node):
+    __slots__ = ('value',)
+    type = "number"
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Symbol(Node):
+    __slots__ = ('token', 'lexeme')
+    type = "symbol"
+
+    def __init__(self, token, lexeme):
+        self.token = token
+        self.lexeme = lexeme
+
+
+class Nil(Node):
+    __slots__ = ()
+    type = "nil"
+
+
+class If(Node):
+    __slots__ = ('cond', 'then', 'else_')
+    type = "if"
+
+    def __init__(self, cond, then, else_):
+        self.cond = cond
+        self.then = then
+        self.else_ = else_
+
+
+class Defun(Node):
+    __slots__ = ('name', 'params', 'body')
+    type = "defun"
+
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = params
+        self.body = body
+
+
+class Application(Node):
+    __slots__ = ('operator', 'args')
+    type = "application"
+
+    def __init__(self, operator, args):
+        self.operator = operator
+        self.args = args
+
+
+NIL = Nil()
+
+
+class NodeTable:
+    """
+    Fábrica de nós com hash-consing. As chaves guardam os filhos pela
+    identidade (os nós não definem __eq__ nem __hash__), então consultar a
+    tabela custa o mesmo em qualquer profundidade. A tabela só é necessária
+    enquanto a AST é montada: clear() libera as chaves e os nós já criados
+    continuam válidos (só deixam de ser reaproveitados).
+    """
+
+    def __init__(self):
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def clear(self):
+        self._nodes.clear()
+
+    def number(self, value):
+        # a classe entra na chave: 2 e 2.0 são literais diferentes; o texto
+        # entra nos reais porque 0.0 == -0.0, e (+ -0.0 0) vale 0.0
+        if value.__class__ is float:
+            key = (Number, float, repr(value))
+        else:
+            key = (Number, value.__class__, value)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Number(value)
+        return node
+
+    def symbol(self, token, lexeme):
+        key = (Symbol, token, lexeme)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Symbol(token, lexeme)
+        return node
+
+    def nil(self):
+        return NIL
+
+    def if_(self, cond, then, else_):
+        key = (If, cond, then, else_)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = If(cond, then, else_)
+        return node
+
+    def defun(self, name, params, body):
+        params = tuple(params)
+        key = (Defun, name, params, body)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Defun(name, params, body)
+        return node
+
+    def application(self, operator, args):
+        args = tuple(args)
+        key = (Application, operator, args)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = Application(operator, args)
+        return node
+
+
+_COMPOUND = object()  # nó com filhos: precisa de um passo na pilha
+
+def _walk(leaf, step, node, env, *extra):
+    """
+    Percorre a AST com uma pilha explícita em vez de recursão Python, para
+    que aninhamentos profundos não estourem o limite de recursão.
+    leaf(nó, env, *extra) resolve direto os nós sem filhos (ou devolve
+    _COMPOUND); step(nó, env, *extra) é um gerador para os demais: cada
+    filho a visitar é gerado como (nó, env) e o resultado do filho volta
+    pelo send. A memória usada é proporcional à profundidade.
+    """
+    value = leaf(node, env, *extra)
+    if value is not _COMPOUND:
+        return value
+    send = step(node, env, *extra).send
+    stack = []
+    value = None
+    while True:
+        try:
+            child, child_env = send(value)
+        except StopIteration as stop:
+            if not stack:
+                return stop.value
+            send = stack.pop()
+            value = stop.value
+        else:
+            value = leaf(child, child_env, *extra)
+            if value is _COMPOUND:
+                stack.append(send)
+                send = step(child, child_env, *extra).send
+                value = None
+
+
+def called_names(node):
+    """Nomes (ID) usados como operador de aplicações dentro de node."""
+    names = set()
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if not isinstance(n, Node):
+            continue
+        ntype = n.type
+        if ntype == "application":
+            op = n.operator
+            if op.type == "symbol" and op.token == 'ID':
+                names.add(op.lexeme)
+            stack.append(op)
+            stack.extend(n.args)
+        elif ntype == "defun":
+            stack.append(n.body)
+        elif ntype == "if":
+            stack.extend((n.cond, n.then, n.else_))
+    return names
+
+
+def as_json(obj):
+    """default= para json.dumps de ASTs: os nós viram dicts no formato antigo."""
+    if isinstance(obj, Node):
+        return obj.as_dict()
+    raise TypeError(f"Objeto não serializável em JSON: {obj!r}")
+
+
+_scalar_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def dumps_json(obj):
+    """
+    O mesmo texto de json.dumps(obj, ensure_ascii=False, default=as_json),
+    para dicts, listas e tuplas com nós em qualquer profundidade.
+    """
+    parts = []
+    # itens da pilha: (True, texto pronto) ou (False, valor a escrever)
+    stack = [(False, obj)]
+    while stack:
+        ready, item = stack.pop()
+        if ready:
+            parts.append(item)
+            continue
+        if isinstance(item, Node):
+            item = item.as_dict()
+        if isinstance(item, dict):
+            if not item:
+                parts.append('{}')
+                continue
+            pieces = []
+            sep = '{'
+            for key, value in item.items():
+                pieces.append((True, sep + _scalar_json(key) + ': '))
+                pieces.append((False, value))
+                sep = ', '
+            pieces.append((True, '}'))
+        elif isinstance(item, (list, tuple)):
+            if not item:
+                parts.append('[]')
+                continue
+            pieces = []
+            sep = '['
+            for value in item:
+                pieces.append((True, sep))
+                pieces.append((False, value))
+                sep = ', '
+            pieces.append((True, ']'))
+        else:
+            parts.append(_scalar_json(item))
+            continue
+        stack.extend(reversed(pieces))
+    return ''.join(parts)
@@ -0,0 +1,381 @@
+# avaliacao_parcial.py
+# Avaliação parcial da AST de codigo_intermediario.py, entre a análise
+# semântica e a geração de código.
+#
+# Cada form de nível superior é percorrido sabendo, de cada nó, o valor que
+# ele terá na execução quando esse valor não depende da entrada: números,
+# nil e t, operações sobre eles e chamadas de funções do usuário com
+# argumentos constantes. Um nó de valor conhecido que tem literal no IR
+# (números, nil e t) é trocado pelo literal, um 'if' de condição conhecida
+# vira o ramo tomado e o resto é o código residual, com os filhos já
+# simplificados. As funções que o código residual não chama mais são
+# removidas do programa.
+#
+# Uma lista só fica como literal quando já está escrita como cons de
+# literais. Calculada de outro jeito (por uma chamada, car, cdr...), ela
+# pode ter pares compartilhados, que eq compara por identidade: um literal
+# montado de novo daria pares diferentes. Essa expressão fica residual,
+# mesmo com o valor conhecido (que continua servindo aos nós de cima).
+#
+# Os valores são os de maquina_virtual.py (nil é None, t é True, listas são
+# pares (car, cdr)) e as operações são as dela, então o valor calculado é o
+# mesmo da execução. Uma operação que falharia na execução (divisão por
+# zero, car de um número, primitiva desconhecida...) não é avaliada: fica
+# no código residual e o erro continua acontecendo na execução.
+#
+# A linguagem não tem atribuição nem E/S, então toda função do usuário é
+# pura e uma chamada com argumentos constantes pode ser executada aqui, por
+# um interpretador da AST com combustível: cada nó visitado gasta uma
+# unidade e, acabando o combustível da chamada (fuel) ou o da compilação
+# (total_fuel), ela fica residual. Assim uma função que não termina não
+# trava a compilação: continua não terminando, mas só na execução.
+import operator
+
+from arvore import NIL, Node, NodeTable, _COMPOUND, _walk, called_names
+from ir import constant_value
+from maquina_virtual import PRIMITIVES, VMError, lisp_eq, _car, _cdr
+
+_UNKNOWN = object()  # valor que só a execução conhece
+
+# operações da máquina virtual pelo token do operador (IDs de cons, car,
+# cdr e eq são traduzidos como em builtin_names de codigo_intermediario.py)
+_ARITH = {
+    'PLUS': operator.add, 'MINUS': operator.sub,
+    'TIMES': operator.mul, 'DIV': operator.truediv,
+}
+_COMPARE = {
+    'LT': operator.lt, 'GT': operator.gt, 'LE': operator.le,
+    'GE': operator.ge, 'EQ_OP': operator.eq, 'NE': operator.ne,
+}
+_PRIMS = {'CONS': lambda a, b: (a, b), 'CAR': _car, 'CDR': _cdr, 'EQ': lisp_eq}
+_BUILTIN_NAMES = {'cons': 'CONS', 'car': 'CAR', 'cdr': 'CDR', 'eq': 'EQ'}
+
+# inteiros com mais bits que isso não são calculados na compilação
+_MAX_BITS = 4096
+# números com mais dígitos que isso não viram literais (como em otimizacao.py)
+_MAX_LITERAL_DIGITS = 32
+
+
+class _Stuck(Exception):
+    """O valor não pode ser calculado em tempo de compilação."""
+
+
+def _truthy(value):
+    # o critério de JUMPIF
+    return value is not None and value is not False
+
+
+def _numbers(values):
+    for v in values:
+        if not isinstance(v, (int, float)):
+            raise _Stuck
+
+
+def apply_builtin(op, values):
+    """
+    Valor de um operador que não é função do usuário (nó símbolo op)
+    aplicado a values, como a máquina virtual calcularia. Levanta _Stuck se
+    a execução daria erro ou se o resultado seria grande demais.
+    """
+    # o False de uma comparação só decide ifs: constant_folding troca o de
+    # uma comparação constante por nil, que em qualquer outra operação se
+    # comporta diferente, então a operação fica para a execução
+    for v in values:
+        if v is False:
+            raise _Stuck
+    token = op.token
+    if token == 'ID':
+        token = _BUILTIN_NAMES.get(op.lexeme)
+    fn = _COMPARE.get(token) or _PRIMS.get(token)
+    if fn is None:
+        fn = _ARITH.get(token)
+        if fn is None:
+            fn = PRIMITIVES.get(op.lexeme)
+            if fn is None:
+                raise _Stuck
+            if op.lexeme == 'exp' and len(values) == 2:
+                base, power = values
+                if isinstance(base, int) and isinstance(power, int) and power > 0 \
+                        and base.bit_length() * power > _MAX_BITS:
+                    raise _Stuck
+        # strings também somam e multiplicam em Python; ficam para a execução
+        _numbers(values)
+    try:
+        value = fn(*values)
+    except (ArithmeticError, ValueError, TypeError, VMError):
+        raise _Stuck from None
+    if isinstance(value, int) and value.bit_length() > _MAX_BITS:
+        raise _Stuck
+    return value
+
+
+# INTERPRETADOR: valor de uma expressão com todas as variáveis conhecidas
+def _eval_leaf(node, env, pe):
+    pe.fuel_left -= 1
+    if pe.fuel_left < 0:
+        raise _Stuck
+    if not isinstance(node, Node):
+        raise _Stuck
+    ntype = node.type
+    if ntype == "number":
+        return node.value
+    if ntype == "nil":
+        return None
+    if ntype == "symbol":
+        if node.token == 'ID' and node.lexeme in env:
+            return env[node.lexeme]
+        is_const, value = constant_value(node.lexeme)
+        if not is_const:
+            raise _Stuck
+        return value
+    return _COMPOUND
+
+
+def _eval_step(node, env, pe):
+    ntype = node.type
+    if ntype == "if":
+        cond = (yield node.cond, env)
+        return (yield node.then if _truthy(cond) else node.else_, env)
+    if ntype != "application":
+        raise _Stuck
+    values = []
+    for a in node.args:
+        values.append((yield a, env))
+    op = node.operator
+    if op.token == 'ID' and op.lexeme in pe.functions:
+        # o corpo é visitado pela mesma pilha: recursão não vira recursão Python
+        info = pe.functions[op.lexeme]
+        return (yield info["body"], dict(zip(info["params"], values)))
+    return apply_builtin(op, values)
+
+
+# RESÍDUO: (nó residual, valor ou _UNKNOWN) de cada nó
+def _residual_leaf(node, env, pe):
+    if not isinstance(node, Node):
+        return node, _UNKNOWN
+    ntype = node.type
+    if ntype == "number":
+        return node, node.value
+    if ntype == "nil":
+        return node, None
+    if ntype == "symbol":
+        if node.token == 'ID':
+            return node, _UNKNOWN
+        is_const, value = constant_value(node.lexeme)
+        return node, (value if is_const else _UNKNOWN)
+    return _COMPOUND
+
+
+def _residual_step(node, env, pe):
+    ntype = node.type
+    if ntype == "application":
+        return _residual_application(node, env, pe)
+    if ntype == "if":
+        return _residual_if(node, env, pe)
+    return _residual_defun(node, env, pe)
+
+
+def _residual_defun(node, env, pe):
+    # os parâmetros só são conhecidos na execução
+    body, _ = (yield node.body, dict.fromkeys(node.params, _UNKNOWN))
+    if body is not node.body:
+        node = pe.nodes.defun(node.name, node.params, body)
+    return node, _UNKNOWN
+
+
+def _residual_if(node, env, pe):
+    cond, value = (yield node.cond, env)
+    if value is not _UNKNOWN:
+        pe.branches_pruned += 1
+        return (yield node.then if _truthy(value) else node.else_, env)
+    then, _ = (yield node.then, env)
+    else_, _ = (yield node.else_, env)
+    if cond is not node.cond or then is not node.then or else_ is not node.else_:
+        node = pe.nodes.if_(cond, then, else_)
+    return node, _UNKNOWN
+
+
+def _residual_application(node, env, pe):
+    args = []
+    known = True
+    values = []
+    for a in node.args:
+        arg, value = (yield a, env)
+        args.append(arg)
+        values.append(value)
+        known = known and value is not _UNKNOWN
+    if any(arg is not a for arg, a in zip(args, node.args)):
+        node = pe.nodes.application(node.operator, args)
+    if not known or not isinstance(node.operator, Node):
+        return node, _UNKNOWN
+    value = pe.apply(node.operator, values)
+    if value is _UNKNOWN:
+        return node, _UNKNOWN
+    literal = pe.literal(value, node)
+    return (node if literal is None else literal), value
+
+
+class PartialEvaluator:
+    """
+    Avaliador parcial de programas sem erros semânticos. fuel limita os nós
+    visitados por chamada de função do usuário e total_fuel os da
+    compilação inteira. Os contadores são os da última execução de run.
+    """
+
+    def __init__(self, fuel=10_000, total_fuel=1_000_000):
+        self.fuel = fuel
+        self.total_fuel = total_fuel
+        self.functions = {}
+        self.nodes = None
+        self._reset()
+
+    def _reset(self):
+        self.fuel_left = 0
+        self.fuel_used = 0
+        self.folded = 0             # operações pré-definidas calculadas
+        self.calls_folded = 0       # chamadas de funções do usuário calculadas
+        self.calls_residual = 0     # chamadas tentadas que ficaram residuais
+        self.out_of_fuel = 0        # ... por falta de combustível
+        self.branches_pruned = 0
+        self.removed = []           # funções que deixaram de ser chamadas
+        self._memo = {}
+        self._lists = {}            # id -> nó dos cons de literais já vistos
+
+    def run(self, ast, functions, nodes=None):
+        """
+        Forms residuais do programa ast; functions é a tabela de funções
+        dele (SymbolTable.functions) e nodes a NodeTable que cria os nós
+        novos (os nós que não mudam são os mesmos de ast).
+        """
+        self._reset()
+        self.functions = functions
+        self.nodes = nodes if nodes is not None else NodeTable()
+        forms = [_walk(_residual_leaf, _residual_step, node, {}, self)[0] for node in ast]
+
+        # funções alcançáveis a partir das expressões de nível superior
+        defuns = {f.name: f for f in forms if isinstance(f, Node) and f.type == "defun"}
+        pending = []
+        for f in forms:
+            if not (isinstance(f, Node) and f.type == "defun"):
+                pending.extend(called_names(f))
+        live = set()
+        while pending:
+            name = pending.pop()
+            if name in live or name not in defuns:
+                continue
+            live.add(name)
+            pending.extend(called_names(defuns[name].body))
+        self.removed = [name for name in defuns if name not in live]
+        return [f for f in forms
+                if not (isinstance(f, Node) and f.type == "defun" and f.name not in live)]
+
+    def apply(self, op, values):
+        """Valor da aplicação de op a values (constantes), ou _UNKNOWN."""
+        if op.type != "symbol":
+            return _UNKNOWN
+        if op.token == 'ID' and op.lexeme in self.functions:
+            return self.call(op.lexeme, values)
+        try:
+            value = apply_builtin(op, values)
+        except _Stuck:
+            return _UNKNOWN
+        self.folded += 1
+        return value
+
+    def call(self, name, values):
+        """Valor da chamada de name com values, ou _UNKNOWN se não deu para calcular."""
+        # listas comparam por identidade em eq: só chamadas e resultados sem
+        # listas são reaproveitados; o tipo entra na chave porque 1 == True,
+        # e o texto dos reais porque 0.0 == -0.0
+        key = None
+        if not any(isinstance(v, tuple) for v in values):
+            key = (name,) + tuple((float, repr(v)) if v.__class__ is float else (v.__class__, v)
+                                  for v in values)
+            if key in self._memo:
+                return self._memo[key]
+        budget = min(self.fuel, self.total_fuel - self.fuel_used)
+        value = _UNKNOWN
+        self.fuel_left = budget
+        if budget > 0:
+            info = self.functions[name]
+            try:
+                value = _walk(_eval_leaf, _eval_step, info["body"],
+                              dict(zip(info["params"], values)), self)
+            except _Stuck:
+                pass
+        self.fuel_used += budget - max(self.fuel_left, 0)
+        if value is _UNKNOWN:
+            self.calls_residual += 1
+            if self.fuel_left <= 0:
+                self.out_of_fuel += 1
+        else:
+            self.calls_folded += 1
+        if key is not None and not isinstance(value, tuple):
+            self._memo[key] = value
+        return value
+
+    def literal(self, value, node=None):
+        """
+        Nó literal com o valor value, ou None se o IR não tiver como
+        escrevê-lo. node é a expressão que calculou value: uma lista só tem
+        literal se node já é um cons de literais (e o literal é o próprio
+        node).
+        """
+        if isinstance(value, tuple):
+            if node is not None and node.type == "application" \
+                    and self._is_cons(node.operator) \
+                    and all(self._is_literal(a) for a in node.args):
+                self._lists[id(node)] = node
+                return node
+            return None
+        return self._literal(value)
+
+    def _is_cons(self, op):
+        if op.type != "symbol":
+            return False
+        if op.token == 'ID':
+            return op.lexeme == 'cons' and op.lexeme not in self.functions
+        return op.token == 'CONS'
+
+    def _is_literal(self, node):
+        if not isinstance(node, Node):
+            return False
+        ntype = node.type
+        if ntype == "number" or ntype == "nil":
+            return True
+        if ntype == "symbol":
+            return node.token == 'T' or node.token == 'NIL'
+        return id(node) in self._lists
+
+    def _literal(self, value):
+        if value is None:
+            return NIL
+        if value is True:
+            return self.nodes.symbol('T', 't')
+        if value.__class__ in (int, float):
+            # o texto tem que voltar ao mesmo valor (e tipo) na máquina virtual
+            text = str(value)
+            is_const, parsed = constant_value(text)
+            if len(text) > _MAX_LITERAL_DIGITS or not is_const or parsed != value \
+                    or parsed.__class__ is not value.__class__:
+                return None
+            return self.nodes.number(value)
+        # False não é nil para eq, e os símbolos ficam como estão
+        return None
+
+    def as_dict(self):
+        return {"folded": self.folded, "calls_folded": self.calls_folded,
+                "calls_residual": self.calls_residual, "out_of_fuel": self.out_of_fuel,
+                "branches_pruned": self.branches_pruned, "fuel_used": self.fuel_used,
+                "removed": list(self.removed)}
+
+    def report(self):
+        """Linhas de texto com os contadores da última execução."""
+        lines = [f"operações calculadas: {self.folded}",
+                 f"chamadas calculadas: {self.calls_folded}  residuais: "
+                 f"{self.calls_residual} ({self.out_of_fuel} sem combustível)",
+                 f"ramos de if eliminados: {self.branches_pruned}",
+                 f"combustível gasto: {self.fuel_used}"]
+        if self.removed:
+            lines.append(f"funções removidas: {', '.join(self.removed)}")
+        return lines
@@ -0,0 +1,280 @@
+# cfg.py
+# Grafo de fluxo de controle (CFG) de blocos básicos sobre o código de
+# 3-endereços, com as simplificações: threading de saltos, remoção de blocos
+# inalcançáveis, fusão de blocos e remoção de saltos para a instrução seguinte.
+#
+# Todo bloco termina em um terminador explícito:
+#   ('goto', L)            salto incondicional
+#   ('br', c, Lv, Lf)      se c vai para Lv, senão para Lf
+#   ('return', a)          fim da função / programa
+# Saltos implícitos (queda para o bloco seguinte) só reaparecem na
+# linearização.
+from ir import constant_value, is_constant
+
+
+class BasicBlock:
+    """Sequência de instruções sem desvios internos."""
+
+    def __init__(self, label):
+        self.label = label
+        self.body = []
+        self.term = None
+
+    def successors(self):
+        term = self.term
+        if term[0] == 'goto':
+            return [term[1]]
+        if term[0] == 'br':
+            return [term[2], term[3]] if term[2] != term[3] else [term[2]]
+        return []
+
+    def __repr__(self):
+        return f"<BasicBlock {self.label}: {len(self.body)} instr, {self.term}>"
+
+
+class CFG:
+    """Blocos básicos em ordem, indexados pelo rótulo; o primeiro é a entrada."""
+
+    def __init__(self, blocks):
+        self.blocks = {b.label: b for b in blocks}
+        self.order = [b.label for b in blocks]
+        self.entry = self.order[0] if self.order else None
+
+    def __iter__(self):
+        for label in self.order:
+            yield self.blocks[label]
+
+    def __len__(self):
+        return len(self.order)
+
+    def predecessors(self):
+        preds = {label: [] for label in self.order}
+        for b in self:
+            for s in b.successors():
+                preds[s].append(b.label)
+        return preds
+
+    def reverse_postorder(self):
+        """Blocos alcançáveis em pós-ordem reversa a partir da entrada."""
+        seen = set()
+        post = []
+        if self.entry is None:
+            return post
+        stack = [(self.entry, iter(self.blocks[self.entry].successors()))]
+        seen.add(self.entry)
+        while stack:
+            label, it = stack[-1]
+            for s in it:
+                if s not in seen:
+                    seen.add(s)
+                    stack.append((s, iter(self.blocks[s].successors())))
+                    break
+            else:
+                stack.pop()
+                post.append(label)
+        post.reverse()
+        return post
+
+    def instruction_count(self):
+        return sum(len(b.body) + 1 for b in self)
+
+
+def build_cfg(instrs):
+    """Divide as instruções de uma região em blocos básicos."""
+    blocks = []
+    synthetic = [0]
+
+    def new_block(label=None):
+        if label is None:
+            # rótulos sintéticos derivam do último rótulo real da região,
+            # que é único no programa todo
+            last = next((b.label for b in reversed(blocks)
+                         if not b.label.startswith('_')), '')
+            synthetic[0] += 1
+            label = f"{last}_{synthetic[0]}" if last else f"_B{synthetic[0]}"
+        b = BasicBlock(label)
+        blocks.append(b)
+        return b
+
+    current = None
+    for ins in instrs:
+        kind = ins[0]
+        if kind == 'label':
+            if current is not None and current.term is None:
+                current.term = ('goto', ins[1])
+            current = new_block(ins[1])
+            continue
+        if current is None or current.term is not None:
+            prev = current
+            current = new_block()
+            if prev is not None and prev.term is None:
+                prev.term = ('goto', current.label)
+        if kind == 'goto':
+            current.term = ins
+        elif kind == 'return':
+            current.term = ins
+        elif kind == 'if':
+            # o destino "falso" é o bloco seguinte, ainda não criado
+            current.term = ('br', ins[1], ins[2], None)
+        else:
+            current.body.append(ins)
+
+    # fecha saltos para o bloco seguinte
+    for i, b in enumerate(blocks):
+        nxt = blocks[i + 1].label if i + 1 < len(blocks) else None
+        if b.term is None:
+            b.term = ('goto', nxt) if nxt is not None else ('return', 'nil')
+        elif b.term[0] == 'br' and b.term[3] is None:
+            if nxt is None:
+                nxt_block = new_block()
+                nxt_block.term = ('return', 'nil')
+                nxt = nxt_block.label
+            b.term = ('br', b.term[1], b.term[2], nxt)
+
+    return CFG(blocks)
+
+
+def thread_jumps(cfg):
+    """
+    Redireciona saltos que chegam a blocos vazios terminados em 'goto'
+    diretamente para o destino final; desvios com condição constante ou
+    com os dois destinos iguais viram 'goto'.
+    """
+    forward = {}
+    for b in cfg:
+        if not b.body and b.term[0] == 'goto' and b.label != cfg.entry:
+            forward[b.label] = b.term[1]
+
+    def final(label):
+        seen = set()
+        while label in forward and label not in seen:
+            seen.add(label)
+            label = forward[label]
+        return label
+
+    changed = False
+    for b in cfg:
+        term = b.term
+        if term[0] == 'goto':
+            new = ('goto', final(term[1]))
+        elif term[0] == 'br':
+            t, f = final(term[2]), final(term[3])
+            if is_constant(term[1]):
+                new = ('goto', t if constant_value(term[1])[1] is not None else f)
+            elif t == f:
+                new = ('goto', t)
+            else:
+                new = ('br', term[1], t, f)
+        else:
+            new = term
+        if new != term:
+            b.term = new
+            changed = True
+    return changed
+
+
+def remove_unreachable(cfg):
+    """Remove blocos não alcançáveis a partir da entrada."""
+    reachable = set(cfg.reverse_postorder())
+    if len(reachable) == len(cfg.order):
+        return False
+    cfg.order = [label for label in cfg.order if label in reachable]
+    cfg.blocks = {label: cfg.blocks[label] for label in cfg.order}
+    return True
+
+
+def merge_blocks(cfg):
+    """Funde B em A quando A salta incondicionalmente para B e é seu único predecessor."""
+    changed = False
+    preds = cfg.predecessors()
+    for label in list(cfg.order):
+        a = cfg.blocks.get(label)
+        if a is None:
+            continue
+        while a.term[0] == 'goto':
+            target = a.term[1]
+            if target == a.label or target == cfg.entry or len(preds[target]) != 1:
+                break
+            b = cfg.blocks[target]
+            a.body.extend(b.body)
+            a.term = b.term
+            del cfg.blocks[target]
+            cfg.order.remove(target)
+            for s in b.successors():
+                preds[s] = [a.label if p == target else p for p in preds[s]]
+            changed = True
+    return changed
+
+
+def layout(cfg):
+    """
+    Ordem de emissão dos blocos: a partir de cada bloco tenta posicionar em
+    seguida o destino que pode ser alcançado por queda (o 'goto' ou o lado
+    falso do desvio); quando não dá, segue a ordem original.
+    Os blocos que terminam em 'return' ficam no fim, preservando a forma
+    esperada por ir.split_regions (uma função termina no seu 'return').
+    """
+    exits = [b.label for b in cfg if b.term[0] == 'return']
+    placed = set(exits)
+    order = []
+    for label in cfg.order:
+        while label is not None and label not in placed:
+            placed.add(label)
+            order.append(label)
+            term = cfg.blocks[label].term
+            nxt = None
+            if term[0] == 'goto':
+                nxt = term[1]
+            elif term[0] == 'br':
+                nxt = term[3]
+            label = nxt if nxt is not None and nxt != cfg.entry else None
+    if exits and exits[0] == cfg.entry:
+        return exits[:1] + order + exits[1:]
+    return order + exits
+
+
+def linearize(cfg):
+    """Converte o CFG em instruções, omitindo saltos para o bloco seguinte."""
+    order = layout(cfg)
+    needed = set()
+    for i, label in enumerate(order):
+        term = cfg.blocks[label].term
+        nxt = order[i + 1] if i + 1 < len(order) else None
+        if term[0] == 'goto' and term[1] != nxt:
+            needed.add(term[1])
+        elif term[0] == 'br':
+            needed.add(term[2])
+            if term[3] != nxt:
+                needed.add(term[3])
+
+    out = []
+    for i, label in enumerate(order):
+        b = cfg.blocks[label]
+        nxt = order[i + 1] if i + 1 < len(order) else None
+        if label in needed or label == cfg.entry and label.startswith('func_'):
+            out.append(('label', label))
+        out.extend(b.body)
+        term = b.term
+        if term[0] == 'goto':
+            if term[1] != nxt:
+                out.append(term)
+        elif term[0] == 'br':
+            out.append(('if', term[1], term[2]))
+            if term[3] != nxt:
+                out.append(('goto', term[3]))
+        else:
+            out.append(term)
+    return out
+
+
+def simplify_cfg(instrs):
+    """Passe de otimização: constrói o CFG, simplifica e lineariza."""
+    if not instrs:
+        return instrs
+    cfg = build_cfg(instrs)
+    changed = True
+    while changed:
+        changed = thread_jumps(cfg)
+        changed = remove_unreachable(cfg) or changed
+        changed = merge_blocks(cfg) or changed
+    return linearize(cfg)
@@ -1,8 +1,32 @@
 # compiler_ply_optionB_ast_dict_irA.py
-import ply.lex as lex
-import ply.yacc as yacc
+import argparse
+import contextvars
+import hashlib
 import json
+import marshal
+import os
+import re
 import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# cache_ply.py e scanner.py são comuns às duas partes e ficam em comum/
+_COMUM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'comum')
+if _COMUM not in sys.path:
+    sys.path.append(_COMUM)
+
+import serializacao
+from avaliacao_parcial import PartialEvaluator
+from arvore import Node, NodeTable, _COMPOUND, _walk, called_names, dumps_json
+from cache_ply import cached_lexer, cached_parser, grammar_key
+from ir import IRBuffer, format_ir, var_name
+from otimizacao import PassManager
+from reescrita import RewriteEngine
+from registradores import RegisterAllocator
+from scanner import Scanner
 
 # LÉXICO
 reserved = {
@@ -102,58 +126,492 @@ def t_error(t):
 # PARSER
 precedence = ()
 
-def p_program(p):
-    '''program : expr_list'''
-    # p[1] é uma lista de nós AST
-    ast = p[1]
+# Passes de otimização aplicados ao IR em p_program (None desativa). Em
+# compile() é só a configuração: cada compilação usa uma cópia própria.
+optimizer = PassManager()
 
-    # Análise semântica, executada dentro do parser
-    semantic_errors = []
-    functions = collect_defuns(ast)
+# Alocação de registradores aplicada depois da otimização (None desativa)
+allocator = RegisterAllocator()
 
-    # checa funções duplicadas
-    duplicates = [name for name in functions if list(functions.keys()).count(name) > 1]
-    for d in set(duplicates):
-        semantic_errors.append(f"Função duplicada: {d}")
+# Avaliação parcial da AST entre a análise semântica e a geração de código
+# (None desativa); como o optimizer, só vale com otimização
+partial_evaluator = PartialEvaluator()
 
-    # analisa cada expressão de nível superior
-    for node in ast:
-        semantic_analyze_node(node, functions, {}, semantic_errors)
+# Regras de reescrita aplicadas à AST depois da avaliação parcial (None
+# desativa); também só com otimização
+rewriter = RewriteEngine()
 
-    if semantic_errors:
-        print("\n=== ERROS SEMÂNTICOS ===")
-        for e in semantic_errors:
-            print(" -", e)
-        print("\nAbortando geração de código devido a erros semânticos.")
-        p[0] = {"type": "program", "ast": ast, "sem_ok": False, "errors": semantic_errors}
-        return
 
-    print("\n=== SEMÂNTICA OK ===")
-    print("Funções detectadas:")
-    for fn_name, info in functions.items():
-        print(f" - {fn_name}({', '.join(info['params'])})")
+# CONTEXTO DE COMPILAÇÃO
+#
+# As ações do parser (p_program, p_error) não recebem argumentos extras,
+# então a compilação em andamento fica numa ContextVar: cada thread e cada
+# tarefa asyncio enxerga a sua. Fora de compile() vale o comportamento
+# antigo de parser.parse: contexto de geração padrão, optimizer/allocator
+# do módulo e relatório na saída padrão.
+class Compilation:
+    """
+    Estado de uma compilação: geração de código, avaliação parcial, regras
+    de reescrita, passes de otimização e alocação (None desativa), erros
+    de sintaxe, o destino do relatório
+    (out=None não escreve nada), as estatísticas por fase (CompileStats),
+    o orçamento de recursos (Budget), ambos opcionais, e a NodeTable que
+    cria os nós da AST.
+    """
 
-    # Geração de código intermediário (3-endereços)
-    ir_lines = []
-    # Mapa de funções para o gerador
-    global_codegen_setup(functions)
+    def __init__(self, optimizer=None, allocator=None, out=None, codegen=None, stats=None,
+                 budget=None, nodes=None, partial=None, rewriter=None):
+        self.codegen = codegen if codegen is not None else CodegenContext()
+        self.nodes = nodes if nodes is not None else NodeTable()
+        self.partial = partial
+        self.rewriter = rewriter
+        self.optimizer = optimizer
+        self.allocator = allocator
+        self.out = out
+        self.stats = stats
+        self.budget = budget
+        self.memory_base = 0    # memória rastreada no início (para max_bytes)
+        self.syntax_errors = []
+
+    def log(self, *args):
+        if self.out is not None:
+            print(*args, file=self.out)
+
+    def check_budget(self, phase, ir=None):
+        """
+        Levanta BudgetExceeded se a compilação passou do limite de IR ou de
+        bytes do orçamento (o de nós é da BudgetNodeTable).
+        """
+        budget = self.budget
+        if budget.max_ir is not None and ir is not None and ir > budget.max_ir:
+            raise BudgetExceeded(phase, "instruções de IR", ir, budget.max_ir)
+        if budget.max_bytes is not None:
+            used = tracemalloc.get_traced_memory()[0] - self.memory_base
+            if used > budget.max_bytes:
+                raise BudgetExceeded(phase, "bytes alocados", used, budget.max_bytes)
+
+_current = contextvars.ContextVar('compilation', default=None)
+
+def current_compilation():
+    """Compilação em andamento neste contexto (ou uma com o estado do módulo)."""
+    comp = _current.get()
+    if comp is None:
+        comp = Compilation(optimizer, allocator, sys.stdout, _default_codegen,
+                           nodes=_default_nodes, partial=partial_evaluator,
+                           rewriter=rewriter)
+    return comp
+
+class Budget:
+    """
+    Limites de uma compilação (None: sem limite): nós da AST, instruções de
+    IR e bytes alocados desde o início dela (medidos com tracemalloc, que
+    fica ligado durante a compilação e a deixa algumas vezes mais lenta).
+    Os nós são contados pela NodeTable do parse, a cada nó criado; IR e
+    bytes são conferidos ao fim de cada fase e, na análise semântica com a
+    geração de código, a cada form de nível superior.
+    """
+
+    def __init__(self, max_nodes=None, max_ir=None, max_bytes=None):
+        self.max_nodes = max_nodes
+        self.max_ir = max_ir
+        self.max_bytes = max_bytes
+
+class BudgetExceeded(Exception):
+    """Compilação interrompida por passar de um limite do Budget."""
 
-    for node in ast:
-        lines, res = gen_code(node, {})
-        if lines:
-            ir_lines.extend(lines)
+    def __init__(self, phase, limit, value, maximum):
+        super().__init__(f"Orçamento excedido na fase {phase}: {value} {limit} "
+                         f"(máximo {maximum})")
+        self.phase = phase
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
 
-    print("\n=== CÓDIGO INTERMEDIÁRIO (3-endereços) ===")
-    for l in ir_lines:
-        print(l)
+    def as_dict(self):
+        return {"phase": self.phase, "limit": self.limit, "value": self.value,
+                "max": self.maximum}
+
+class BudgetNodeTable(NodeTable):
+    """
+    NodeTable do parse com orçamento de nós: conta cada nó pedido (cada
+    ocorrência, como count_nodes) e levanta BudgetExceeded assim que passa
+    de max_nodes, sem esperar o fim do parse.
+    """
+
+    def __init__(self, max_nodes):
+        super().__init__()
+        self.max_nodes = max_nodes
+        self.created = 0
+
+    def _count(self):
+        self.created += 1
+        if self.created > self.max_nodes:
+            raise BudgetExceeded("parse", "nós da AST", self.created, self.max_nodes)
+
+    def number(self, value):
+        self._count()
+        return super().number(value)
+
+    def symbol(self, token, lexeme):
+        self._count()
+        return super().symbol(token, lexeme)
+
+    def nil(self):
+        self._count()
+        return super().nil()
+
+    def if_(self, cond, then, else_):
+        self._count()
+        return super().if_(cond, then, else_)
+
+    def defun(self, name, params, body):
+        self._count()
+        return super().defun(name, params, body)
+
+    def application(self, operator, args):
+        self._count()
+        return super().application(operator, args)
+
+# tracemalloc é do processo todo: fica ligado enquanto alguma compilação
+# com max_bytes ou memory estiver em andamento, e só é desligado se foi
+# ligado por elas
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0:
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start()
+        _tracing_users += 1
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+
+class CompileStats:
+    """
+    Tempo e contadores de cada fase de uma compilação (lex, parse,
+    semantic+codegen, partial_eval, rewrite, codegen quando as duas
+    anteriores mudam o programa, optimize, regalloc e emit, que é o IR
+    final e o relatório em out), na ordem em que rodaram. Só
+    compile(profile=True) cria um; sem ele as fases não medem nada.
+
+    Com memory, cada fase também registra, via tracemalloc, o pico de
+    memória acima do início dela (mem_peak), quanto ficou alocado no fim
+    (mem_retained) e as linhas que mais alocaram (mem_top). Os tempos ficam
+    maiores: tracemalloc e as fotos da memória custam caro.
+    """
+
+    TOP_SITES = 5
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.phases = []    # (fase, segundos, {contador: valor})
+        self._start = 0.0
+        self._mem_start = 0
+        self._sites = {}
+
+    def start(self, sites=None):
+        """Início da próxima fase."""
+        if self.memory:
+            self._sites = sites if sites is not None else self._site_sizes()
+            tracemalloc.reset_peak()
+            self._mem_start = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+
+    def lap(self, phase, **counts):
+        """Fim da fase phase (iniciada pelo último start ou lap) e início da próxima."""
+        seconds = time.perf_counter() - self._start
+        sites = None
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            counts["mem_peak"] = peak - self._mem_start
+            counts["mem_retained"] = current - self._mem_start
+            sites = self._site_sizes()
+            counts["mem_top"] = self._top_sites(sites)
+        self.add(phase, seconds, **counts)
+        self.start(sites)
+
+    @staticmethod
+    def _site_sizes():
+        """{(arquivo, linha): (bytes, blocos)} do que está alocado agora."""
+        sizes = {}
+        for st in tracemalloc.take_snapshot().statistics('lineno'):
+            frame = st.traceback[0]
+            if frame.filename != tracemalloc.__file__:
+                sizes[frame.filename, frame.lineno] = (st.size, st.count)
+        return sizes
+
+    def _top_sites(self, sites):
+        # a fase seguinte parte da mesma foto: cada lap tira uma só
+        before = self._sites
+        diff = []
+        for key, (size, count) in sites.items():
+            old_size, old_count = before.get(key, (0, 0))
+            if size > old_size:
+                diff.append((size - old_size, count - old_count, key))
+        diff.sort(reverse=True)
+        return [{"site": f"{os.path.basename(filename)}:{lineno}", "bytes": size, "count": count}
+                for size, count, (filename, lineno) in diff[:self.TOP_SITES]]
+
+    def add(self, phase, seconds, **counts):
+        """
+        Registra uma fase. Uma fase repetida (emit, que junta os pedaços do
+        relatório) soma com a anterior e passa para o fim.
+        """
+        for i, (name, before, old) in enumerate(self.phases):
+            if name == phase:
+                del self.phases[i]
+                merged = dict(old)
+                for k, v in counts.items():
+                    if k == "mem_peak":
+                        merged[k] = max(merged.get(k, v), v)
+                    elif k == "mem_retained":
+                        merged[k] = merged.get(k, 0) + v
+                    elif k == "mem_top":
+                        sites = {}
+                        for st in merged.get(k, []) + v:
+                            old_st = sites.get(st["site"], {"bytes": 0, "count": 0})
+                            sites[st["site"]] = {"site": st["site"],
+                                                 "bytes": old_st["bytes"] + st["bytes"],
+                                                 "count": old_st["count"] + st["count"]}
+                        merged[k] = sorted(sites.values(),
+                                           key=lambda st: -st["bytes"])[:self.TOP_SITES]
+                    else:
+                        merged[k] = v
+                counts, seconds = merged, before + seconds
+                break
+        self.phases.append((phase, seconds, counts))
+
+    def note(self, **counts):
+        """Contadores a mais para a última fase registrada."""
+        self.phases[-1][2].update(counts)
+
+    def total(self):
+        return sum(seconds for _, seconds, _ in self.phases)
+
+    def as_dict(self):
+        return {"seconds": self.total(),
+                "phases": [{"phase": phase, "seconds": seconds, **counts}
+                           for phase, seconds, counts in self.phases]}
+
+    def report(self):
+        """Linhas de texto com uma fase por linha (e os passes de otimização)."""
+        lines = []
+        for phase, seconds, counts in self.phases:
+            fields = "  ".join(f"{k} {v}" for k, v in counts.items()
+                               if k not in ("passes", "mem_top"))
+            lines.append(f"{phase:<10} {seconds * 1000:10.3f} ms  {fields}")
+            for st in counts.get("passes", ()):
+                lines.append(f"  {st['pass']:<24} {st['seconds'] * 1000:10.3f} ms  "
+                             f"removidas {st['removed']}")
+            for st in counts.get("mem_top", ()):
+                lines.append(f"  {st['site']:<32} {st['bytes'] / 1024:10.1f} KiB  "
+                             f"{st['count']} blocos")
+        lines.append(f"{'total':<10} {self.total() * 1000:10.3f} ms")
+        return lines
+
+def count_nodes(ast):
+    """
+    Número de nós da AST (a lista de nível superior não conta), contando
+    cada ocorrência de uma subárvore compartilhada.
+    """
+    count = 0
+    stack = list(ast)
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, Node):
+            continue
+        count += 1
+        ntype = node.type
+        if ntype == "application":
+            stack.append(node.operator)
+            stack.extend(node.args)
+        elif ntype == "defun":
+            stack.append(node.body)
+        elif ntype == "if":
+            stack.extend((node.cond, node.then, node.else_))
+    return count
+
+def p_program(p):
+    '''program : expr_list'''
+    # p[1] é uma lista de nós AST; medindo as fases ou com orçamento,
+    # compile() chama compile_program depois do parse, para separar o tempo
+    # de cada fase e conferir o orçamento antes de seguir
+    comp = current_compilation()
+    # a AST está pronta: as chaves do hash-consing não servem mais
+    comp.nodes.clear()
+    if comp.stats is not None or comp.budget is not None:
+        p[0] = p[1]
+    else:
+        p[0] = compile_program(p[1], comp)
+
+def compile_program(ast, comp):
+    """
+    Análise semântica, geração de código, avaliação parcial, regras de
+    reescrita, otimização e alocação de registradores de um programa já
+    analisado sintaticamente, com o estado
+    e a configuração de comp (Compilation). Devolve o resultado de compile.
+    """
+    log = comp.log
+    stats = comp.stats
+    budget = comp.budget
+    if stats is not None:
+        stats.start()
+
+    # tabela de símbolos: as funções na ordem em que são definidas (só a
+    # lista de nível superior é percorrida), com as duplicadas
+    symbols = SymbolTable(ast)
+    functions = symbols.functions
+    semantic_errors = symbols.errors()
+
+    # análise semântica e geração de código (3-endereços) de cada
+    # expressão de nível superior numa só travessia; havendo erro, o
+    # código é descartado
+    code, last_res = _generate_forms(ast, functions, comp, semantic_errors,
+                                     "semantic+codegen")
+
+    if stats is not None:
+        stats.lap("semantic+codegen", functions=len(functions), errors=len(semantic_errors),
+                  temps=comp.codegen.temp_counter, labels=comp.codegen.label_counter,
+                  ir_instrs=len(code), ir_bytes=code.nbytes())
 
-    p[0] = {"type": "program", "ast": ast, "sem_ok": True, "ir": ir_lines}
+    if semantic_errors:
+        log("\n=== ERROS SEMÂNTICOS ===")
+        for e in semantic_errors:
+            log(" -", e)
+        log("\nAbortando geração de código devido a erros semânticos.")
+        return {"type": "program", "ast": ast, "sem_ok": False, "errors": semantic_errors}
 
+    log("\n=== SEMÂNTICA OK ===")
+    log("Funções detectadas:")
+    for fn_name, info in functions.items():
+        log(f" - {fn_name}({', '.join(info['params'])})")
+
+    # avaliação parcial (o que não depende da entrada é calculado agora) e
+    # regras de reescrita sobre a AST; se alguma form mudou, o código é
+    # gerado de novo (os erros dessa geração são descartados: um literal no
+    # lugar de uma chamada pode não ter o tipo que a análise espera, mas o
+    # programa já foi aceito)
+    partial, rewriter = comp.partial, comp.rewriter
+    partial_stats = rewrites = None
+    forms = ast
+    if partial is not None:
+        forms = partial.run(forms, functions, comp.nodes)
+        partial_stats = partial.as_dict()
+        if stats is not None:
+            stats.lap("partial_eval", calls_folded=partial.calls_folded,
+                      fuel_used=partial.fuel_used)
+        if comp.out is not None:
+            log("\n=== AVALIAÇÃO PARCIAL ===")
+            for l in partial.report():
+                log(l)
+
+    if rewriter is not None:
+        forms = rewriter.run(forms, comp.nodes)
+        rewrites = dict(rewriter.fired)
+        if stats is not None:
+            stats.lap("rewrite", fired=sum(rewrites.values()))
+        if comp.out is not None:
+            log("\n=== REGRAS DE REESCRITA ===")
+            for l in rewriter.report():
+                log(l)
+
+    if len(forms) != len(ast) or any(f is not a for f, a in zip(forms, ast)):
+        code, last_res = _generate_forms(forms, SymbolTable(forms).functions, comp, [],
+                                         "codegen")
+        if stats is not None:
+            stats.lap("codegen", ir_instrs=len(code), ir_bytes=code.nbytes())
+
+    # o valor do programa é o da última expressão de nível superior
+    if last_res is not None:
+        code.append(('return', last_res))
+
+    if comp.out is not None:
+        log("\n=== CÓDIGO INTERMEDIÁRIO (3-endereços) ===")
+        for l in format_ir(code):
+            log(l)
+
+    optimizer, allocator = comp.optimizer, comp.allocator
+
+    if stats is not None:
+        stats.lap("emit")
+
+    opt_stats = None
+    if optimizer is not None:
+        code = optimizer.run(code)
+        opt_stats = [optimizer.stats[name].as_dict() for name in optimizer.pipeline]
+        if stats is not None:
+            stats.lap("optimize", ir_instrs=len(code), passes=opt_stats)
+        if budget is not None:
+            comp.check_budget("optimize", ir=len(code))
+
+    regalloc = None
+    if allocator is not None:
+        code = allocator.run(code)
+        regalloc = [st.as_dict() for st in allocator.stats]
+        if stats is not None:
+            stats.lap("regalloc", ir_instrs=len(code),
+                      spilled=sum(st.spilled for st in allocator.stats))
+        if budget is not None:
+            comp.check_budget("regalloc", ir=len(code))
+
+    if optimizer is not None or allocator is not None:
+        code = IRBuffer(code)
+        if comp.out is not None:
+            log("\n=== CÓDIGO INTERMEDIÁRIO OTIMIZADO ===")
+            for l in format_ir(code):
+                log(l)
+
+    if optimizer is not None and comp.out is not None:
+        log("\n=== ESTATÍSTICAS DE OTIMIZAÇÃO ===")
+        for l in optimizer.report():
+            log(l)
+
+    if allocator is not None and comp.out is not None:
+        log("\n=== ALOCAÇÃO DE REGISTRADORES ===")
+        for l in allocator.report():
+            log(l)
+
+    if stats is not None:
+        stats.lap("emit", ir_bytes=code.nbytes())
+
+    return {"type": "program", "ast": ast, "sem_ok": True, "ir": code,
+            "partial_eval": partial_stats, "rewrites": rewrites, "opt_stats": opt_stats,
+            "regalloc": regalloc}
+
+def _generate_forms(forms, functions, comp, errors, phase):
+    """
+    Análise e geração de código das forms de nível superior com a tabela
+    de funções functions; devolve (código, temporário da última expressão).
+    """
+    code = IRBuffer()
+    comp.codegen.setup(functions)
+    last_res = None
+    for node in forms:
+        res = analyze_and_generate(node, {}, code, comp.codegen, errors)
+        if node.type != "defun":
+            last_res = res
+        if comp.budget is not None:
+            comp.check_budget(phase, ir=len(code))
+    return code, last_res
+
+
+# As listas são recursivas à esquerda: cada item é acrescentado à lista já
+# montada (tempo linear) e a pilha do parser não cresce com o tamanho dela.
 def p_expr_list(p):
-    '''expr_list : expr expr_list
+    '''expr_list : expr_list expr
                  | expr'''
     if len(p) == 3:
-        p[0] = [p[1]] + p[2]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = [p[1]]
 
@@ -166,9 +624,11 @@ def p_expr_listnode(p):
     p[0] = p[1]
 
 # Atom 
+# Os nós vêm da NodeTable da compilação (arvore.py): átomos e subárvores
+# iguais são o mesmo objeto.
 def p_atom_number(p):
     'atom : NUMBER'
-    p[0] = {"type": "number", "value": p[1]}
+    p[0] = current_compilation().nodes.number(p[1])
 
 def p_atom_id_or_token(p):
     '''atom : ID
@@ -195,7 +655,7 @@ def p_atom_id_or_token(p):
             | MOD
             | EXP'''
     # mantém tipo de token e lexema
-    p[0] = {"type": "symbol", "token": p.slice[1].type, "lexeme": p[1]}
+    p[0] = current_compilation().nodes.symbol(p.slice[1].type, p[1])
 
 def p_empty(p):
     'empty :'
@@ -204,31 +664,30 @@ def p_empty(p):
 # Lista Constructas
 def p_list_empty(p):
     'list : LPAREN RPAREN'
-    p[0] = {"type": "nil"}
+    p[0] = current_compilation().nodes.nil()
 
 def p_list_if(p):
     '''list : LPAREN IF expr expr expr RPAREN
             | LPAREN IF expr expr RPAREN'''
+    nodes = current_compilation().nodes
     if len(p) == 7:
         # (if cond then else)
-        p[0] = {"type": "if", "cond": p[3], "then": p[4], "else": p[5]}
+        p[0] = nodes.if_(p[3], p[4], p[5])
     else:
         # (if cond then) -> else implícito nil
-        p[0] = {"type": "if", "cond": p[3], "then": p[4], "else": {"type": "nil"}}
+        p[0] = nodes.if_(p[3], p[4], nodes.nil())
 
 def p_list_defun(p):
     'list : LPAREN DEFUN ID LPAREN param_list RPAREN expr RPAREN'
     # (defun <id> (<params>) <body>)
-    p[0] = {"type": "defun", "name": p[3], "params": p[5], "body": p[7]}
+    p[0] = current_compilation().nodes.defun(p[3], p[5], p[7])
 
 def p_param_list(p):
-    '''param_list : ID param_list
-                  | ID
+    '''param_list : param_list ID
                   | empty'''
     if len(p) == 3:
-        p[0] = [p[1]] + p[2]
-    elif len(p) == 2 and p[1] is not None:
-        p[0] = [p[1]]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = []
 
@@ -238,21 +697,25 @@ def p_list_application(p):
     elems = p[2]
     operator = elems[0]
     args = elems[1:]
-    p[0] = {"type": "application", "operator": operator, "args": args}
+    p[0] = current_compilation().nodes.application(operator, args)
 
 def p_elements(p):
-    '''elements : expr elements
+    '''elements : elements expr
                 | expr'''
     if len(p) == 3:
-        p[0] = [p[1]] + p[2]
+        p[1].append(p[2])
+        p[0] = p[1]
     else:
         p[0] = [p[1]]
 
 def p_error(p):
     if p:
-        print(f"Erro de sintaxe: token inesperado '{p.value}' (tipo {p.type})")
+        msg = f"Erro de sintaxe: token inesperado '{p.value}' (tipo {p.type})"
     else:
-        print("Erro de sintaxe: EOF inesperado")
+        msg = "Erro de sintaxe: EOF inesperado"
+    comp = current_compilation()
+    comp.syntax_errors.append(msg)
+    comp.log(msg)
         
         
 # ANÁLISE SEMÂNTICA (funções auxiliares)
@@ -264,400 +727,1036 @@ builtin_names = {
 }
 
 def collect_defuns(ast):
-    """Retorna dict: nome -> {'params': [...], 'body': node}"""
-    funcs = {}
-    for node in ast:
-        if isinstance(node, dict) and node.get("type") == "defun":
-            name = node["name"]
-            params = node["params"]
-            body = node["body"]
-            funcs[name] = {"params": params, "body": body}
-    return funcs
+    """Retorna dict: nome -> {'params': [...], 'body': node} (a última definição de cada nome)"""
+    return SymbolTable(ast).functions
 
-def semantic_analyze_node(node, functions, env, errors):
+# GERAÇÃO DE CÓDIGO INTERMEDIÁRIO (3-endereços)
+class CodegenContext:
     """
-    node: nó AST (dict)
-    functions: dict de defuns
-    env: mapeamento var->tipo (parâmetros locais)
-    errors: lista para armazenar mensagens
-    retorna: tipo inferido: 'number'|'list'|'any'
+    Estado da geração de código de uma compilação: contadores de
+    temporários e rótulos e a tabela de funções (nome -> (params, corpo)).
+    Cada compilação usa o seu, então compilações simultâneas não
+    interferem entre si.
     """
-    if not isinstance(node, dict):
-        return 'any'
 
-    ntype = node.get("type")
-
-    if ntype == "number":
-        return 'number'
-    if ntype == "nil":
-        return 'list'
-    if ntype == "symbol":
-        tok = node.get("token")
-        # uso de símbolo como identificador
-        if tok == 'ID':
-            name = node.get("lexeme")
-            if name in env:
-                return env[name] or 'any'
-            else:
-                errors.append(f"Variável não declarada: {name}")
-                return 'any'
-        # outros tokens usados como átomos -> tipo genérico
-        return 'any'
-
-    if ntype == "defun":
-        name = node["name"]
-        params = node["params"]
-        body = node["body"]
-        # ambiente local: parâmetros são any
-        local_env = {p: 'any' for p in params}
-        semantic_analyze_node(body, functions, local_env, errors)
-        return 'any'
-
-    if ntype == "if":
-        semantic_analyze_node(node["cond"], functions, env, errors)
-        t_then = semantic_analyze_node(node["then"], functions, env, errors)
-        t_else = semantic_analyze_node(node["else"], functions, env, errors)
-        if t_then == t_else:
-            return t_then
-        return 'any'
-
-    if ntype == "application":
-        op_node = node["operator"]
-        args = node["args"]
-
-        # operador deve ser símbolo
-        if not isinstance(op_node, dict) or op_node.get("type") != "symbol":
-            errors.append("Operador inválido em aplicação")
-            for a in args:
-                semantic_analyze_node(a, functions, env, errors)
-            return 'any'
-
-        optoken = op_node.get("token")
-        oplex = op_node.get("lexeme")
-
-        # função definida pelo usuário
-        if optoken == 'ID' and oplex in functions:
-            expected = len(functions[oplex]['params'])
-            got = len(args)
-            if expected != got:
-                errors.append(f"Chamada de '{oplex}' com aridade incorreta: esperado {expected}, obteve {got}")
-            for a in args:
-                semantic_analyze_node(a, functions, env, errors)
-            return 'any'
-
-        # built-ins aritméticos
-        if optoken in builtin_arith_tokens:
-            if len(args) != 2:
-                errors.append(f"Operador aritmético '{oplex}' precisa de 2 argumentos (recebeu {len(args)})")
-            t1 = semantic_analyze_node(args[0], functions, env, errors) if len(args) >= 1 else 'any'
-            t2 = semantic_analyze_node(args[1], functions, env, errors) if len(args) >= 2 else 'any'
-            if t1 not in ('number','any'):
-                errors.append(f"Operador '{oplex}' espera número no 1º argumento")
-            if t2 not in ('number','any'):
-                errors.append(f"Operador '{oplex}' espera número no 2º argumento")
-            return 'number'
-
-        if optoken in builtin_comp_tokens:
-            if len(args) != 2:
-                errors.append(f"Operador de comparação '{oplex}' precisa de 2 argumentos")
-            semantic_analyze_node(args[0], functions, env, errors)
-            semantic_analyze_node(args[1], functions, env, errors)
-            return 'any'
-
-        # cons, car, cdr, eq
-        if optoken == 'CONS' or (optoken == 'ID' and oplex == 'cons'):
-            if len(args) != 2:
-                errors.append(f"cons precisa de 2 argumentos")
-            semantic_analyze_node(args[0], functions, env, errors)
-            semantic_analyze_node(args[1], functions, env, errors)
-            return 'list'
-
-        if optoken == 'CAR' or (optoken == 'ID' and oplex == 'car'):
-            if len(args) != 1:
-                errors.append("car precisa de 1 argumento")
-            t = semantic_analyze_node(args[0], functions, env, errors)
-            if t not in ('list','any'):
-                errors.append("car espera uma lista no argumento")
-            return 'any'
-
-        if optoken == 'CDR' or (optoken == 'ID' and oplex == 'cdr'):
-            if len(args) != 1:
-                errors.append("cdr precisa de 1 argumento")
-            t = semantic_analyze_node(args[0], functions, env, errors)
-            if t not in ('list','any'):
-                errors.append("cdr espera uma lista no argumento")
-            return 'list'
-
-        if optoken == 'EQ' or (optoken == 'ID' and oplex == 'eq'):
-            if len(args) != 2:
-                errors.append("eq precisa de 2 argumentos")
-            semantic_analyze_node(args[0], functions, env, errors)
-            semantic_analyze_node(args[1], functions, env, errors)
-            return 'any'
-
-        # operador é ID mas não é função definida
-        if optoken == 'ID':
-            if oplex not in functions:
-                errors.append(f"Função não definida: {oplex}")
-                for a in args:
-                    semantic_analyze_node(a, functions, env, errors)
-                return 'any'
-
-        # fallback
-        for a in args:
-            semantic_analyze_node(a, functions, env, errors)
-        return 'any'
-
-    return 'any'
-
-# GERAÇÃO DE CÓDIGO INTERMEDIÁRIO (3-endereços)
-_temp_counter = 0
-_label_counter = 0
-_codegen_functions = {}
+    def __init__(self, functions=None):
+        self.temp_counter = 0
+        self.label_counter = 0
+        self.functions = {}
+        if functions:
+            self.setup(functions)
+
+    def reset(self):
+        self.temp_counter = 0
+        self.label_counter = 0
+
+    def new_temp(self):
+        """Novo temporário; no IR estruturado o temporário tN é o inteiro N."""
+        t = self.temp_counter
+        self.temp_counter += 1
+        return t
+
+    def new_label(self):
+        name = f"L{self.label_counter}"
+        self.label_counter += 1
+        return name
+
+    def setup(self, functions):
+        """Prepara tabela de funções para geração de código; reinicia contadores."""
+        self.reset()
+        self.functions = {}
+        for name, info in functions.items():
+            self.functions[name] = (info['params'], info.get('body'))
+
+# contexto das funções abaixo e de quem compila sem Compilation própria
+_default_codegen = CodegenContext()
+# e os nós da AST de quem chama parser.parse (p_program esvazia a tabela)
+_default_nodes = NodeTable()
 
 def reset_codegen():
-    global _temp_counter, _label_counter
-    _temp_counter = 0
-    _label_counter = 0
+    _default_codegen.reset()
 
 def new_temp():
-    global _temp_counter
-    name = f"t{_temp_counter}"
-    _temp_counter += 1
-    return name
+    return _default_codegen.new_temp()
 
 def new_label():
-    global _label_counter
-    name = f"L{_label_counter}"
-    _label_counter += 1
-    return name
+    return _default_codegen.new_label()
+
+# ANÁLISE SEMÂNTICA E GERAÇÃO DE CÓDIGO EM UMA PASSADA
+#
+# compile_program, StreamCompiler e IncrementalCompiler analisam e geram
+# código numa só travessia da AST (analyze_and_generate): cada nó devolve
+# (tipo inferido, temporário); havendo erro, quem chama descarta o código. Aplicações são despachadas pelo token do
+# operador na tabela _APPLY, em vez de uma cadeia de comparações.
+class SymbolTable:
+    """
+    Funções de nível superior na ordem em que são definidas. functions
+    (nome -> {'params': ..., 'body': ...}) fica com a última definição de
+    cada nome; duplicates lista os nomes definidos mais de uma vez, na
+    ordem da segunda definição.
+    """
+
+    def __init__(self, forms=()):
+        self.functions = {}
+        self.defuns = []
+        self.duplicates = []
+        for node in forms:
+            if isinstance(node, Node) and node.type == "defun":
+                self.define(node)
 
-def global_codegen_setup(functions):
-    """Prepara tabela de funções para geração de código; reinicia contadores."""
-    reset_codegen()
-    global _codegen_functions
-    _codegen_functions = {}
-    for name, info in functions.items():
-        _codegen_functions[name] = (info['params'], info['body'])
+    def define(self, node):
+        name = node.name
+        if name in self.functions and name not in self.duplicates:
+            self.duplicates.append(name)
+        self.functions[name] = {"params": node.params, "body": node.body}
+        self.defuns.append(node)
 
-def gen_code(node, env):
+    def errors(self):
+        return [f"Função duplicada: {name}" for name in self.duplicates]
+
+_ANY_NONE = ('any', None)
+
+def analyze_and_generate(node, env, code, ctx, errors):
     """
-    node: nó AST
-    env: ambiente mapeando variáveis para temporários ou nomes
-    retorna: (lista_de_linhas_IR, temp_resultante)
+    Análise semântica e geração de código de node numa só travessia.
+    env mapeia as variáveis para os seus nomes no IR, ctx (CodegenContext)
+    traz a tabela de funções e os contadores, e os erros vão para errors.
+    Devolve o temporário com o resultado (None se o nó não produz valor).
     """
-    if not isinstance(node, dict):
-        return ([], None)
+    return _walk(_fused_leaf, _fused_step, node, env, code, ctx, errors)[1]
+
+def _fused_leaf(node, env, code, ctx, errors):
+    """(tipo, temporário) de um nó sem filhos, ou _COMPOUND para os demais."""
+    if not isinstance(node, Node):
+        return _ANY_NONE
 
-    ntype = node.get("type")
+    ntype = node.type
 
     if ntype == "number":
-        t = new_temp()
-        return ([f"{t} = {node['value']}"], t)
+        t = ctx.new_temp()
+        code.append(('copy', t, str(node.value)))
+        return 'number', t
 
     if ntype == "nil":
-        t = new_temp()
-        return ([f"{t} = NIL"], t)
+        t = ctx.new_temp()
+        code.append(('copy', t, 'NIL'))
+        return 'list', t
 
     if ntype == "symbol":
-        tok = node.get("token")
-        lexeme = node.get("lexeme")
-        if tok == 'ID':
+        lexeme = node.lexeme
+        if node.token == 'ID':
             if lexeme in env:
-                return ([], env[lexeme])
+                return 'any', env[lexeme]
+            errors.append(f"Variável não declarada: {lexeme}")
+        t = ctx.new_temp()
+        code.append(('copy', t, lexeme))
+        return 'any', t
+    return _COMPOUND
+
+def _fused_step(node, env, code, ctx, errors):
+    """O passo de um nó com filhos: o gerador do tratador do nó ou do seu operador."""
+    ntype = node.type
+    if ntype == "application":
+        op_node = node.operator
+        if not isinstance(op_node, Node) or op_node.type != "symbol":
+            handler = _fuse_bad_operator
+        elif op_node.token == 'ID':
+            oplex = op_node.lexeme
+            if oplex in ctx.functions:
+                handler = _fuse_call
             else:
-                t = new_temp()
-                return ([f"{t} = {lexeme}"], t)
-        else:
-            t = new_temp()
-            return ([f"{t} = {lexeme}"], t)
-
-    if ntype == "defun":
-        # gera bloco da função
-        name = node["name"]
-        params = node["params"]
-        body = node["body"]
-
-        lines = [f"# função {name}:"]
-        entry = f"func_{name}"
-        lines.append(f"{entry}:")
-        local_env = {}
-        for p in params:
-            local_env[p] = p
-            lines.append(f"# param {p}")
-
-        body_lines, body_temp = gen_code(body, local_env)
-        lines.extend(body_lines)
-        if body_temp:
-            lines.append(f"return {body_temp}")
+                handler = _APPLY.get(builtin_names.get(oplex), _fuse_undefined)
         else:
-            lines.append("return NIL")
-        return (lines, None)
-
+            handler = _APPLY.get(op_node.token, _fuse_callp)
+        return handler(node, env, code, ctx, errors)
     if ntype == "if":
-        cond = node["cond"]
-        then_node = node["then"]
-        else_node = node["else"]
+        return _fuse_if(node, env, code, ctx, errors)
+    return _fuse_defun(node, env, code, ctx, errors)
+
+def _fuse_defun(node, env, code, ctx, errors):
+    code.append(('label', f"func_{node.name}"))
+    local_env = {}
+    for i, p in enumerate(node.params):
+        local_env[p] = var_name(p)
+        code.append(('arg', local_env[p], i))
+    _, body_temp = (yield node.body, local_env)
+    code.append(('return', 'NIL' if body_temp is None else body_temp))
+    return _ANY_NONE
+
+def _fuse_if(node, env, code, ctx, errors):
+    _, cond_temp = (yield node.cond, env)
+
+    L_true = ctx.new_label()
+    L_false = ctx.new_label()
+    L_end = ctx.new_label()
+
+    code.append(('if', cond_temp, L_true))
+    code.append(('goto', L_false))
+
+    code.append(('label', L_true))
+    t_then, then_temp = (yield node.then, env)
+    res_temp = ctx.new_temp()
+    code.append(('copy', res_temp, 'NIL' if then_temp is None else then_temp))
+    code.append(('goto', L_end))
+
+    code.append(('label', L_false))
+    t_else, else_temp = (yield node.else_, env)
+    code.append(('copy', res_temp, 'NIL' if else_temp is None else else_temp))
+
+    code.append(('label', L_end))
+    return (t_then if t_then == t_else else 'any'), res_temp
+
+def _fuse_bad_operator(node, env, code, ctx, errors):
+    errors.append("Operador inválido em aplicação")
+    for a in node.args:
+        yield a, env
+    return _ANY_NONE
+
+def _fuse_call(node, env, code, ctx, errors):
+    """Chamada de função definida pelo usuário: desvia para func_<nome>."""
+    oplex = node.operator.lexeme
+    args = node.args
+    expected = len(ctx.functions[oplex][0])
+    if expected != len(args):
+        errors.append(f"Chamada de '{oplex}' com aridade incorreta: esperado {expected}, obteve {len(args)}")
+    arg_temps = []
+    for a in args:
+        arg_temps.append((yield a, env)[1])
+    for at in arg_temps:
+        code.append(('param', at))
+    res = ctx.new_temp()
+    code.append(('call', res, oplex, len(arg_temps)))
+    return 'any', res
+
+def _fuse_callp(node, env, code, ctx, errors):
+    """Chamada de função não reconhecida (div, mod, exp...)."""
+    arg_temps = []
+    for a in node.args:
+        arg_temps.append((yield a, env)[1])
+    res = ctx.new_temp()
+    code.append(('callp', res, node.operator.lexeme, tuple(arg_temps)))
+    return 'any', res
+
+def _fuse_undefined(node, env, code, ctx, errors):
+    errors.append(f"Função não definida: {node.operator.lexeme}")
+    return (yield from _fuse_callp(node, env, code, ctx, errors))
+
+def _fuse_arith(node, env, code, ctx, errors):
+    op_node = node.operator
+    oplex = op_node.lexeme
+    args = node.args
+    if len(args) != 2:
+        errors.append(f"Operador aritmético '{oplex}' precisa de 2 argumentos (recebeu {len(args)})")
+    t1, left = (yield args[0], env) if len(args) >= 1 else _ANY_NONE
+    t2, right = (yield args[1], env) if len(args) >= 2 else _ANY_NONE
+    if t1 not in ('number', 'any'):
+        errors.append(f"Operador '{oplex}' espera número no 1º argumento")
+    if t2 not in ('number', 'any'):
+        errors.append(f"Operador '{oplex}' espera número no 2º argumento")
+    if len(args) < 2:
+        return 'number', None
+    res = ctx.new_temp()
+    code.append(('binop', res, oplex or op_token_to_symbol(op_node.token), left, right))
+    return 'number', res
+
+def _fuse_compare(node, env, code, ctx, errors):
+    op_node = node.operator
+    args = node.args
+    if len(args) != 2:
+        errors.append(f"Operador de comparação '{op_node.lexeme}' precisa de 2 argumentos")
+        for a in args[:2]:
+            yield a, env
+        return _ANY_NONE
+    _, left = (yield args[0], env)
+    _, right = (yield args[1], env)
+    res = ctx.new_temp()
+    code.append(('binop', res, op_node.lexeme or op_token_to_symbol(op_node.token), left, right))
+    return 'any', res
+
+def _fuse_prim(name, nargs, arg_type, result_type, node, env, code, ctx, errors):
+    """
+    cons, car, cdr e eq: nargs argumentos (só os nargs primeiros são
+    visitados); com arg_type, o argumento tem que ser desse tipo.
+    """
+    args = node.args
+    word = name.lower()
+    if len(args) != nargs:
+        errors.append(f"{word} precisa de {nargs} argumento{'s' if nargs > 1 else ''}")
+    temps = []
+    for a in args[:nargs]:
+        t, temp = (yield a, env)
+        if arg_type is not None and t not in (arg_type, 'any'):
+            errors.append(f"{word} espera uma lista no argumento")
+        temps.append(temp)
+    if len(temps) < nargs:
+        return result_type, None
+    res = ctx.new_temp()
+    code.append(('prim', res, name, tuple(temps)))
+    return result_type, res
+
+# operador -> tratador; IDs de funções do usuário vão para _fuse_call e os
+# nomes de builtin_names são traduzidos para o token antes da consulta
+_APPLY = {
+    **dict.fromkeys(builtin_arith_tokens, _fuse_arith),
+    **dict.fromkeys(builtin_comp_tokens, _fuse_compare),
+    'CONS': partial(_fuse_prim, 'CONS', 2, None, 'list'),
+    'CAR': partial(_fuse_prim, 'CAR', 1, 'list', 'any'),
+    'CDR': partial(_fuse_prim, 'CDR', 1, 'list', 'list'),
+    'EQ': partial(_fuse_prim, 'EQ', 2, None, 'any'),
+}
 
-        code = []
-        cond_code, cond_temp = gen_code(cond, env)
-        code.extend(cond_code)
-
-        L_true = new_label()
-        L_false = new_label()
-        L_end = new_label()
-
-        code.append(f"if {cond_temp} goto {L_true}")
-        code.append(f"goto {L_false}")
-
-        # then
-        code.append(f"{L_true}:")
-        then_code, then_temp = gen_code(then_node, env)
-        code.extend(then_code)
-        res_temp = new_temp()
-        if then_temp:
-            code.append(f"{res_temp} = {then_temp}")
+def op_token_to_symbol(tok):
+    mapping = {
+        'PLUS': '+', 'MINUS': '-', 'TIMES': '*', 'DIV': '/',
+        'LT':'<','GT':'>','LE':'<=','GE':'>=','EQ_OP':'=','NE':'!='
+    }
+    return mapping.get(tok, tok)
+
+def make_parser():
+    """Lexer e parser desta gramática, com as tabelas PLY em cache."""
+    module = sys.modules[__name__]
+    return cached_lexer(module), cached_parser(module)
+
+def make_scanner():
+    """Scanner escrito à mão para esta gramática; substitui o lexer do PLY."""
+    return Scanner.from_module(sys.modules[__name__])
+
+# lexer e parser de cada thread: o parser do PLY guarda a pilha do parse no
+# próprio objeto e o scanner guarda a entrada, então não são compartilhados
+_thread = threading.local()
+
+def _thread_parser():
+    if not hasattr(_thread, 'parser'):
+        _thread.scanner = make_scanner()
+        _thread.parser = cached_parser(sys.modules[__name__])
+    return _thread.scanner, _thread.parser
+
+def compile(source, optimize=True, out=None, profile=False, memory=False, budget=None):
+    """
+    Compila o programa source e devolve o dicionário do programa: "ast",
+    "sem_ok", "errors" ou "ir" (com "partial_eval", "rewrites",
+    "opt_stats" e "regalloc"). Erros de sintaxe dão sem_ok False com as
+    mensagens em "errors". Com profile, o resultado traz também "profile":
+    um CompileStats com o tempo e os contadores de cada fase; memory (que
+    implica profile) acrescenta a memória de cada fase. Com budget
+    (Budget), passar de um limite interrompe a compilação: sem_ok False, a
+    mensagem em "errors" e o limite estourado em "budget".
+
+    Pode ser chamada ao mesmo tempo de várias threads ou tarefas asyncio:
+    cada chamada tem a sua Compilation (contadores, tabela de funções e
+    cópias de partial_evaluator/rewriter/optimizer/allocator) e cada thread
+    o seu lexer e parser.
+    out recebe o mesmo relatório que parser.parse imprime (None: nada).
+    """
+    profile = profile or memory
+    comp = Compilation(out=out, stats=CompileStats(memory) if profile else None,
+                       budget=budget)
+    if optimize and partial_evaluator is not None:
+        comp.partial = PartialEvaluator(partial_evaluator.fuel, partial_evaluator.total_fuel)
+    if optimize and rewriter is not None:
+        comp.rewriter = RewriteEngine(rewriter.rules)
+    if optimize and optimizer is not None:
+        comp.optimizer = PassManager(optimizer.pipeline, optimizer.max_rounds)
+    if optimize and allocator is not None:
+        comp.allocator = RegisterAllocator(allocator.num_registers)
+
+    scanner, parser = _thread_parser()
+    scanner.errors = comp.syntax_errors  # caracteres inválidos também contam
+    if budget is not None and budget.max_nodes is not None:
+        comp.nodes = BudgetNodeTable(budget.max_nodes)
+    tracing = memory or (budget is not None and budget.max_bytes is not None)
+    if tracing:
+        _start_tracing()
+    exceeded = None
+    token = _current.set(comp)
+    try:
+        if not profile and budget is None:
+            result = parser.parse(source, lexer=scanner)
         else:
-            code.append(f"{res_temp} = NIL")
-        code.append(f"goto {L_end}")
-
-        # else
-        code.append(f"{L_false}:")
-        else_code, else_temp = gen_code(else_node, env)
-        code.extend(else_code)
-        if else_temp:
-            code.append(f"{res_temp} = {else_temp}")
+            stats = comp.stats
+            if budget is not None and tracemalloc.is_tracing():
+                comp.memory_base = tracemalloc.get_traced_memory()[0]
+            if stats is not None:
+                stats.start()
+                tokens = scanner.input_all(source)
+                stats.lap("lex", chars=len(source), tokens=tokens)
+                result = parser.parse(None, lexer=scanner)
+                stats.lap("parse", forms=len(result) if isinstance(result, list) else 0)
+            else:
+                result = parser.parse(source, lexer=scanner)
+            if isinstance(result, list):
+                if stats is not None:
+                    stats.note(nodes=count_nodes(result))
+                if budget is not None:
+                    comp.check_budget("parse")
+                    # os nós da avaliação parcial e das regras não contam
+                    comp.nodes = NodeTable()
+                result = compile_program(result, comp)
+    except BudgetExceeded as e:
+        exceeded = e
+        comp.log(str(e))
+    finally:
+        _current.reset(token)
+        if tracing:
+            _stop_tracing()
+
+    if exceeded is not None:
+        result = {"type": "program", "ast": None, "sem_ok": False,
+                  "errors": [str(exceeded)], "budget": exceeded.as_dict()}
+    elif comp.syntax_errors or not isinstance(result, dict):
+        result = {"type": "program", "ast": None, "sem_ok": False,
+                  "errors": comp.syntax_errors or ["Erro de sintaxe: programa vazio"]}
+    if profile:
+        result["profile"] = comp.stats
+    return result
+
+
+# COMPILAÇÃO EM FLUXO
+#
+# Em vez de montar a AST do programa inteiro, lê a entrada aos poucos,
+# separa cada form de nível superior quando os parênteses se fecham e já
+# analisa e gera o IR daquele form. Só a tabela de funções (nome e
+# parâmetros) sobrevive entre forms, então a memória não cresce com o
+# tamanho do programa. Diferenças em relação a parser.parse: uma função só
+# pode ser chamada depois da sua definição (ou dentro dela mesma), e o IR
+# sai sem otimização nem alocação de registradores, que precisam do
+# programa inteiro.
+_FORM_PIECES = re.compile(r'[()]|;[^\n]*|\s+|[^\s();]+')
+
+def iter_forms(stream, chunk_size=1 << 16):
+    """
+    Gera o texto de cada form de nível superior lido de stream (arquivo
+    texto), sem comentários. Lê no máximo chunk_size caracteres por vez;
+    parênteses sem par saem como um form próprio para o parser acusar.
+    """
+    depth = 0
+    form = []
+    carry = ''
+    for chunk in iter(partial(stream.readline, chunk_size), ''):
+        pieces = _FORM_PIECES.findall(carry + chunk)
+        # átomo ou comentário no fim do pedaço pode continuar no próximo
+        last = pieces[-1] if pieces else ''
+        carry = pieces.pop() if last and last[0] not in '()' and not last.isspace() else ''
+        for piece in pieces:
+            c = piece[0]
+            if c == '(':
+                depth += 1
+                form.append(piece)
+            elif c == ')':
+                if depth == 0:
+                    yield piece
+                    continue
+                depth -= 1
+                form.append(piece)
+                if depth == 0:
+                    yield ''.join(form)
+                    form = []
+            elif c == ';':
+                if depth:
+                    form.append(' ')
+            elif piece.isspace():
+                if depth:
+                    form.append(piece)
+            elif depth:
+                form.append(piece)
+            else:
+                yield piece
+    if carry and carry[0] != ';':
+        if depth:
+            form.append(carry)
         else:
-            code.append(f"{res_temp} = NIL")
+            yield carry
+    if form:
+        yield ''.join(form)  # parênteses não fechados: EOF inesperado
 
-        code.append(f"{L_end}:")
-        return (code, res_temp)
 
-    if ntype == "application":
-        op_node = node["operator"]
-        args = node["args"]
-
-        if not isinstance(op_node, dict) or op_node.get("type") != "symbol":
-            return (["# erro: operador inválido"], None)
-
-        optoken = op_node.get("token")
-        oplex = op_node.get("lexeme")
-
-        # chamada de função definida pelo usuário
-        if optoken == 'ID' and oplex in _codegen_functions:
-            params, body = _codegen_functions[oplex]
-            code = []
-            arg_temps = []
-            for a in args:
-                a_code, a_temp = gen_code(a, env)
-                code.extend(a_code)
-                arg_temps.append(a_temp)
-            for p, at in zip(params, arg_temps):
-                code.append(f"{p} = {at}  # param")
-            local_env = {p: p for p in params}
-            body_lines, body_temp = gen_code(body, local_env)
-            code.extend(body_lines)
-            res = new_temp()
-            if body_temp:
-                code.append(f"{res} = {body_temp}  # resultado {oplex}")
-            else:
-                code.append(f"{res} = NIL  # resultado {oplex}")
-            return (code, res)
-
-        # built-ins aritméticos
-        if optoken in {'PLUS','MINUS','TIMES','DIV'}:
-            code = []
-            left_code, left_temp = gen_code(args[0], env)
-            right_code, right_temp = gen_code(args[1], env)
-            code.extend(left_code)
-            code.extend(right_code)
-            res = new_temp()
-            op_symbol = op_node.get("lexeme") or op_token_to_symbol(optoken)
-            code.append(f"{res} = {left_temp} {op_symbol} {right_temp}")
-            return (code, res)
-
-        # comparações
-        if optoken in {'LT','GT','LE','GE','EQ_OP','NE'}:
-            code = []
-            left_code, left_temp = gen_code(args[0], env)
-            right_code, right_temp = gen_code(args[1], env)
-            code.extend(left_code); code.extend(right_code)
-            res = new_temp()
-            op_symbol = op_node.get("lexeme") or op_token_to_symbol(optoken)
-            code.append(f"{res} = {left_temp} {op_symbol} {right_temp}")
-            return (code, res)
-
-        # cons, car, cdr, eq
-        if optoken == 'CONS' or (optoken == 'ID' and oplex == 'cons'):
-            code = []
-            a1_code, a1_temp = gen_code(args[0], env)
-            a2_code, a2_temp = gen_code(args[1], env)
-            code.extend(a1_code); code.extend(a2_code)
-            res = new_temp()
-            code.append(f"{res} = CONS({a1_temp}, {a2_temp})")
-            return (code, res)
-
-        if optoken == 'CAR' or (optoken == 'ID' and oplex == 'car'):
-            code = []
-            a_code, a_temp = gen_code(args[0], env)
-            code.extend(a_code)
-            res = new_temp()
-            code.append(f"{res} = CAR({a_temp})")
-            return (code, res)
-
-        if optoken == 'CDR' or (optoken == 'ID' and oplex == 'cdr'):
-            code = []
-            a_code, a_temp = gen_code(args[0], env)
-            code.extend(a_code)
-            res = new_temp()
-            code.append(f"{res} = CDR({a_temp})")
-            return (code, res)
-
-        if optoken == 'EQ' or (optoken == 'ID' and oplex == 'eq'):
-            code = []
-            a1_code, a1_temp = gen_code(args[0], env)
-            a2_code, a2_temp = gen_code(args[1], env)
-            code.extend(a1_code); code.extend(a2_code)
-            res = new_temp()
-            code.append(f"{res} = EQ({a1_temp}, {a2_temp})")
-            return (code, res)
-
-        # chamada de função não reconhecida
-        if optoken == 'ID':
-            code = []
-            arg_temps = []
-            for a in args:
-                a_code, a_temp = gen_code(a, env)
-                code.extend(a_code)
-                arg_temps.append(a_temp)
-            res = new_temp()
-            code.append(f"{res} = CALL({oplex}, {', '.join(arg_temps)})")
-            return (code, res)
-
-        # fallback
-        code = []
-        arg_temps = []
-        for a in args:
-            a_code, a_temp = gen_code(a, env)
-            code.extend(a_code)
-            arg_temps.append(a_temp)
-        res = new_temp()
-        code.append(f"{res} = CALL({oplex}, {', '.join(arg_temps)})")
-        return (code, res)
+class StreamCompiler:
+    """
+    Compila forms de nível superior um a um, mantendo a tabela de funções
+    já definidas. compile_form devolve o IR do form (IRBuffer); finish
+    devolve o 'return' final com o valor da última expressão.
+    Depois do primeiro erro, os forms seguintes ainda são analisados (para
+    relatar todos os erros) mas não geram mais código. Os erros, inclusive
+    os de sintaxe e de caractere inválido, ficam em errors: nada é escrito
+    junto com o IR.
+    """
 
-    return (["# Nó desconhecido para geração de código"], None)
+    def __init__(self):
+        self.scanner = make_scanner()
+        self.parser = cached_parser(sys.modules[__name__], start='expr')
+        self.functions = {}
+        self.codegen = CodegenContext()
+        self.errors = []
+        self.forms = 0
+        self.last_res = None
+
+    def compile_form(self, source):
+        self.forms += 1
+        # uma NodeTable por form: a memória não cresce com o programa
+        comp = Compilation()
+        self.scanner.errors = comp.syntax_errors
+        token = _current.set(comp)
+        try:
+            node = self.parser.parse(source, lexer=self.scanner)
+        finally:
+            _current.reset(token)
+        if comp.syntax_errors or node is None:
+            self.errors.extend(f"form {self.forms}: {e}"
+                               for e in comp.syntax_errors or ["Erro de sintaxe"])
+            return []
+
+        errors = []
+        if node.type == "defun":
+            name = node.name
+            if name in self.functions:
+                errors.append(f"Função duplicada: {name}")
+            # registrada antes do corpo para permitir recursão
+            self.functions[name] = {"params": node.params}
+            self.codegen.functions[name] = (node.params, None)
+        code = IRBuffer()
+        res = analyze_and_generate(node, {}, code, self.codegen, errors)
+        self.errors.extend(f"form {self.forms}: {e}" for e in errors)
+        if self.errors:
+            return []
+
+        if node.type != "defun":
+            self.last_res = res
+        return code
+
+    def finish(self):
+        code = IRBuffer()
+        if not self.errors and self.last_res is not None:
+            code.append(('return', self.last_res))
+        return code
+
+
+def compile_stream(stream, out):
+    """
+    Compila o programa lido de stream escrevendo o IR em out à medida que
+    cada form termina. Devolve o StreamCompiler (funções, erros, forms).
+    """
+    compiler = StreamCompiler()
+    for source in iter_forms(stream):
+        code = compiler.compile_form(source)
+        for l in format_ir(code):
+            out.write(l + '\n')
+    for l in format_ir(compiler.finish()):
+        out.write(l + '\n')
+    out.flush()
+    return compiler
+
+# COMPILAÇÃO INCREMENTAL
+#
+# Cada form de nível superior é identificado pelo hash do seu texto. Para
+# cada um ficam guardados (em memória e em disco) a AST, os erros e o IR
+# gerado com contadores próprios (temporários e rótulos a partir de 0),
+# junto com a aridade, na hora da análise, de cada função que o form chama
+# (None se não estava definida). Ao recompilar, só são analisados e
+# gerados de novo os forms cujo texto mudou e os que chamam uma função cuja
+# assinatura mudou (definida, removida ou com outra aridade); o resto vem do
+# cache. A montagem desloca temporários e rótulos de cada form (o trecho
+# inicial que não mudou é copiado da montagem anterior), e o IR final é o
+# mesmo de compile(source, optimize=False).
+INCREMENTAL_CACHE_DIR = '__ircache__'
+
+_FORM_BOUNDS = re.compile(r'[()]|;[^\n]*')
+_TOP_ATOMS = re.compile(r';[^\n]*|([^\s();]+)')
+
+def split_forms(source):
+    """
+    Textos dos forms de nível superior de source, como iter_forms, mas sobre
+    o texto inteiro em memória: só parênteses e comentários são visitados
+    e cada form sai como um pedaço de source (com comentários internos).
+    """
+    forms = []
+    depth = 0
+    start = top = 0
+    for m in _FORM_BOUNDS.finditer(source):
+        c = source[m.start()]
+        if c == ';':
+            continue
+        if c == '(':
+            if depth == 0:
+                forms.extend(a for a in _TOP_ATOMS.findall(source, top, m.start()) if a)
+                start = m.start()
+            depth += 1
+        elif depth == 0:
+            forms.extend(a for a in _TOP_ATOMS.findall(source, top, m.start()) if a)
+            forms.append(')')
+            top = m.end()
+        else:
+            depth -= 1
+            if depth == 0:
+                forms.append(source[start:m.end()])
+                top = m.end()
+    if depth:
+        forms.append(source[start:])  # parênteses não fechados: EOF inesperado
+    else:
+        forms.extend(a for a in _TOP_ATOMS.findall(source, top) if a)
+    return forms
+
+def _form_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def _relocate(ins, dt, dl):
+    """Instrução do IR de um form com os temporários somados de dt e os rótulos Ln de dl."""
+    kind = ins[0]
+    if kind == 'copy':
+        d, a = ins[1], ins[2]
+        return ('copy', d + dt, a + dt if a.__class__ is int else a)
+    if kind == 'binop':
+        a, b = ins[3], ins[4]
+        return ('binop', ins[1] + dt, ins[2],
+                a + dt if a.__class__ is int else a, b + dt if b.__class__ is int else b)
+    if kind == 'label':
+        name = ins[1]
+        return ins if name.startswith('func_') else ('label', f"L{int(name[1:]) + dl}")
+    if kind == 'goto':
+        return ('goto', f"L{int(ins[1][1:]) + dl}")
+    if kind == 'if':
+        c = ins[1]
+        return ('if', c + dt if c.__class__ is int else c, f"L{int(ins[2][1:]) + dl}")
+    if kind == 'return' or kind == 'param':
+        v = ins[1]
+        return (kind, v + dt) if v.__class__ is int else ins
+    if kind == 'call':
+        return ('call', ins[1] + dt, ins[2], ins[3])
+    if kind == 'arg':
+        return ins
+    # prim e callp: operandos numa tupla
+    return (kind, ins[1] + dt, ins[2],
+            tuple(a + dt if a.__class__ is int else a for a in ins[3]))
+
+
+class IncrementalCompiler:
+    """
+    Compilador incremental de um programa que é editado e recompilado
+    várias vezes. cache_path é o arquivo do cache em disco (None: só em
+    memória). compile(source) devolve o mesmo dicionário que compile(),
+    mais "stats" com forms, reaproveitados e compilados. Não há avaliação
+    parcial nem regras de reescrita (elas precisam do programa inteiro de
+    uma vez), só otimização e alocação de registradores com optimize.
+    """
 
-def op_token_to_symbol(tok):
-    mapping = {
-        'PLUS': '+', 'MINUS': '-', 'TIMES': '*', 'DIV': '/',
-        'LT':'<','GT':'>','LE':'<=','GE':'>=','EQ_OP':'=','NE':'!='
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.version = grammar_key(sys.modules[__name__])
+        self.entries = {}   # hash -> entrada já carregada
+        self.stored = {}    # hash -> entrada serializada (lida do disco)
+        self._assembled = (None, [])  # última montagem: IR e (ir do form, posição) por form
+        self.scanner = make_scanner()
+        self.parser = cached_parser(sys.modules[__name__], start='expr')
+        self._load()
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return  # cache ilegível: recompila tudo
+        if isinstance(data, dict) and data.get("version") == self.version:
+            self.stored = data["entries"]
+
+    def _save(self, used):
+        if not self.cache_path:
+            return
+        entries = {}
+        for h in used:
+            blob = self.stored.get(h)
+            if blob is None:
+                entry = self.entries[h]
+                if entry["ast"] is not None:
+                    # os nós da AST vão no formato binário de serializacao.py
+                    entry = dict(entry, ast=serializacao.dumps_ast(entry["ast"]))
+                try:
+                    blob = marshal.dumps(entry)
+                except ValueError:
+                    continue  # aninhamento além do limite do marshal: só em memória
+                self.stored[h] = blob
+            entries[h] = blob
+        self.stored = entries
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'wb') as f:
+            marshal.dump({"version": self.version, "entries": entries}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _entry(self, h, text):
+        entry = self.entries.get(h)
+        if entry is None:
+            blob = self.stored.get(h)
+            if blob is not None:
+                entry = marshal.loads(blob)
+                if entry["ast"] is not None:
+                    entry["ast"] = serializacao.loads(entry["ast"])
+            else:
+                entry = self._parse(text)
+            self.entries[h] = entry
+        return entry
+
+    def _parse(self, text):
+        comp = Compilation()
+        self.scanner.errors = comp.syntax_errors
+        token = _current.set(comp)
+        try:
+            node = self.parser.parse(text, lexer=self.scanner)
+        finally:
+            _current.reset(token)
+        if comp.syntax_errors or node is None:
+            return {"ast": None, "errors": comp.syntax_errors or ["Erro de sintaxe"],
+                    "calls": None}
+        return {"ast": node, "errors": None, "calls": None}
+
+    def _analyze(self, entry, signatures, ctx):
+        """Análise semântica e geração de código de um form, com os contadores de ctx zerados."""
+        node = entry["ast"]
+        errors = []
+        ctx.reset()
+        code = []
+        result = analyze_and_generate(node, {}, code, ctx, errors)
+        entry["errors"] = errors
+        entry["calls"] = {name: signatures.get(name) for name in called_names(node)}
+        entry["ir"] = entry["temps"] = entry["labels"] = entry["result"] = None
+        if not errors:
+            entry["result"] = result
+            entry["ir"] = code
+            entry["temps"] = ctx.temp_counter
+            entry["labels"] = ctx.label_counter
+
+    def compile(self, source, optimize=False):
+        forms = [(_form_hash(text), text) for text in split_forms(source)]
+        entries = [self._entry(h, text) for h, text in forms]
+
+        asts = [e["ast"] for e in entries if e["ast"] is not None]
+        symbols = SymbolTable(asts)
+        functions = symbols.functions
+        signatures = {name: len(info["params"]) for name, info in functions.items()}
+
+        compiled = 0
+        ctx = None
+        for h, entry in {h: e for (h, _), e in zip(forms, entries)}.items():
+            if entry["ast"] is None:
+                continue
+            calls = entry["calls"]
+            if calls is None or any(signatures.get(n) != a for n, a in calls.items()):
+                if ctx is None:
+                    ctx = CodegenContext(functions)
+                self._analyze(entry, signatures, ctx)
+                self.stored.pop(h, None)  # a versão em disco ficou velha
+                compiled += 1
+        self._save([h for h, _ in forms])
+        self.entries = {h: self.entries[h] for h, _ in forms}
+
+        stats = {"forms": len(forms), "compiled": compiled, "reused": len(forms) - compiled}
+        # como em compile(): havendo erro de sintaxe, só ele é relatado
+        errors = [e for entry in entries if entry["ast"] is None for e in entry["errors"]]
+        if not errors:
+            errors = symbols.errors() + [e for entry in entries for e in entry["errors"]]
+        if errors:
+            return {"type": "program", "ast": asts, "sem_ok": False, "errors": errors,
+                    "stats": stats}
+
+        # as instruções dos forms que abrem o programa como na montagem
+        # anterior (o mesmo IR nas mesmas posições) são copiadas de lá
+        keep = 0
+        for entry, (ir, _) in zip(entries, self._assembled[1]):
+            if entry["ir"] is not ir:
+                break
+            keep += 1
+        marks = self._assembled[1][:keep]
+        code = self._assembled[0].truncated(marks[-1][1]) if keep else IRBuffer()
+        dt = dl = 0
+        last_res = None
+        for i, entry in enumerate(entries):
+            if i < keep:
+                pass
+            elif dt or dl:
+                for ins in entry["ir"]:
+                    code.append(_relocate(ins, dt, dl))
+            else:
+                for ins in entry["ir"]:
+                    code.append(ins)
+            if entry["ast"].type != "defun":
+                res = entry["result"]
+                last_res = res + dt if res.__class__ is int else res
+            dt += entry["temps"]
+            dl += entry["labels"]
+            if i >= keep:
+                marks.append((entry["ir"], code.mark()))
+        self._assembled = (code, marks)
+        code = code.truncated(code.mark())
+        if last_res is not None:
+            code.append(('return', last_res))
+
+        result = {"type": "program", "ast": asts, "sem_ok": True, "ir": code,
+                  "opt_stats": None, "regalloc": None, "stats": stats}
+        if optimize and optimizer is not None:
+            opt = PassManager(optimizer.pipeline, optimizer.max_rounds)
+            code = opt.run(code)
+            result["opt_stats"] = [opt.stats[name].as_dict() for name in opt.pipeline]
+        if optimize and allocator is not None:
+            alloc = RegisterAllocator(allocator.num_registers)
+            code = alloc.run(code)
+            result["regalloc"] = [st.as_dict() for st in alloc.stats]
+        if optimize:
+            result["ir"] = IRBuffer(code)
+        return result
+
+def incremental_cache_path(path):
+    """Arquivo de cache incremental do fonte path: __ircache__/ ao lado dele."""
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), INCREMENTAL_CACHE_DIR)
+    return os.path.join(folder, os.path.basename(path) + '.marshal')
+
+# COMPILAÇÃO EM LOTE
+#
+# Muitos arquivos compilados num pool de processos, com um objeto JSON por
+# arquivo (uma linha cada, JSON Lines): AST, erros, IR e tempos.
+def find_sources(paths, ext='.lisp'):
+    """Arquivos de paths; diretórios são percorridos atrás de *ext."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(ext):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def parse_size(text):
+    """Tamanho em bytes de um texto como '512', '64K', '1.5M' ou '2G'."""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamanho inválido: {text!r}") from None
+
+def compile_file(path, optimize=True, profile=False, memory=False, budget=None):
+    """
+    Compila o arquivo path e devolve (linha JSON, ok, linhas do fonte). O
+    JSON é montado aqui, no processo que compilou; com profile ou memory ele
+    traz as fases da compilação em "profile", e se o orçamento budget
+    estourar, o limite excedido em "budget". Um arquivo ilegível (ou que
+    não pôde ser compilado) dá um registro com as mesmas chaves, com null no
+    que não foi produzido.
+    """
+    def failure(message, lines, timing):
+        record = {
+            "file": path,
+            "ok": False,
+            "lines": lines,
+            "ast": None,
+            "errors": [message],
+            "ir": None,
+            "partial_eval": None,
+            "rewrites": None,
+            "opt_stats": None,
+            "regalloc": None,
+            "timing": timing,
+        }
+        if profile or memory:
+            record["profile"] = None
+        return json.dumps(record, ensure_ascii=False), False, lines
+
+    start = time.perf_counter()
+    try:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return failure(f"Erro de leitura: {e}", 0,
+                       {"read": time.perf_counter() - start, "compile": None})
+    read_time = time.perf_counter() - start
+    lines = len(source.splitlines())
+
+    start = time.perf_counter()
+    try:
+        result = compile(source, optimize=optimize, profile=profile, memory=memory,
+                         budget=budget)
+    except (RecursionError, MemoryError) as e:
+        # um arquivo não derruba o lote inteiro (no --batch, o pool.map)
+        return failure(f"Erro interno: {type(e).__name__}: {e}", lines,
+                       {"read": read_time, "compile": time.perf_counter() - start})
+    compile_time = time.perf_counter() - start
+
+    ir = result.get("ir")
+    record = {
+        "file": path,
+        "ok": result["sem_ok"],
+        "lines": lines,
+        "ast": result["ast"],
+        "errors": result.get("errors", []),
+        "ir": format_ir(ir) if ir is not None else None,
+        "partial_eval": result.get("partial_eval"),
+        "rewrites": result.get("rewrites"),
+        "opt_stats": result.get("opt_stats"),
+        "regalloc": result.get("regalloc"),
+        "timing": {"read": read_time, "compile": compile_time},
     }
-    return mapping.get(tok, tok)
+    if profile or memory:
+        record["profile"] = result["profile"].as_dict()
+    if "budget" in result:
+        record["budget"] = result["budget"]
+    # a AST pode ser mais funda que o limite de recursão do json.dumps
+    return dumps_json(record), result["sem_ok"], lines
+
+def compile_files(paths, out, jobs=None, optimize=True, profile=False, memory=False,
+                  budget=None):
+    """
+    Compila os arquivos de paths em até jobs processos (None: um por CPU),
+    escrevendo em out uma linha JSON por arquivo, na ordem de paths.
+    Devolve (arquivos, linhas, falhas, segundos).
+    """
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    files = lines = failed = 0
+    if jobs == 1 or len(paths) < 2:
+        results = (compile_file(p, optimize, profile, memory, budget) for p in paths)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(jobs)
+        # lotes de arquivos por tarefa diluem o custo de comunicação
+        chunk = max(1, min(64, len(paths) // (jobs * 8)))
+        n = len(paths)
+        results = pool.map(compile_file, paths, [optimize] * n, [profile] * n,
+                           [memory] * n, [budget] * n, chunksize=chunk)
+    try:
+        for line, ok, n in results:
+            out.write(line + '\n')
+            files += 1
+            lines += n
+            failed += not ok
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    out.flush()
+    return files, lines, failed, time.perf_counter() - start
 
 # dados de teste
 if __name__ == "__main__":
-    lexer = lex.lex()
-    parser = yacc.yacc()
+    cli = argparse.ArgumentParser(
+        description="Compila S-expressões para código de 3 endereços.")
+    cli.add_argument('paths', nargs='*',
+                     help="arquivos ou diretórios ('-' lê da entrada padrão)")
+    cli.add_argument('--batch', action='store_true',
+                     help="compila cada arquivo em um pool de processos e escreve "
+                          "uma linha JSON por arquivo")
+    cli.add_argument('-j', '--jobs', type=int, default=None,
+                     help="processos do modo --batch (padrão: um por CPU)")
+    cli.add_argument('-o', '--output', help="arquivo de saída do modo --batch")
+    cli.add_argument('--ext', default='.lisp',
+                     help="extensão procurada nos diretórios (padrão: .lisp)")
+    cli.add_argument('--no-optimize', action='store_true',
+                     help="sem avaliação parcial, regras de reescrita, otimização "
+                          "nem alocação de registradores")
+    cli.add_argument('--incremental', action='store_true',
+                     help="recompila só os forms alterados, com cache em "
+                          f"{INCREMENTAL_CACHE_DIR}/ ao lado de cada arquivo")
+    cli.add_argument('--profile', action='store_true',
+                     help="mede o tempo e os contadores de cada fase (lex, parse, "
+                          "semantic+codegen, partial_eval, rewrite, codegen, optimize, "
+                          "regalloc); no modo --batch vão "
+                          "no JSON, senão cada arquivo é compilado inteiro e o "
+                          "relatório sai na saída de erro")
+    cli.add_argument('--memory', action='store_true',
+                     help="como --profile, e também o pico de memória, a memória "
+                          "retida e as linhas que mais alocaram em cada fase")
+    cli.add_argument('--max-nodes', type=int, help="interrompe se a AST passar de N nós")
+    cli.add_argument('--max-ir', type=int, help="interrompe se o IR passar de N instruções")
+    cli.add_argument('--max-bytes', type=parse_size,
+                     help="interrompe se a compilação alocar mais que isso "
+                          "(aceita os sufixos K, M e G)")
+    args = cli.parse_args()
+    budget = None
+    if args.max_nodes is not None or args.max_ir is not None or args.max_bytes is not None:
+        budget = Budget(args.max_nodes, args.max_ir, args.max_bytes)
+
+    # --incremental: escreve o IR de cada arquivo e, na saída de erro,
+    # quantos forms foram reaproveitados do cache
+    if args.incremental:
+        status = 0
+        for path in find_sources(args.paths, args.ext):
+            start = time.perf_counter()
+            with open(path, encoding='utf-8') as f:
+                source = f.read()
+            compiler = IncrementalCompiler(incremental_cache_path(path))
+            result = compiler.compile(source, optimize=not args.no_optimize)
+            elapsed = time.perf_counter() - start
+            if result["sem_ok"]:
+                for l in format_ir(result["ir"]):
+                    print(l)
+            else:
+                status = 1
+                for e in result["errors"]:
+                    print(f"{path}: {e}", file=sys.stderr)
+            st = result["stats"]
+            print(f"{path}: {st['forms']} forms, {st['reused']} do cache, "
+                  f"{st['compiled']} compilados em {elapsed * 1000:.1f} ms", file=sys.stderr)
+        sys.exit(status)
+
+    # --batch: python codigo_intermediario.py --batch -j 8 -o ir.jsonl fontes/
+    if args.batch:
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            files, lines, failed, elapsed = compile_files(
+                find_sources(args.paths, args.ext), out, args.jobs,
+                optimize=not args.no_optimize, profile=args.profile,
+                memory=args.memory, budget=budget)
+        finally:
+            if args.output:
+                out.close()
+        print(f"{files} arquivos ({failed} com erro), {lines} linhas em {elapsed:.2f} s: "
+              f"{files / elapsed:.1f} arquivos/s, {lines / elapsed:.0f} linhas/s",
+              file=sys.stderr)
+        sys.exit(1 if failed else 0)
+
+    # --profile: python codigo_intermediario.py --profile arquivo.lisp
+    # (--memory e os limites de orçamento também compilam cada arquivo inteiro)
+    if (args.profile or args.memory or budget is not None) and args.paths:
+        status = 0
+        for path in args.paths:
+            if path == '-':
+                source = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8') as f:
+                    source = f.read()
+            result = compile(source, optimize=not args.no_optimize,
+                             profile=args.profile, memory=args.memory, budget=budget)
+            if result["sem_ok"]:
+                for l in format_ir(result["ir"]):
+                    print(l)
+            else:
+                status = 1
+                for e in result["errors"]:
+                    print(f"{path}: {e}", file=sys.stderr)
+            if "profile" in result:
+                print(f"=== FASES: {path} ===", file=sys.stderr)
+                for l in result["profile"].report():
+                    print(l, file=sys.stderr)
+        sys.exit(status)
+
+    # python codigo_intermediario.py arquivo.lisp   (ou '-' para stdin):
+    # compila em fluxo e escreve o IR na saída padrão
+    if args.paths:
+        status = 0
+        for path in args.paths:
+            if path == '-':
+                compiler = compile_stream(sys.stdin, sys.stdout)
+            else:
+                with open(path) as f:
+                    compiler = compile_stream(f, sys.stdout)
+            for e in compiler.errors:
+                print(f"{path}: {e}", file=sys.stderr)
+            if compiler.errors:
+                status = 1
+        sys.exit(status)
+
+    lexer, parser = make_parser()
 
     data = """
     (defun soma (x y)
@@ -677,7 +1776,7 @@ if __name__ == "__main__":
         print(tok)
 
     print("\n=== PARSE & PROCESS (AST + SEMÂNTICA + IR) ===")
-    result = parser.parse(data)
+    result = parser.parse(data, lexer=lexer)
 
     if isinstance(result, dict):
         if not result.get("sem_ok"):
@@ -0,0 +1,500 @@
+# ir.py
+# Representação do código de 3-endereços gerado por analyze_and_generate.
+#
+# analyze_and_generate acrescenta as instruções em um IRBuffer (estrutura
+# de arrays compacta). Os passes de otimização trabalham com a visão em tuplas, cujo
+# primeiro campo é o tipo da instrução:
+#   ('label', L)                  L:
+#   ('goto', L)                   goto L
+#   ('if', c, L)                  if c goto L
+#   ('return', a)                 return a
+#   ('param', a)                  param a
+#   ('call', d, f, n)             d = call f, n
+#   ('arg', d, i)                 d = arg i
+#   ('binop', d, op, a, b)        d = a op b
+#   ('prim', d, NOME, (a, ...))   d = CONS(a, b) | CAR(a) | CDR(a) | EQ(a, b)
+#   ('callp', d, f, (a, ...))     d = CALL(f, a, ...)
+#   ('copy', d, a)                d = a
+# Operandos são texto: temporários (tN), variáveis (v_nome, ver var_name) ou
+# constantes. O formato textual (format_ir / parse_ir) serve apenas para
+# exibição e leitura.
+import re
+import struct
+from array import array
+
+_re_label = re.compile(r'^(\w+):$')
+_re_if = re.compile(r'^if (\S+) goto (\w+)$')
+_re_goto = re.compile(r'^goto (\w+)$')
+_re_return = re.compile(r'^return (\S+)$')
+_re_param = re.compile(r'^param (\S+)$')
+_re_call = re.compile(r'^(\S+) = call (\w+), (\d+)$')
+_re_arg = re.compile(r'^(\S+) = arg (\d+)$')
+_re_binop = re.compile(r'^(\S+) = (\S+) (<=|>=|!=|[-+*/<>=]) (\S+)$')
+_re_builtin = re.compile(r'^(\S+) = (CONS|CAR|CDR|EQ|CALL)\((.*)\)$')
+_re_assign = re.compile(r'^(\S+) = (\S+)$')
+_re_number = re.compile(r'^-?\d+(\.\d+)?$')
+_re_name = re.compile(r'^[A-Za-z_]\w*$')
+_re_temp = re.compile(r'^t\d+$')
+
+BINOP_SYMBOLS = ('+', '-', '*', '/', '<', '>', '<=', '>=', '=', '!=')
+
+# palavras que aparecem como átomos no IR mas não são variáveis
+SYMBOL_ATOMS = {
+    'defun', 'if', 'cond', 'car', 'cdr', 'cons', 'eq', 'div', 'mod', 'exp',
+}
+
+# instruções sem efeito colateral: podem ser removidas se o destino não for usado
+PURE_KINDS = {'copy', 'binop', 'prim', 'callp'}
+
+
+class IRError(Exception):
+    """Linha de código intermediário mal formada."""
+
+
+def constant_value(text):
+    """Retorna (True, valor) se o operando for uma constante, senão (False, None)."""
+    if _re_number.match(text):
+        return True, (float(text) if '.' in text else int(text))
+    if text in ('NIL', 'nil'):
+        return True, None
+    if text == 't':
+        return True, True
+    if not _re_name.match(text) or text in SYMBOL_ATOMS:
+        # átomos como '+' ou 'cond' viram símbolos (strings)
+        return True, text
+    return False, None
+
+
+def is_constant(text):
+    return constant_value(text)[0]
+
+
+def is_temp(text):
+    return bool(_re_temp.match(text))
+
+
+def var_name(name):
+    """
+    Operando de IR da variável name do programa. O prefixo impede que uma
+    variável chamada t0 ou NIL seja lida como temporário ou constante.
+    """
+    return f"v_{name}"
+
+
+def format_constant(value):
+    """Texto do operando para um valor constante, ou None se não representável."""
+    if value is None or value is False:
+        return 'nil'
+    if value is True:
+        return 't'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        text = repr(value)
+        return text if _re_number.match(text) else None
+    if isinstance(value, str):
+        return value
+    return None
+
+
+def parse_line(line):
+    """Converte uma linha de IR em tupla; comentários e linhas vazias dão None."""
+    line = line.split('#', 1)[0].strip()
+    if not line:
+        return None
+
+    m = _re_label.match(line)
+    if m:
+        return ('label', m.group(1))
+    m = _re_if.match(line)
+    if m:
+        return ('if', m.group(1), m.group(2))
+    m = _re_goto.match(line)
+    if m:
+        return ('goto', m.group(1))
+    m = _re_return.match(line)
+    if m:
+        return ('return', m.group(1))
+    m = _re_param.match(line)
+    if m:
+        return ('param', m.group(1))
+    m = _re_call.match(line)
+    if m:
+        return ('call', m.group(1), m.group(2), int(m.group(3)))
+    m = _re_arg.match(line)
+    if m:
+        return ('arg', m.group(1), int(m.group(2)))
+    m = _re_binop.match(line)
+    if m:
+        dst, left, op, right = m.groups()
+        return ('binop', dst, op, left, right)
+    m = _re_builtin.match(line)
+    if m:
+        dst, name, inner = m.groups()
+        operands = [x.strip() for x in inner.split(',')]
+        operands = [x for x in operands if x]
+        if name == 'CALL':
+            return ('callp', dst, operands[0], tuple(operands[1:]))
+        return ('prim', dst, name, tuple(operands))
+    m = _re_assign.match(line)
+    if m:
+        return ('copy', m.group(1), m.group(2))
+
+    raise IRError(f"Instrução de IR não reconhecida: {line!r}")
+
+
+def parse_ir(lines):
+    """Converte linhas de IR em lista de tuplas, descartando comentários."""
+    out = []
+    for line in lines:
+        ins = parse_line(line)
+        if ins is not None:
+            out.append(ins)
+    return out
+
+
+def as_instrs(ir):
+    """Lista de tuplas a partir de um IRBuffer, de tuplas ou de linhas de texto."""
+    instrs = list(ir)
+    if instrs and isinstance(instrs[0], str):
+        return parse_ir(instrs)
+    return instrs
+
+
+def format_instr(ins):
+    kind = ins[0]
+    if kind == 'label':
+        return f"{ins[1]}:"
+    if kind == 'goto':
+        return f"goto {ins[1]}"
+    if kind == 'if':
+        return f"if {ins[1]} goto {ins[2]}"
+    if kind == 'return':
+        return f"return {ins[1]}"
+    if kind == 'param':
+        return f"param {ins[1]}"
+    if kind == 'call':
+        return f"{ins[1]} = call {ins[2]}, {ins[3]}"
+    if kind == 'arg':
+        return f"{ins[1]} = arg {ins[2]}"
+    if kind == 'binop':
+        return f"{ins[1]} = {ins[3]} {ins[2]} {ins[4]}"
+    if kind == 'prim':
+        return f"{ins[1]} = {ins[2]}({', '.join(ins[3])})"
+    if kind == 'callp':
+        return f"{ins[1]} = CALL({ins[2]}, {', '.join(ins[3])})"
+    if kind == 'copy':
+        return f"{ins[1]} = {ins[2]}"
+    raise IRError(f"Tipo de instrução desconhecido: {kind}")
+
+
+def dest(ins):
+    """Nome escrito pela instrução, ou None."""
+    if ins[0] in ('call', 'arg', 'binop', 'prim', 'callp', 'copy'):
+        return ins[1]
+    return None
+
+
+def uses(ins):
+    """Operandos lidos pela instrução (inclui constantes)."""
+    kind = ins[0]
+    if kind in ('return', 'param'):
+        return (ins[1],)
+    if kind == 'if':
+        return (ins[1],)
+    if kind == 'binop':
+        return (ins[3], ins[4])
+    if kind in ('prim', 'callp'):
+        return ins[3]
+    if kind == 'copy':
+        return (ins[2],)
+    return ()
+
+
+def replace_uses(ins, mapping):
+    """Nova instrução com os operandos lidos substituídos segundo mapping."""
+    kind = ins[0]
+    get = mapping.get
+    if kind in ('return', 'param'):
+        return (kind, get(ins[1], ins[1]))
+    if kind == 'if':
+        return ('if', get(ins[1], ins[1]), ins[2])
+    if kind == 'binop':
+        return ('binop', ins[1], ins[2], get(ins[3], ins[3]), get(ins[4], ins[4]))
+    if kind in ('prim', 'callp'):
+        return (kind, ins[1], ins[2], tuple(get(a, a) for a in ins[3]))
+    if kind == 'copy':
+        return ('copy', ins[1], get(ins[2], ins[2]))
+    return ins
+
+
+class Region:
+    """Programa principal (name None) ou corpo de uma função."""
+
+    def __init__(self, name, instrs=None):
+        self.name = name
+        self.instrs = instrs if instrs is not None else []
+
+    @property
+    def is_function(self):
+        return self.name is not None
+
+
+def split_regions(instrs):
+    """
+    Separa o IR em blocos de função e programa principal.
+    Um bloco começa em 'func_<nome>:' e termina no primeiro 'return'; o
+    restante forma o programa principal.
+    retorna: (principal, [funções])
+    """
+    main = Region(None)
+    functions = []
+    current = main
+    for ins in instrs:
+        if ins[0] == 'label' and ins[1].startswith('func_') and current is main:
+            current = Region(ins[1][len('func_'):])
+            functions.append(current)
+        current.instrs.append(ins)
+        if current is not main and ins[0] == 'return':
+            current = main
+    return main, functions
+
+
+def join_regions(main, functions):
+    """Instruções com as funções primeiro e o programa principal no final."""
+    instrs = []
+    for fn in functions:
+        instrs.extend(fn.instrs)
+    instrs.extend(main.instrs)
+    return instrs
+
+
+def format_ir(instrs):
+    """Linhas de texto para exibição, com um comentário antes de cada função."""
+    lines = []
+    for ins in instrs:
+        if ins[0] == 'label' and ins[1].startswith('func_'):
+            lines.append(f"# função {ins[1][len('func_'):]}:")
+        lines.append(format_instr(ins))
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Armazenamento compacto
+#
+# Cada instrução é um registro de 13 bytes em 'data': código da operação
+# (1 byte), destino e dois operandos (inteiros de 32 bits). Um temporário tN
+# é guardado como N (a geração já entrega o temporário como inteiro);
+# qualquer outro texto (variável, constante, rótulo, nome de função) é
+# internado em 'pool' e guardado como -(índice + 1). Os argumentos de
+# CALL(...) ficam em 'extra' (quantidade seguida dos operandos).
+#
+# append não codifica nada: guarda a tupla e as pendentes viram registros
+# todas juntas, na primeira leitura, empacotadas em lotes.
+
+(_K_LABEL, _K_GOTO, _K_IF, _K_RETURN, _K_PARAM, _K_CALL, _K_ARG,
+ _K_COPY, _K_CALLP) = range(9)
+_K_BINOP = 16                       # 16 + índice em BINOP_SYMBOLS
+_K_PRIM = 32                        # 32 + índice em PRIM_NAMES
+PRIM_NAMES = ('CONS', 'CAR', 'CDR', 'EQ')
+_NONE = -(2 ** 31)
+
+_BINOP_CODE = {op: _K_BINOP + i for i, op in enumerate(BINOP_SYMBOLS)}
+_PRIM_CODE = {name: _K_PRIM + i for i, name in enumerate(PRIM_NAMES)}
+
+_RECORD = struct.Struct('<B3i')
+_unpack_from = _RECORD.unpack_from
+_SIZE = _RECORD.size
+
+# registros empacotados de _BATCH em _BATCH por uma só chamada de struct
+_BATCH = 1024
+_BATCH_RECORD = struct.Struct('<' + 'B3i' * _BATCH)
+
+
+def _pack_records(fields):
+    """Bytes dos registros cujos campos (4 por registro) estão em fields."""
+    n = len(fields)
+    step = 4 * _BATCH
+    full = n - n % step
+    out = bytearray()
+    pack = _BATCH_RECORD.pack
+    for i in range(0, full, step):
+        out += pack(*fields[i:i + step])
+    if full < n:
+        out += struct.pack('<' + 'B3i' * ((n - full) // 4), *fields[full:])
+    return out
+
+
+class IRBuffer:
+    """
+    Sequência de instruções em registros binários; itera como tuplas.
+    append só guarda a tupla numa lista (é o caminho quente da geração de
+    código); as pendentes são convertidas em registros de uma vez, na
+    primeira leitura.
+    """
+
+    __slots__ = ('_data', '_extra', 'pool', '_pool_index', '_pending', 'append')
+
+    def __init__(self, instrs=()):
+        self._data = bytearray()
+        self._extra = array('i')
+        self.pool = []
+        self._pool_index = {}
+        self._pending = []
+        self.append = self._pending.append
+        self._pending.extend(instrs)
+
+    @property
+    def data(self):
+        self._flush()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._flush()
+        self._data = value
+
+    @property
+    def extra(self):
+        self._flush()
+        return self._extra
+
+    def __len__(self):
+        return len(self._data) // _SIZE + len(self._pending)
+
+    def _ref(self, text):
+        if type(text) is int:
+            return text
+        if text is None:
+            return _NONE
+        if text[0] == 't' and text[1:].isdigit():
+            return int(text[1:])
+        idx = self._pool_index.get(text)
+        if idx is None:
+            idx = len(self.pool)
+            self.pool.append(text)
+            self._pool_index[text] = idx
+        return -idx - 1
+
+    def _text(self, ref):
+        if ref >= 0:
+            return f"t{ref}"
+        if ref == _NONE:
+            return None
+        return self.pool[-ref - 1]
+
+    def _flush(self):
+        """Converte as instruções pendentes em registros."""
+        pending = self._pending
+        if not pending:
+            return
+        ref = self._ref
+        fields = []
+        put = fields.extend
+        for ins in pending:
+            kind = ins[0]
+            # os temporários (int) não passam por _ref: é o caso mais comum
+            if kind == 'binop':
+                _, d, op, a, b = ins
+                put((_BINOP_CODE[op], d if type(d) is int else ref(d),
+                     a if type(a) is int else ref(a), b if type(b) is int else ref(b)))
+            elif kind == 'copy':
+                _, d, a = ins
+                put((_K_COPY, d if type(d) is int else ref(d),
+                     a if type(a) is int else ref(a), _NONE))
+            elif kind == 'label':
+                put((_K_LABEL, _NONE, ref(ins[1]), _NONE))
+            elif kind == 'goto':
+                put((_K_GOTO, _NONE, ref(ins[1]), _NONE))
+            elif kind == 'if':
+                put((_K_IF, _NONE, ref(ins[1]), ref(ins[2])))
+            elif kind == 'prim' and len(ins[3]) <= 2:
+                args = ins[3]
+                put((_PRIM_CODE[ins[2]], ref(ins[1]),
+                     ref(args[0]) if args else _NONE,
+                     ref(args[1]) if len(args) > 1 else _NONE))
+            elif kind == 'return':
+                put((_K_RETURN, _NONE, ref(ins[1]), _NONE))
+            elif kind == 'param':
+                put((_K_PARAM, _NONE, ref(ins[1]), _NONE))
+            elif kind == 'call':
+                put((_K_CALL, ref(ins[1]), ref(ins[2]), ins[3]))
+            elif kind == 'arg':
+                put((_K_ARG, ref(ins[1]), ins[2], _NONE))
+            elif kind == 'callp':
+                offset = len(self._extra)
+                self._extra.append(len(ins[3]))
+                self._extra.extend([ref(x) for x in ins[3]])
+                put((_K_CALLP, ref(ins[1]), ref(ins[2]), offset))
+            else:
+                # as que vieram antes desta ficam no buffer
+                del pending[:len(fields) // 4]
+                self._data += _pack_records(fields)
+                raise IRError(f"Instrução não representável: {ins!r}")
+        pending.clear()
+        self._data += _pack_records(fields)
+
+    def extend(self, instrs):
+        self._pending.extend(instrs)
+
+    def mark(self):
+        """Posição atual, para truncated()."""
+        self._flush()
+        return len(self._data), len(self._extra), len(self.pool)
+
+    def truncated(self, mark):
+        """Novo buffer com as instruções até mark, copiadas sem decodificar."""
+        self._flush()
+        data, extra, pool = mark
+        out = IRBuffer()
+        out._data = self._data[:data]
+        out._extra = self._extra[:extra]
+        out.pool = self.pool[:pool]
+        out._pool_index = {text: i for i, text in enumerate(out.pool)}
+        return out
+
+    def __getitem__(self, i):
+        self._flush()
+        if i < 0:
+            i += len(self)
+        return self._decode(*_unpack_from(self._data, i * _SIZE))
+
+    def _decode(self, op, d, a, b):
+        text = self._text
+        if op >= _K_PRIM:
+            args = tuple(text(x) for x in (a, b) if x != _NONE)
+            return ('prim', text(d), PRIM_NAMES[op - _K_PRIM], args)
+        if op >= _K_BINOP:
+            return ('binop', text(d), BINOP_SYMBOLS[op - _K_BINOP], text(a), text(b))
+        if op == _K_COPY:
+            return ('copy', text(d), text(a))
+        if op == _K_LABEL:
+            return ('label', text(a))
+        if op == _K_GOTO:
+            return ('goto', text(a))
+        if op == _K_IF:
+            return ('if', text(a), text(b))
+        if op == _K_RETURN:
+            return ('return', text(a))
+        if op == _K_PARAM:
+            return ('param', text(a))
+        if op == _K_CALL:
+            return ('call', text(d), text(a), b)
+        if op == _K_ARG:
+            return ('arg', text(d), a)
+        if op == _K_CALLP:
+            n = self._extra[b]
+            args = tuple(text(x) for x in self._extra[b + 1:b + 1 + n])
+            return ('callp', text(d), text(a), args)
+        raise IRError(f"Código de operação inválido: {op}")
+
+    def __iter__(self):
+        self._flush()
+        decode = self._decode
+        for rec in _RECORD.iter_unpack(self._data):
+            yield decode(*rec)
+
+    def nbytes(self):
+        """Bytes ocupados pelas instruções (sem o pool de nomes)."""
+        self._flush()
+        return len(self._data) + self._extra.itemsize * len(self._extra)
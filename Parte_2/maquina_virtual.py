@@ -0,0 +1,357 @@
+# maquina_virtual.py
+# Máquina virtual que executa o código de 3-endereços gerado por
+# analyze_and_generate.
+#
+# O IR textual é decodificado uma única vez em um vetor de instruções
+# (tuplas com opcode inteiro), com os rótulos resolvidos para deslocamentos
+# inteiros e cada temporário/variável mapeado para uma posição fixa do banco
+# de registradores. Depois disso o programa pode ser executado várias vezes
+# sem reanalisar o texto nem percorrer a AST.
+from ir import as_instrs, split_regions, constant_value
+
+# OPCODES
+(HALT, CONST, MOVE,
+ ADD, SUB, MUL, DIV, LT, GT, LE, GE, EQN, NE,
+ CONS, CAR, CDR, EQ, CALL,
+ JUMP, JUMPIF, RETURN,
+ PARAM, CALLF, ARG) = range(24)
+
+OPCODE_NAMES = [
+    'HALT', 'CONST', 'MOVE',
+    'ADD', 'SUB', 'MUL', 'DIV', 'LT', 'GT', 'LE', 'GE', 'EQN', 'NE',
+    'CONS', 'CAR', 'CDR', 'EQ', 'CALL',
+    'JUMP', 'JUMPIF', 'RETURN',
+    'PARAM', 'CALLF', 'ARG',
+]
+
+BINOPS = {
+    '+': ADD, '-': SUB, '*': MUL, '/': DIV,
+    '<': LT, '>': GT, '<=': LE, '>=': GE, '=': EQN, '!=': NE,
+}
+
+class VMError(Exception):
+    """Erro de decodificação ou de execução do código intermediário."""
+
+
+def lisp_eq(a, b):
+    # eq: identidade para listas, igualdade para átomos
+    if isinstance(a, tuple) or isinstance(b, tuple):
+        return a is b
+    return a == b
+
+
+def _car(v):
+    if v is None:
+        return None
+    if not isinstance(v, tuple):
+        raise VMError(f"car aplicado a um valor que não é lista: {format_value(v)}")
+    return v[0]
+
+
+def _cdr(v):
+    if v is None:
+        return None
+    if not isinstance(v, tuple):
+        raise VMError(f"cdr aplicado a um valor que não é lista: {format_value(v)}")
+    return v[1]
+
+
+# funções primitivas acessadas via CALL(nome, ...)
+PRIMITIVES = {
+    'div': lambda a, b: a // b,
+    'mod': lambda a, b: a % b,
+    'exp': lambda a, b: a ** b,
+}
+
+
+def format_value(v):
+    """Representação de um valor da VM na sintaxe Lisp."""
+    if v is None or v is False:
+        return 'nil'
+    if v is True:
+        return 't'
+    if isinstance(v, tuple):
+        items = []
+        while isinstance(v, tuple):
+            items.append(format_value(v[0]))
+            v = v[1]
+        if v is not None:
+            return '(' + ' '.join(items) + ' . ' + format_value(v) + ')'
+        return '(' + ' '.join(items) + ')'
+    return str(v)
+
+
+class _Slots:
+    """Mapeia nomes de temporários/variáveis de uma região em posições."""
+
+    def __init__(self):
+        self.slots = {}
+
+    def __call__(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+
+class Program:
+    """Programa decodificado, pronto para ser executado várias vezes."""
+
+    def __init__(self, code, entry, template, slots, functions):
+        self.code = code
+        self.entry = entry
+        self.template = template
+        self.slots = slots
+        self.functions = functions
+
+    def disassemble(self):
+        out = []
+        for pc, ins in enumerate(self.code):
+            args = ', '.join(repr(a) for a in ins[1:] if a is not None)
+            out.append(f"{pc:4d}  {OPCODE_NAMES[ins[0]]:<7} {args}")
+        return out
+
+    def run(self, env=None):
+        """
+        Executa o programa principal.
+        env: valores iniciais para variáveis livres (nome -> valor)
+        retorna: valor do 'return' do programa principal (NIL se não houver)
+        """
+        regs = list(self.template)
+        if env:
+            for name, value in env.items():
+                if name in self.slots:
+                    regs[self.slots[name]] = value
+        return execute(self.code, self.entry, regs)
+
+
+# pseudo-instrução usada apenas durante a decodificação
+LABEL = -1
+
+_WRITERS = {CONST, MOVE, ADD, SUB, MUL, DIV, LT, GT, LE, GE, EQN, NE,
+            CONS, CAR, CDR, EQ, CALL, CALLF, ARG}
+
+
+def decode_region(instrs, slot):
+    """
+    Decodifica as instruções (tuplas de ir.py) de uma região.
+    Rótulos aparecem como (LABEL, nome) e os saltos guardam o nome do destino.
+    """
+    code = []
+    counter = [0]
+
+    def src(text):
+        is_const, value = constant_value(text)
+        if is_const:
+            # constantes em operandos são carregadas em um registrador próprio
+            counter[0] += 1
+            r = slot(f"$const{counter[0]}")
+            code.append((CONST, r, value))
+            return r
+        return slot(text)
+
+    for ins in instrs:
+        kind = ins[0]
+        if kind == 'label':
+            code.append((LABEL, ins[1]))
+        elif kind == 'if':
+            code.append((JUMPIF, ins[2], src(ins[1])))
+        elif kind == 'goto':
+            code.append((JUMP, ins[1]))
+        elif kind == 'return':
+            code.append((RETURN, src(ins[1])))
+        elif kind == 'param':
+            code.append((PARAM, src(ins[1])))
+        elif kind == 'call':
+            code.append((CALLF, slot(ins[1]), ins[2], ins[3]))
+        elif kind == 'arg':
+            code.append((ARG, slot(ins[1]), ins[2]))
+        elif kind == 'binop':
+            a, b = src(ins[3]), src(ins[4])
+            code.append((BINOPS[ins[2]], slot(ins[1]), a, b))
+        elif kind == 'prim':
+            regs = tuple(src(x) for x in ins[3])
+            opcode = {'CONS': CONS, 'CAR': CAR, 'CDR': CDR, 'EQ': EQ}[ins[2]]
+            code.append((opcode, slot(ins[1])) + regs)
+        elif kind == 'callp':
+            regs = tuple(src(x) for x in ins[3])
+            code.append((CALL, slot(ins[1]), ins[2], regs))
+        elif kind == 'copy':
+            is_const, const = constant_value(ins[2])
+            if is_const:
+                code.append((CONST, slot(ins[1]), const))
+            else:
+                code.append((MOVE, slot(ins[1]), slot(ins[2])))
+        else:
+            raise VMError(f"Instrução de IR não suportada: {ins!r}")
+
+    return code
+
+
+def hoist_constants(code, nslots):
+    """
+    Registradores escritos uma única vez na região, e sempre por CONST, são
+    pré-carregados no molde do banco de registradores e a instrução some.
+    retorna: (molde, instruções_restantes)
+    """
+    writes = [0] * nslots
+    for ins in code:
+        if ins[0] in _WRITERS:
+            writes[ins[1]] += 1
+    template = [None] * nslots
+    kept = []
+    for ins in code:
+        if ins[0] == CONST and writes[ins[1]] == 1:
+            template[ins[1]] = ins[2]
+        else:
+            kept.append(ins)
+    return template, kept
+
+
+def load_ir(ir):
+    """Decodifica o IR (IRBuffer, tuplas ou linhas de texto) em um Program."""
+    main, functions = split_regions(as_instrs(ir))
+    code = []
+    labels = {}
+
+    def layout(region):
+        slot = _Slots()
+        region_code = decode_region(region.instrs, slot)
+        template, kept = hoist_constants(region_code, len(slot.slots))
+        for ins in kept:
+            if ins[0] == LABEL:
+                labels[ins[1]] = len(code)
+            else:
+                code.append(ins + (None,) * (4 - len(ins)))
+        return template, slot.slots
+
+    template, main_slots = layout(main)
+    code.append((HALT, None, None, None))
+
+    func_table = {}
+    for region in functions:
+        entry = len(code)
+        func_template, _ = layout(region)
+        func_table[region.name] = (entry, func_template)
+
+    # resolve rótulos para deslocamentos inteiros e chamadas para
+    # (entrada, molde de registradores) da função
+    for pc, ins in enumerate(code):
+        if ins[0] == JUMP or ins[0] == JUMPIF:
+            if ins[1] not in labels:
+                raise VMError(f"Rótulo não definido: {ins[1]}")
+            code[pc] = (ins[0], labels[ins[1]]) + ins[2:]
+        elif ins[0] == CALLF:
+            if ins[2] not in func_table:
+                raise VMError(f"Função não definida: {ins[2]}")
+            code[pc] = (CALLF, ins[1], func_table[ins[2]], ins[3])
+
+    return Program(code, 0, template, main_slots, func_table)
+
+
+def execute(code, pc, regs):
+    """
+    Laço principal de despacho. Toda instrução tem 4 campos
+    (opcode, a, b, c); os opcodes mais frequentes são testados primeiro.
+
+    Convenção de chamada: PARAM empilha argumentos em 'pending'; CALLF retira
+    os n últimos, salva (pc, regs, args, destino) na pilha de chamadas e
+    entra na função com um banco de registradores novo; ARG lê o i-ésimo
+    argumento do quadro atual; RETURN restaura o quadro do chamador.
+    """
+    pending = []
+    args = ()
+    frames = []
+    while True:
+        op, a, b, c = code[pc]
+        pc += 1
+        if op == MOVE:
+            regs[a] = regs[b]
+        elif op == ADD:
+            regs[a] = regs[b] + regs[c]
+        elif op == JUMPIF:
+            v = regs[b]
+            if v is not None and v is not False:
+                pc = a
+        elif op == JUMP:
+            pc = a
+        elif op == SUB:
+            regs[a] = regs[b] - regs[c]
+        elif op == MUL:
+            regs[a] = regs[b] * regs[c]
+        elif op == CONST:
+            regs[a] = b
+        elif op == LT:
+            regs[a] = regs[b] < regs[c]
+        elif op == GT:
+            regs[a] = regs[b] > regs[c]
+        elif op == EQN:
+            regs[a] = regs[b] == regs[c]
+        elif op == CAR:
+            regs[a] = _car(regs[b])
+        elif op == CDR:
+            regs[a] = _cdr(regs[b])
+        elif op == CONS:
+            regs[a] = (regs[b], regs[c])
+        elif op == DIV:
+            regs[a] = regs[b] / regs[c]
+        elif op == LE:
+            regs[a] = regs[b] <= regs[c]
+        elif op == GE:
+            regs[a] = regs[b] >= regs[c]
+        elif op == NE:
+            regs[a] = regs[b] != regs[c]
+        elif op == EQ:
+            regs[a] = lisp_eq(regs[b], regs[c])
+        elif op == CALL:
+            fn = PRIMITIVES.get(b)
+            if fn is None:
+                raise VMError(f"Função não definida em tempo de execução: {b}")
+            regs[a] = fn(*[regs[r] for r in c])
+        elif op == PARAM:
+            pending.append(regs[a])
+        elif op == CALLF:
+            entry, template = b
+            frames.append((pc, regs, args, a))
+            if c:
+                args = pending[-c:]
+                del pending[-c:]
+            else:
+                args = ()
+            regs = list(template)
+            pc = entry
+        elif op == ARG:
+            regs[a] = args[b]
+        elif op == RETURN:
+            value = regs[a]
+            if not frames:
+                return value
+            pc, regs, args, dst = frames.pop()
+            regs[dst] = value
+        elif op == HALT:
+            return None
+        else:
+            raise VMError(f"Opcode inválido: {op}")
+
+
+if __name__ == "__main__":
+    import codigo_intermediario
+
+    lexer, parser = codigo_intermediario.make_parser()
+
+    data = """
+    (defun soma (x y)
+        (+ x y))
+
+    (if (> 5 2)
+        (soma 3 4)
+        0)
+    """
+
+    result = parser.parse(data, lexer=lexer)
+    if isinstance(result, dict) and result.get("sem_ok"):
+        program = load_ir(result["ir"])
+        print("\n=== CÓDIGO DECODIFICADO ===")
+        for l in program.disassemble():
+            print(l)
+        print("\n=== EXECUÇÃO ===")
+        print(format_value(program.run()))
@@ -0,0 +1,251 @@
+# otimizacao.py
+# Passes de otimização sobre o código de 3-endereços e o gerenciador que os
+# executa entre a geração de código e a saída em p_program.
+#
+# Cada passe recebe a lista de instruções (tuplas de ir.py) de uma região
+# (programa principal ou corpo de função) e devolve uma nova lista.
+#
+# Um programa que termina normalmente calcula o mesmo valor com e sem os
+# passes. Um que falharia pode terminar: dead_temp_elimination remove uma
+# operação pura cujo resultado ninguém lê mesmo que ela fosse levantar erro
+# (ex.: o (< nil t) de um if com os dois ramos iguais).
+import time
+
+from ir import (as_instrs, split_regions, join_regions, constant_value,
+                format_constant, is_constant, is_temp, dest, uses,
+                replace_uses, PURE_KINDS)
+from cfg import simplify_cfg
+from ssa import gvn
+
+_FOLD_BINOP = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+
+_FOLD_PRIMITIVE = {
+    'div': lambda a, b: a // b,
+    'mod': lambda a, b: a % b,
+    'exp': lambda a, b: a ** b,
+}
+
+# resultados numéricos maiores que isso não viram literais no IR
+_MAX_LITERAL_DIGITS = 32
+
+
+def def_counts(instrs):
+    """Quantas vezes cada nome é escrito na região."""
+    counts = {}
+    for ins in instrs:
+        d = dest(ins)
+        if d is not None:
+            counts[d] = counts.get(d, 0) + 1
+    return counts
+
+
+def _number(text):
+    is_const, value = constant_value(text)
+    if is_const and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return True, value
+    return False, None
+
+
+def _fold(fn, *values):
+    """Aplica fn e devolve o texto do resultado, ou None se não for seguro."""
+    try:
+        value = fn(*values)
+    except (ArithmeticError, ValueError, TypeError):
+        # erros de execução (ex.: divisão por zero) ficam para a execução
+        return None
+    text = format_constant(value)
+    if text is None or len(text) > _MAX_LITERAL_DIGITS:
+        return None
+    return text
+
+
+def _fold_instr(ins):
+    """Versão constante de ins ('copy' com literal) ou None."""
+    kind = ins[0]
+    if kind == 'binop':
+        ok1, a = _number(ins[3])
+        ok2, b = _number(ins[4])
+        if ok1 and ok2:
+            text = _fold(_FOLD_BINOP[ins[2]], a, b)
+            if text is not None:
+                return ('copy', ins[1], text)
+    elif kind == 'callp' and ins[2] in _FOLD_PRIMITIVE and len(ins[3]) == 2:
+        ok1, a = _number(ins[3][0])
+        ok2, b = _number(ins[3][1])
+        if ok1 and ok2:
+            text = _fold(_FOLD_PRIMITIVE[ins[2]], a, b)
+            if text is not None:
+                return ('copy', ins[1], text)
+    elif kind == 'prim':
+        args = ins[3]
+        if ins[2] == 'EQ' and len(args) == 2 and all(is_constant(a) for a in args):
+            a, b = constant_value(args[0])[1], constant_value(args[1])[1]
+            return ('copy', ins[1], format_constant(a == b))
+        if ins[2] in ('CAR', 'CDR') and len(args) == 1 and args[0] in ('nil', 'NIL'):
+            return ('copy', ins[1], 'nil')
+    return None
+
+
+def constant_folding(instrs):
+    """
+    Dobra operações com operandos constantes e propaga constantes atribuídas
+    a temporários escritos uma única vez. Desvios condicionais com condição
+    constante viram 'goto' ou desaparecem.
+    """
+    counts = def_counts(instrs)
+    consts = {}
+    out = []
+    for ins in instrs:
+        if consts:
+            ins = replace_uses(ins, consts)
+        folded = _fold_instr(ins)
+        if folded is not None:
+            ins = folded
+        if ins[0] == 'if' and is_constant(ins[1]):
+            if constant_value(ins[1])[1] is not None:
+                out.append(('goto', ins[2]))
+            continue
+        d = dest(ins)
+        if (ins[0] == 'copy' and is_temp(d) and counts.get(d) == 1
+                and is_constant(ins[2])):
+            consts[d] = ins[2]
+        out.append(ins)
+    return out
+
+
+def copy_propagation(instrs):
+    """
+    Para 'd = s', com d temporário escrito uma única vez e s nunca
+    reescrito na região, troca os usos de d por s.
+    """
+    counts = def_counts(instrs)
+    copies = {}
+    for ins in instrs:
+        if ins[0] != 'copy':
+            continue
+        d, s = ins[1], ins[2]
+        if is_temp(d) and counts.get(d) == 1 and not is_constant(s) and counts.get(s, 0) <= 1:
+            copies[d] = s
+
+    if not copies:
+        return instrs
+
+    # resolve cadeias a = b, b = c
+    for d in list(copies):
+        s = copies[d]
+        seen = {d}
+        while s in copies and s not in seen:
+            seen.add(s)
+            s = copies[s]
+        copies[d] = s
+
+    return [replace_uses(ins, copies) for ins in instrs]
+
+
+def dead_temp_elimination(instrs):
+    """Remove instruções puras cujo temporário de destino nunca é lido."""
+    while True:
+        used = set()
+        for ins in instrs:
+            used.update(uses(ins))
+        out = [ins for ins in instrs
+               if not (ins[0] in PURE_KINDS and is_temp(ins[1]) and ins[1] not in used)]
+        if len(out) == len(instrs):
+            return out
+        instrs = out
+
+
+PASSES = {
+    'constant_folding': constant_folding,
+    'gvn': gvn,
+    'copy_propagation': copy_propagation,
+    'dead_temp_elimination': dead_temp_elimination,
+    'simplify_cfg': simplify_cfg,
+}
+
+DEFAULT_PIPELINE = [
+    'constant_folding',
+    'gvn',
+    'copy_propagation',
+    'dead_temp_elimination',
+    'simplify_cfg',
+]
+
+
+class PassStats:
+    """Estatísticas acumuladas de um passe."""
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.removed = 0
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {"pass": self.name, "runs": self.runs,
+                "removed": self.removed, "seconds": self.seconds}
+
+
+class PassManager:
+    """
+    Executa uma sequência configurável de passes sobre cada região do IR,
+    repetindo a sequência até não haver mudança (ou max_rounds).
+    """
+
+    def __init__(self, pipeline=None, max_rounds=8):
+        self.pipeline = list(pipeline if pipeline is not None else DEFAULT_PIPELINE)
+        for name in self.pipeline:
+            if name not in PASSES:
+                raise ValueError(f"Passe de otimização desconhecido: {name}")
+        self.max_rounds = max_rounds
+        self.stats = {}
+        self.size_before = 0
+        self.size_after = 0
+
+    def run(self, ir):
+        """Otimiza o IR e devolve a nova lista de instruções."""
+        self.stats = {name: PassStats(name) for name in self.pipeline}
+        main, functions = split_regions(as_instrs(ir))
+        regions = functions + [main]
+        self.size_before = sum(len(r.instrs) for r in regions)
+
+        for _ in range(self.max_rounds):
+            changed = False
+            for name in self.pipeline:
+                fn = PASSES[name]
+                st = self.stats[name]
+                start = time.perf_counter()
+                for region in regions:
+                    before = region.instrs
+                    after = fn(before)
+                    if after != before:
+                        changed = True
+                        st.removed += len(before) - len(after)
+                        region.instrs = after
+                st.runs += 1
+                st.seconds += time.perf_counter() - start
+            if not changed:
+                break
+
+        self.size_after = sum(len(r.instrs) for r in regions)
+        return join_regions(main, functions)
+
+    def report(self):
+        """Linhas de texto com as estatísticas da última execução."""
+        lines = [f"instruções: {self.size_before} -> {self.size_after}"]
+        for name in self.pipeline:
+            st = self.stats[name]
+            lines.append(f"{name:<24} removidas {st.removed:6d}  "
+                         f"{st.seconds * 1000:8.3f} ms  ({st.runs} execuções)")
+        return lines
@@ -0,0 +1,390 @@
+# reescrita.py
+# Regras de reescrita (simplificação algébrica e redução de força) sobre a
+# AST de codigo_intermediario.py, aplicadas depois da avaliação parcial e
+# antes da geração de código.
+#
+# Cada regra é declarada na própria sintaxe da linguagem: um padrão, em que
+# ?x casa com qualquer subárvore (a mesma variável duas vezes exige o mesmo
+# nó, o que com hash-consing é igualdade estrutural), o resultado e as
+# condições sobre as variáveis:
+#   numero ?x    o valor de x é sempre um número (nunca t, nil ou lista)
+#   inteiro ?x   o valor de x nunca é real
+#   total ?x     avaliar x nunca falha nem deixa de terminar (x pode ser
+#                descartado)
+#   atomo ?x     x é um número, uma variável ou uma constante (pode ser
+#                repetido sem repetir trabalho)
+# A análise semântica aceita qualquer valor de tipo 'any' como operando
+# aritmético, e a máquina virtual calcula (* (< a b) 1) como 1, não t: as
+# regras aritméticas exigem numero. As outras condições cobrem o que muda
+# entre inteiros e reais (0 * x é 0.0 para um real, e 0 + -0.0 é 0.0) e o
+# que um operando descartado deixaria de fazer.
+#
+# A AST é reescrita de baixo para cima: cada nó, com os filhos já
+# reescritos, passa pelas regras do seu operador até nenhuma casar, e os
+# nós novos de um resultado passam pelas regras também. Cada regra conta
+# quantas vezes disparou.
+import re
+
+from arvore import Node, NodeTable, _COMPOUND, _walk
+from ir import constant_value
+
+# operadores que aparecem nas regras: lexema -> token
+_OPERATORS = {
+    '+': 'PLUS', '-': 'MINUS', '*': 'TIMES', '/': 'DIV',
+    'exp': 'EXP', 'div': 'DIVINT', 'mod': 'MOD',
+    'car': 'CAR', 'cdr': 'CDR', 'cons': 'CONS',
+}
+
+RULES = [
+    ("mul_um", "(* ?x 1)", "?x", "numero ?x"),
+    ("mul_um", "(* 1 ?x)", "?x", "numero ?x"),
+    ("soma_zero", "(+ ?x 0)", "?x", "numero ?x", "inteiro ?x"),
+    ("soma_zero", "(+ 0 ?x)", "?x", "numero ?x", "inteiro ?x"),
+    ("sub_zero", "(- ?x 0)", "?x", "numero ?x"),
+    ("mul_zero", "(* ?x 0)", "0", "numero ?x", "inteiro ?x", "total ?x"),
+    ("mul_zero", "(* 0 ?x)", "0", "numero ?x", "inteiro ?x", "total ?x"),
+    ("exp_zero", "(exp ?x 0)", "1", "numero ?x", "inteiro ?x", "total ?x"),
+    ("exp_um", "(exp ?x 1)", "?x", "numero ?x", "inteiro ?x"),
+    ("exp_dois", "(exp ?x 2)", "(* ?x ?x)", "numero ?x", "inteiro ?x", "atomo ?x"),
+    ("exp_tres", "(exp ?x 3)", "(* (* ?x ?x) ?x)", "numero ?x", "inteiro ?x", "atomo ?x"),
+    ("exp_quatro", "(exp ?x 4)", "(* (* ?x ?x) (* ?x ?x))",
+     "numero ?x", "inteiro ?x", "atomo ?x"),
+    ("car_cons", "(car (cons ?a ?b))", "?a", "total ?b"),
+    ("cdr_cons", "(cdr (cons ?a ?b))", "?b", "total ?a"),
+]
+
+_PATTERN_TOKENS = re.compile(r'[()]|[^\s()]+')
+
+
+def parse_pattern(text):
+    """
+    Padrão (ou resultado) de uma regra em tuplas: ('var', nome),
+    ('num', inteiro) ou ('app', token, lexema, (filhos...)).
+    """
+    pieces = _PATTERN_TOKENS.findall(text)
+    pos = 0
+
+    def read():
+        nonlocal pos
+        piece = pieces[pos]
+        pos += 1
+        if piece == '(':
+            op = pieces[pos]
+            pos += 1
+            if op not in _OPERATORS:
+                raise ValueError(f"Operador desconhecido em regra: {op}")
+            args = []
+            while pieces[pos] != ')':
+                args.append(read())
+            pos += 1
+            return ('app', _OPERATORS[op], op, tuple(args))
+        if piece.startswith('?'):
+            return ('var', piece[1:])
+        return ('num', int(piece))
+
+    pattern = read()
+    if pos != len(pieces):
+        raise ValueError(f"Padrão mal formado: {text}")
+    return pattern
+
+
+class Rule:
+    """Regra de reescrita: nome, padrão, resultado e condições (textos como em RULES)."""
+
+    def __init__(self, name, pattern, result, *conditions):
+        self.name = name
+        self.text = f"{pattern} -> {result}"
+        self.pattern = parse_pattern(pattern)
+        if self.pattern[0] != 'app':
+            raise ValueError(f"O padrão de uma regra é uma aplicação: {pattern}")
+        self.result = parse_pattern(result)
+        self.conditions = []
+        for cond in conditions:
+            kind, var = cond.split()
+            if kind not in ('numero', 'inteiro', 'total', 'atomo') or not var.startswith('?'):
+                raise ValueError(f"Condição desconhecida: {cond}")
+            self.conditions.append((kind, var[1:]))
+
+    def match(self, node):
+        """Variáveis do padrão (nome -> nó) se node casa com ele, senão None."""
+        bindings = {}
+        return bindings if _match(self.pattern, node, bindings) else None
+
+
+def _match(pattern, node, bindings):
+    kind = pattern[0]
+    if kind == 'var':
+        bound = bindings.get(pattern[1])
+        if bound is None:
+            bindings[pattern[1]] = node
+            return True
+        return bound is node
+    if not isinstance(node, Node):
+        return False
+    if kind == 'num':
+        # 1.0 não vale como 1: x * 1.0 é real mesmo com x inteiro
+        return node.type == "number" and node.value.__class__ is int \
+            and node.value == pattern[1]
+    if node.type != "application" or len(node.args) != len(pattern[3]):
+        return False
+    op = node.operator
+    if not isinstance(op, Node) or op.type != "symbol" or op.token != pattern[1]:
+        return False
+    for sub, arg in zip(pattern[3], node.args):
+        if not _match(sub, arg, bindings):
+            return False
+    return True
+
+
+def _children(node):
+    if not isinstance(node, Node):
+        return ()
+    ntype = node.type
+    if ntype == "application":
+        return node.args
+    if ntype == "if":
+        return (node.cond, node.then, node.else_)
+    return ()
+
+
+def _is_cons(node):
+    return isinstance(node, Node) and node.type == "application" and len(node.args) == 2 \
+        and isinstance(node.operator, Node) and node.operator.type == "symbol" \
+        and node.operator.token == 'CONS'
+
+
+def _nonnegative_int(node):
+    return isinstance(node, Node) and node.type == "number" \
+        and node.value.__class__ is int and node.value >= 0
+
+
+class RewriteEngine:
+    """
+    Aplica as regras (Rule ou tuplas como as de RULES) às forms de um
+    programa, na ordem da lista. fired conta, por nome de regra, os
+    disparos da última execução de run. floats diz se algum valor do
+    programa pode ser real e numbers_only se as variáveis e os resultados
+    das funções do usuário são sempre números.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = [r if isinstance(r, Rule) else Rule(*r)
+                      for r in (rules if rules is not None else RULES)]
+        self._by_token = {}
+        for rule in self.rules:
+            self._by_token.setdefault(rule.pattern[1], []).append(rule)
+        self.fired = {}
+        self.nodes = None
+        self.floats = True
+        self.numbers_only = False
+        self._facts = {}
+
+    def run(self, forms, nodes=None):
+        """
+        Forms reescritas (as que não mudam são as mesmas de forms); nodes é
+        a NodeTable que cria os nós novos.
+        """
+        self.fired = {rule.name: 0 for rule in self.rules}
+        self.nodes = nodes if nodes is not None else NodeTable()
+        self._facts = {}
+        self.floats = self._has_floats(forms)
+        self.numbers_only = True
+        if not self._only_numbers(forms):
+            self.numbers_only = False
+            self._facts = {}
+        return [_walk(_rewrite_leaf, _rewrite_step, node, None, self) for node in forms]
+
+    def rewrite_root(self, node):
+        """node (com os filhos já reescritos) depois das regras do seu operador."""
+        while isinstance(node, Node) and node.type == "application":
+            op = node.operator
+            if not isinstance(op, Node) or op.type != "symbol":
+                break
+            for rule in self._by_token.get(op.token, ()):
+                bindings = rule.match(node)
+                if bindings is not None and self._holds(rule, bindings):
+                    self.fired[rule.name] += 1
+                    node = self._build(rule.result, bindings)
+                    break
+            else:
+                break
+        return node
+
+    def _build(self, template, bindings):
+        kind = template[0]
+        if kind == 'var':
+            return bindings[template[1]]
+        if kind == 'num':
+            return self.nodes.number(template[1])
+        _, token, lexeme, args = template
+        node = self.nodes.application(self.nodes.symbol(token, lexeme),
+                                      [self._build(a, bindings) for a in args])
+        return self.rewrite_root(node)
+
+    def _holds(self, rule, bindings):
+        for kind, var in rule.conditions:
+            node = bindings[var]
+            if kind == 'atomo':
+                if not isinstance(node, Node) or node.type not in ("number", "symbol", "nil"):
+                    return False
+            else:
+                may_be_float, total, numeric = self.facts(node)
+                if kind == 'inteiro' and may_be_float or kind == 'total' and not total \
+                        or kind == 'numero' and not numeric:
+                    return False
+        return True
+
+    def _has_floats(self, forms):
+        """Se algum valor do programa pode ser real: literais reais, / ou exp sem expoente natural."""
+        seen = set()
+        stack = list(forms)
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, Node) or id(node) in seen:
+                continue
+            seen.add(id(node))
+            ntype = node.type
+            if ntype == "number" and node.value.__class__ is float:
+                return True
+            if ntype == "application":
+                op = node.operator
+                if isinstance(op, Node) and op.type == "symbol":
+                    if op.token == 'DIV':
+                        return True
+                    if op.token == 'EXP' and not (len(node.args) == 2
+                                                  and _nonnegative_int(node.args[1])):
+                        return True
+                stack.extend(node.args)
+            elif ntype == "defun":
+                stack.append(node.body)
+            else:
+                stack.extend(_children(node))
+        return False
+
+    def _only_numbers(self, forms):
+        """
+        Se, supondo numbers_only, todo argumento de chamada de função do
+        usuário e todo corpo de função é um número: então a suposição vale
+        (nenhum outro valor chega a um parâmetro ou sai de uma chamada).
+        """
+        seen = set()
+        stack = list(forms)
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, Node) or id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.type == "defun":
+                if not self.facts(node.body)[2]:
+                    return False
+                stack.append(node.body)
+                continue
+            if node.type == "application":
+                op = node.operator
+                if isinstance(op, Node) and op.type == "symbol" and op.token == 'ID' \
+                        and not all(self.facts(a)[2] for a in node.args):
+                    return False
+            stack.extend(_children(node))
+        return True
+
+    def facts(self, node):
+        """(pode ser real, total, número) do valor de node; calculado uma vez por nó."""
+        memo = self._facts
+        hit = memo.get(id(node))
+        if hit is not None:
+            return hit
+        stack = [(node, False)]
+        while stack:
+            n, ready = stack.pop()
+            if id(n) in memo:
+                continue
+            kids = _children(n)
+            if not ready and kids:
+                stack.append((n, True))
+                stack.extend((k, False) for k in kids if id(k) not in memo)
+                continue
+            memo[id(n)] = self._combine(n, [memo[id(k)] for k in kids])
+        return memo[id(node)]
+
+    def _combine(self, node, kids):
+        if not isinstance(node, Node):
+            return True, False, False
+        ntype = node.type
+        if ntype == "number":
+            return node.value.__class__ is float, True, True
+        if ntype == "nil":
+            return False, True, False
+        if ntype == "symbol":
+            if node.token == 'ID':
+                # variável: parâmetro de função, recebe qualquer valor do programa
+                return self.floats, True, self.numbers_only
+            # t, nil e átomos como '+'
+            return False, constant_value(node.lexeme)[0], False
+        if ntype == "if":
+            return kids[1][0] or kids[2][0], all(k[1] for k in kids), kids[1][2] and kids[2][2]
+        if ntype != "application":
+            return True, False, False
+        op = node.operator
+        token = op.token if isinstance(op, Node) and op.type == "symbol" else None
+        any_float = any(k[0] for k in kids)
+        numeric = all(k[2] for k in kids)
+        if token in ('PLUS', 'MINUS', 'TIMES'):
+            # só números: (- 0 nil) falha
+            return any_float, all(k[1] for k in kids) and numeric and len(kids) == 2, numeric
+        if token == 'CONS':
+            return False, all(k[1] for k in kids) and len(kids) == 2, False
+        if token in ('DIVINT', 'MOD'):
+            return any_float, False, numeric
+        if token == 'EXP' and len(kids) == 2 and _nonnegative_int(node.args[1]):
+            return kids[0][0], False, numeric
+        if token in ('LT', 'GT', 'LE', 'GE', 'EQ_OP', 'NE', 'EQ'):
+            # t ou nil
+            return False, False, False
+        if token in ('DIV', 'EXP'):
+            return True, False, numeric
+        if token in ('CAR', 'CDR') and len(kids) == 1 and _is_cons(node.args[0]):
+            # a parte do cons que car/cdr extrai
+            part = self._facts[id(node.args[0].args[0 if token == 'CAR' else 1])]
+            return part[0], False, part[2]
+        if token == 'ID':
+            # chamada de função do usuário
+            return self.floats, False, self.numbers_only
+        # car, cdr e operadores desconhecidos: qualquer valor, e podem falhar
+        return self.floats, False, False
+
+    def report(self):
+        """Linhas de texto com os disparos de cada regra na última execução."""
+        lines = []
+        for name, count in self.fired.items():
+            lines.append(f"{name:<12} {count:6d}")
+        lines.append(f"{'total':<12} {sum(self.fired.values()):6d}")
+        return lines
+
+
+def _rewrite_leaf(node, env, engine):
+    if isinstance(node, Node) and node.type in ("application", "if", "defun"):
+        return _COMPOUND
+    return node
+
+
+def _rewrite_step(node, env, engine):
+    ntype = node.type
+    nodes = engine.nodes
+    if ntype == "application":
+        args = []
+        for a in node.args:
+            args.append((yield a, env))
+        if any(new is not old for new, old in zip(args, node.args)):
+            node = nodes.application(node.operator, args)
+        return engine.rewrite_root(node)
+    if ntype == "if":
+        cond = (yield node.cond, env)
+        then = (yield node.then, env)
+        else_ = (yield node.else_, env)
+        if cond is not node.cond or then is not node.then or else_ is not node.else_:
+            node = nodes.if_(cond, then, else_)
+        return node
+    body = (yield node.body, env)
+    if body is not node.body:
+        node = nodes.defun(node.name, node.params, body)
+    return node
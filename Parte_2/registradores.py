@@ -0,0 +1,248 @@
+# registradores.py
+# Análise de vida (liveness) dos temporários e alocação de registradores por
+# varredura linear (linear scan) sobre o código de 3-endereços.
+#
+# Cada região (função ou programa principal) é tratada separadamente: os
+# temporários tN são renomeados para um conjunto pequeno de registradores
+# t0..tk-1, reaproveitando nomes cujos intervalos de vida não se sobrepõem.
+import heapq
+
+from ir import (as_instrs, split_regions, join_regions, dest, uses, is_temp,
+                is_constant, replace_uses)
+
+
+def rematerialize_constants(instrs):
+    """
+    Temporários escritos uma única vez com uma constante não precisam de
+    registrador: os usos passam a ler a constante e a cópia some.
+    """
+    counts = {}
+    consts = {}
+    for ins in instrs:
+        d = dest(ins)
+        if d is not None:
+            counts[d] = counts.get(d, 0) + 1
+            if ins[0] == 'copy' and is_temp(d) and is_constant(ins[2]):
+                consts[d] = ins[2]
+    consts = {t: c for t, c in consts.items() if counts[t] == 1}
+    if not consts:
+        return instrs
+    return [replace_uses(ins, consts) for ins in instrs
+            if not (ins[0] == 'copy' and ins[1] in consts)]
+
+
+def successors(instrs):
+    """Índices das instruções que podem executar depois de cada instrução."""
+    labels = {ins[1]: i for i, ins in enumerate(instrs) if ins[0] == 'label'}
+    n = len(instrs)
+    succ = []
+    for i, ins in enumerate(instrs):
+        kind = ins[0]
+        if kind == 'goto':
+            succ.append([labels[ins[1]]])
+        elif kind == 'if':
+            nxt = [labels[ins[2]]]
+            if i + 1 < n:
+                nxt.append(i + 1)
+            succ.append(nxt)
+        elif kind == 'return':
+            succ.append([])
+        else:
+            succ.append([i + 1] if i + 1 < n else [])
+    return succ
+
+
+def liveness(instrs):
+    """
+    Conjuntos de temporários vivos na entrada e na saída de cada instrução
+    (análise retroativa iterada até o ponto fixo).
+    """
+    n = len(instrs)
+    succ = successors(instrs)
+    use_sets = [frozenset(u for u in uses(ins) if is_temp(u)) for ins in instrs]
+    def_sets = []
+    for ins in instrs:
+        d = dest(ins)
+        def_sets.append(d if d is not None and is_temp(d) else None)
+
+    live_in = [frozenset()] * n
+    live_out = [frozenset()] * n
+    changed = True
+    while changed:
+        changed = False
+        for i in range(n - 1, -1, -1):
+            out = set()
+            for s in succ[i]:
+                out |= live_in[s]
+            inn = set(out)
+            if def_sets[i] is not None:
+                inn.discard(def_sets[i])
+            inn |= use_sets[i]
+            if out != live_out[i] or inn != live_in[i]:
+                live_out[i] = frozenset(out)
+                live_in[i] = frozenset(inn)
+                changed = True
+    return live_in, live_out
+
+
+def live_intervals(instrs, live_in):
+    """Intervalo [início, fim] de cada temporário na ordem linear do código."""
+    intervals = {}
+
+    def extend(t, i):
+        if t in intervals:
+            start, end = intervals[t]
+            intervals[t] = (min(start, i), max(end, i))
+        else:
+            intervals[t] = (i, i)
+
+    for i, ins in enumerate(instrs):
+        for t in live_in[i]:
+            extend(t, i)
+        d = dest(ins)
+        if d is not None and is_temp(d):
+            extend(d, i)
+    return intervals
+
+
+def linear_scan(intervals, num_registers=None):
+    """
+    Atribui um registrador a cada intervalo. Um intervalo que termina na
+    instrução em que outro começa libera o registrador para ele, pois os
+    operandos são lidos antes do destino ser escrito.
+    Com num_registers definido, os intervalos que não cabem são derramados
+    (spill) para posições de memória.
+    retorna: (alocação temp -> registrador ou None se derramado, registradores usados)
+    """
+    order = sorted(intervals, key=lambda t: (intervals[t][0], intervals[t][1]))
+    active = []           # heap de (fim, temp)
+    free = []             # heap de registradores livres
+    next_reg = 0
+    assignment = {}
+
+    for t in order:
+        start, end = intervals[t]
+        while active and active[0][0] <= start:
+            _, old = heapq.heappop(active)
+            heapq.heappush(free, assignment[old])
+
+        if free:
+            reg = heapq.heappop(free)
+        elif num_registers is None or next_reg < num_registers:
+            reg = next_reg
+            next_reg += 1
+        else:
+            # derrama o intervalo que termina mais tarde
+            furthest_end, victim = max(active)
+            if furthest_end > end:
+                active.remove((furthest_end, victim))
+                heapq.heapify(active)
+                reg = assignment[victim]
+                assignment[victim] = None
+            else:
+                assignment[t] = None
+                continue
+
+        assignment[t] = reg
+        heapq.heappush(active, (end, t))
+
+    return assignment, next_reg
+
+
+def max_live(live_in, live_out):
+    """Maior número de temporários vivos simultaneamente."""
+    best = 0
+    for inn, out in zip(live_in, live_out):
+        best = max(best, len(inn), len(out))
+    return best
+
+
+def rename_temps(instrs, mapping):
+    """Reescreve destinos e operandos segundo mapping."""
+    out = []
+    get = mapping.get
+    for ins in instrs:
+        kind = ins[0]
+        if kind == 'return' or kind == 'param':
+            ins = (kind, get(ins[1], ins[1]))
+        elif kind == 'if':
+            ins = ('if', get(ins[1], ins[1]), ins[2])
+        elif kind == 'call':
+            ins = ('call', get(ins[1], ins[1]), ins[2], ins[3])
+        elif kind == 'arg':
+            ins = ('arg', get(ins[1], ins[1]), ins[2])
+        elif kind == 'binop':
+            ins = ('binop', get(ins[1], ins[1]), ins[2],
+                   get(ins[3], ins[3]), get(ins[4], ins[4]))
+        elif kind == 'prim' or kind == 'callp':
+            ins = (kind, get(ins[1], ins[1]), ins[2],
+                   tuple(get(a, a) for a in ins[3]))
+        elif kind == 'copy':
+            ins = ('copy', get(ins[1], ins[1]), get(ins[2], ins[2]))
+        out.append(ins)
+    return out
+
+
+class AllocationStats:
+    """Resultado da alocação de uma região."""
+
+    def __init__(self, name, temps, max_live, registers, spilled):
+        self.name = name
+        self.temps = temps
+        self.max_live = max_live
+        self.registers = registers
+        self.spilled = spilled
+
+    def as_dict(self):
+        return {"region": self.name, "temps": self.temps, "max_live": self.max_live,
+                "registers": self.registers, "spilled": self.spilled}
+
+
+class RegisterAllocator:
+    """
+    Renomeia os temporários de cada região para no máximo num_registers
+    registradores (None = quantos forem necessários, que é o máximo de
+    temporários vivos). Temporários derramados viram posições mN.
+    """
+
+    def __init__(self, num_registers=None):
+        self.num_registers = num_registers
+        self.stats = []
+
+    def allocate(self, instrs, name):
+        instrs = rematerialize_constants(instrs)
+        live_in, live_out = liveness(instrs)
+        intervals = live_intervals(instrs, live_in)
+        assignment, used = linear_scan(intervals, self.num_registers)
+
+        mapping = {}
+        spilled = 0
+        for t, reg in assignment.items():
+            if reg is None:
+                mapping[t] = 'm' + t[1:]
+                spilled += 1
+            else:
+                mapping[t] = f"t{reg}"
+
+        self.stats.append(AllocationStats(name, len(intervals), max_live(live_in, live_out),
+                                          used, spilled))
+        return rename_temps(instrs, mapping)
+
+    def run(self, ir):
+        """Aloca registradores em cada região e devolve as novas instruções."""
+        self.stats = []
+        main, functions = split_regions(as_instrs(ir))
+        for fn in functions:
+            fn.instrs = self.allocate(fn.instrs, fn.name)
+        main.instrs = self.allocate(main.instrs, 'main')
+        return join_regions(main, functions)
+
+    def report(self):
+        lines = []
+        for st in self.stats:
+            line = (f"{st.name:<16} temporários {st.temps:5d}  máx. vivos {st.max_live:4d}"
+                    f"  registradores {st.registers:4d}")
+            if st.spilled:
+                line += f"  derramados {st.spilled}"
+            lines.append(line)
+        return lines
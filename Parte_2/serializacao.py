@@ -0,0 +1,367 @@
+# serializacao.py
+# Formato binário compacto para a AST (nós de arvore.py) e
+# para o IR (ir.IRBuffer), usado para guardar artefatos entre etapas do
+# pipeline e entre máquinas sem passar por JSON nem reanalisar o fonte.
+#
+# Layout de um arquivo:
+#   'LSPB' | versão (1 byte) | tipo (b'A' = AST, b'I' = IR)
+#   tabela de símbolos: varint com o tamanho em bytes, depois os textos em
+#   UTF-8 separados por '\0'
+#   fluxo de varints (LEB128 sem sinal) até o fim do arquivo
+#
+# AST: nós em pós-ordem (filhos antes do pai), cada um com uma etiqueta
+# seguida dos seus campos; símbolos (lexemas, tokens, nomes) são índices na
+# tabela, que fica ordenada pela frequência de uso para que os mais comuns
+# ocupem um byte. Números inteiros vão no fluxo (zigzag); reais vão pelo
+# repr, na tabela de símbolos, que volta o mesmo float (inclusive -0.0, inf
+# e nan), como na chave de NodeTable.number. Carregar é um laço com uma pilha de valores, sem recursão,
+# que monta os nós por uma NodeTable: subárvores repetidas voltam
+# compartilhadas (a gravação escreve cada ocorrência).
+#
+# IR: um registro por instrução, com o código de operação de ir.py seguido
+# só dos operandos que ele usa. Operandos em zigzag + 1 (0 = ausente):
+# temporários são inteiros >= 0 e textos são -(índice + 1) no pool do
+# IRBuffer, que vira a tabela de símbolos na mesma ordem.
+import mmap
+
+from arvore import Node, NodeTable
+from ir import (IRBuffer, _RECORD, _NONE, _K_LABEL, _K_GOTO, _K_IF, _K_RETURN,
+                _K_PARAM, _K_CALL, _K_ARG, _K_COPY, _K_CALLP, _K_BINOP, _K_PRIM,
+                BINOP_SYMBOLS, PRIM_NAMES)
+
+MAGIC = b'LSPB'
+VERSION = 1
+KIND_AST = b'A'
+KIND_IR = b'I'
+
+(_T_NUMBER, _T_SYMBOL, _T_NIL, _T_IF, _T_DEFUN, _T_APPLICATION, _T_LIST,
+ _T_NONE, _T_FLOAT) = range(9)
+
+
+class SerialError(Exception):
+    """Dados binários que não estão no formato de serializacao.py."""
+
+
+def _uvarint(out, v):
+    while v >= 0x80:
+        out.append((v & 0x7f) | 0x80)
+        v >>= 7
+    out.append(v)
+
+
+def _zigzag(v):
+    return v << 1 if v >= 0 else ((-v) << 1) - 1
+
+
+def _unzigzag(u):
+    return u >> 1 if not u & 1 else -((u + 1) >> 1)
+
+
+def _decode_varints(data):
+    """Todos os varints de data (memoryview de bytes) numa lista de inteiros."""
+    raw = data.tolist()
+    if max(raw, default=0) < 0x80:
+        return raw   # todo varint cabe em um byte
+    vals = []
+    append = vals.append
+    v = shift = 0
+    for b in raw:
+        if b < 0x80:
+            if shift:
+                append(v | (b << shift))
+                v = shift = 0
+            else:
+                append(b)
+        else:
+            v |= (b & 0x7f) << shift
+            shift += 7
+    if shift:
+        raise SerialError("Varint truncado no fim dos dados")
+    return vals
+
+
+def _pack(kind, symbols, stream):
+    blob = '\0'.join(symbols).encode('utf-8')
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    out += kind
+    _uvarint(out, len(blob) + 1 if symbols else 0)
+    out += blob
+    out += stream
+    return bytes(out)
+
+
+def _unpack(data):
+    """
+    (tipo, símbolos, varints do fluxo) de um arquivo serializado; data é
+    lido por uma memoryview, sem cópia.
+    """
+    if len(data) < 7 or data[:4] != MAGIC:
+        raise SerialError("Cabeçalho inválido: não é um arquivo serializado")
+    if data[4] != VERSION:
+        raise SerialError(f"Versão de formato não suportada: {data[4]}")
+    kind = bytes(data[5:6])
+    size = shift = 0
+    pos = 6
+    while True:
+        if pos >= len(data):
+            raise SerialError("Tabela de símbolos truncada")
+        b = data[pos]
+        pos += 1
+        size |= (b & 0x7f) << shift
+        shift += 7
+        if b < 0x80:
+            break
+    # tamanho + 1, para distinguir a tabela vazia de um único texto vazio
+    if size:
+        size -= 1
+        if pos + size > len(data):
+            raise SerialError("Tabela de símbolos truncada")
+        symbols = str(data[pos:pos + size], 'utf-8').split('\0')
+    else:
+        symbols = []
+    return kind, symbols, _decode_varints(data[pos + size:])
+
+
+# AST
+def _ast_symbols(ast):
+    """Símbolos da AST, do mais para o menos usado."""
+    counts = {}
+    stack = [ast]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, Node):
+            continue
+        ntype = node.type
+        if ntype == "symbol":
+            for text in (node.token, node.lexeme):
+                counts[text] = counts.get(text, 0) + 1
+        elif ntype == "number" and node.value.__class__ is float:
+            text = repr(node.value)
+            counts[text] = counts.get(text, 0) + 1
+        elif ntype == "defun":
+            for text in (node.name, *node.params):
+                counts[text] = counts.get(text, 0) + 1
+            stack.append(node.body)
+        elif ntype == "if":
+            stack.extend((node.cond, node.then, node.else_))
+        elif ntype == "application":
+            stack.append(node.operator)
+            stack.extend(node.args)
+    return sorted(counts, key=counts.get, reverse=True)
+
+
+def dumps_ast(ast):
+    """Bytes da AST ast (um nó, uma lista de nós ou None)."""
+    symbols = _ast_symbols(ast)
+    index = {text: i for i, text in enumerate(symbols)}
+    out = bytearray()
+    append = out.append
+    stack = [(ast, False)]
+    while stack:
+        node, ready = stack.pop()
+        if ready:
+            # filhos já escritos: só a etiqueta do pai e os seus campos
+            if isinstance(node, list):
+                append(_T_LIST)
+                _uvarint(out, len(node))
+            elif node.type == "if":
+                append(_T_IF)
+            elif node.type == "defun":
+                append(_T_DEFUN)
+                _uvarint(out, index[node.name])
+                _uvarint(out, len(node.params))
+                for name in node.params:
+                    _uvarint(out, index[name])
+            else:
+                append(_T_APPLICATION)
+                _uvarint(out, len(node.args))
+            continue
+        if node is None:
+            append(_T_NONE)
+            continue
+        if isinstance(node, list):
+            children = node
+        else:
+            ntype = node.type if isinstance(node, Node) else None
+            if ntype == "number":
+                value = node.value
+                if value.__class__ is float:
+                    append(_T_FLOAT)
+                    _uvarint(out, index[repr(value)])
+                    continue
+                if isinstance(value, int):
+                    append(_T_NUMBER)
+                    _uvarint(out, _zigzag(value))
+                    continue
+            if ntype == "symbol":
+                append(_T_SYMBOL)
+                _uvarint(out, index[node.token])
+                _uvarint(out, index[node.lexeme])
+                continue
+            if ntype == "nil":
+                append(_T_NIL)
+                continue
+            if ntype == "if":
+                children = (node.cond, node.then, node.else_)
+            elif ntype == "defun":
+                children = (node.body,)
+            elif ntype == "application":
+                children = (node.operator, *node.args)
+            else:
+                raise TypeError(f"Nó de AST não serializável: {node!r}")
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children))
+    return _pack(KIND_AST, symbols, out)
+
+
+def _build_ast(symbols, vals):
+    nodes = NodeTable()
+    values = []
+    push = values.append
+    pop = values.pop
+    it = iter(vals)
+    for tag in it:
+        if tag == _T_SYMBOL:
+            push(nodes.symbol(symbols[next(it)], symbols[next(it)]))
+        elif tag == _T_NUMBER:
+            push(nodes.number(_unzigzag(next(it))))
+        elif tag == _T_APPLICATION:
+            n = next(it)
+            args = values[len(values) - n:]
+            del values[len(values) - n:]
+            push(nodes.application(pop(), args))
+        elif tag == _T_NIL:
+            push(nodes.nil())
+        elif tag == _T_IF:
+            else_ = pop()
+            then = pop()
+            push(nodes.if_(pop(), then, else_))
+        elif tag == _T_DEFUN:
+            name = symbols[next(it)]
+            params = [symbols[next(it)] for _ in range(next(it))]
+            push(nodes.defun(name, params, pop()))
+        elif tag == _T_LIST:
+            n = next(it)
+            items = values[len(values) - n:]
+            del values[len(values) - n:]
+            push(items)
+        elif tag == _T_NONE:
+            push(None)
+        elif tag == _T_FLOAT:
+            push(nodes.number(float(symbols[next(it)])))
+        else:
+            raise SerialError(f"Etiqueta de nó inválida: {tag}")
+    if len(values) != 1:
+        raise SerialError("Fluxo da AST mal formado")
+    return values[0]
+
+
+# IR
+def dumps_ir(ir):
+    """Bytes do IR ir (IRBuffer ou instruções em tuplas)."""
+    if not isinstance(ir, IRBuffer):
+        ir = IRBuffer(ir)
+    extra = ir.extra
+    out = bytearray()
+    append = out.append
+    for op, d, a, b in _RECORD.iter_unpack(ir.data):
+        append(op)
+        if op >= _K_BINOP or op == _K_CALL:
+            fields = (d, a, b)
+        elif op == _K_COPY or op == _K_ARG:
+            fields = (d, a)
+        elif op == _K_IF:
+            fields = (a, b)
+        elif op == _K_CALLP:
+            n = extra[b]
+            fields = (d, a, n, *extra[b + 1:b + 1 + n])
+        else:
+            fields = (a,)
+        for v in fields:
+            u = 0 if v == _NONE else (v << 1) + 1 if v >= 0 else -v << 1
+            if u < 0x80:
+                append(u)
+            else:
+                _uvarint(out, u)
+    return _pack(KIND_IR, ir.pool, out)
+
+
+_IR_OPS = {_K_LABEL, _K_GOTO, _K_IF, _K_RETURN, _K_PARAM, _K_CALL, _K_ARG, _K_COPY,
+           _K_CALLP, *range(_K_BINOP, _K_BINOP + len(BINOP_SYMBOLS)),
+           *range(_K_PRIM, _K_PRIM + len(PRIM_NAMES))}
+
+
+def _build_ir(symbols, vals):
+    def field(u):
+        return _NONE if u == 0 else (u - 1) >> 1 if u & 1 else -(u >> 1)
+
+    pack = _RECORD.pack
+    records = []
+    extra = []
+    it = iter(vals)
+    for op in it:
+        if op >= _K_BINOP or op == _K_CALL:
+            rec = pack(op, field(next(it)), field(next(it)), field(next(it)))
+        elif op == _K_COPY or op == _K_ARG:
+            rec = pack(op, field(next(it)), field(next(it)), _NONE)
+        elif op == _K_IF:
+            rec = pack(op, _NONE, field(next(it)), field(next(it)))
+        elif op == _K_CALLP:
+            d, a, n = field(next(it)), field(next(it)), field(next(it))
+            rec = pack(op, d, a, len(extra))
+            extra.append(n)
+            extra.extend(field(next(it)) for _ in range(n))
+        elif op in _IR_OPS:
+            rec = pack(op, _NONE, field(next(it)), _NONE)
+        else:
+            raise SerialError(f"Código de operação inválido: {op}")
+        records.append(rec)
+    code = IRBuffer()
+    code.data = bytearray(b''.join(records))
+    code.extra.extend(extra)
+    code.pool = symbols
+    code._pool_index = {text: i for i, text in enumerate(symbols)}
+    return code
+
+
+def loads(data):
+    """AST ou IRBuffer serializado em data (bytes, bytearray, memoryview ou mmap)."""
+    # a view é liberada antes de voltar: um mmap com views abertas não fecha
+    with memoryview(data) as view:
+        kind, symbols, vals = _unpack(view)
+    try:
+        if kind == KIND_AST:
+            return _build_ast(symbols, vals)
+        if kind == KIND_IR:
+            return _build_ir(symbols, vals)
+    except (StopIteration, IndexError) as e:
+        raise SerialError("Dados truncados ou mal formados") from e
+    raise SerialError(f"Tipo de conteúdo desconhecido: {kind!r}")
+
+
+def dump_ast(ast, f):
+    f.write(dumps_ast(ast))
+
+
+def dump_ir(ir, f):
+    f.write(dumps_ir(ir))
+
+
+def load(f):
+    return loads(f.read())
+
+
+def load_path(path, use_mmap=False):
+    """
+    Carrega o arquivo path; com use_mmap o arquivo é mapeado em memória em
+    vez de lido para um buffer.
+    """
+    with open(path, 'rb') as f:
+        if not use_mmap:
+            return loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return loads(mm)
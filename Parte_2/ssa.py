@@ -0,0 +1,341 @@
+# ssa.py
+# Forma SSA sobre o CFG de cfg.py, numeração global de valores (GVN) e
+# conversão de volta para o código de 3-endereços comum.
+#
+# Os temporários escritos mais de uma vez (o resultado de cada 'if', escrito
+# nos dois ramos) recebem uma versão nova por definição e nós phi nos pontos
+# de junção; o phi fica no início do bloco como
+#   ('phi', destino, {rótulo_do_predecessor: operando})
+from ir import dest, uses, is_temp, is_constant, replace_uses
+from cfg import BasicBlock, build_cfg, linearize, remove_unreachable
+
+_COMMUTATIVE = {'+', '*', '=', '!='}
+
+# primitivas sem efeito colateral que podem ser reaproveitadas
+_PURE_CALLS = {'div', 'mod', 'exp'}
+
+
+def dominators(cfg):
+    """
+    Dominador imediato de cada bloco alcançável (algoritmo iterativo de
+    Cooper, Harvey e Kennedy). A entrada é dominada por si mesma.
+    """
+    rpo = cfg.reverse_postorder()
+    index = {label: i for i, label in enumerate(rpo)}
+    preds = cfg.predecessors()
+    idom = {cfg.entry: cfg.entry}
+
+    def intersect(a, b):
+        while a != b:
+            while index[a] > index[b]:
+                a = idom[a]
+            while index[b] > index[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        for label in rpo[1:]:
+            new = None
+            for p in preds[label]:
+                if p in idom:
+                    new = p if new is None else intersect(p, new)
+            if new is not None and idom.get(label) != new:
+                idom[label] = new
+                changed = True
+    return idom
+
+
+def dominator_tree(idom):
+    children = {label: [] for label in idom}
+    for label, parent in idom.items():
+        if label != parent:
+            children[parent].append(label)
+    return children
+
+
+def dominance_frontiers(cfg, idom):
+    preds = cfg.predecessors()
+    df = {label: set() for label in idom}
+    for label in idom:
+        ps = [p for p in preds[label] if p in idom]
+        if len(ps) < 2:
+            continue
+        for p in ps:
+            runner = p
+            while runner != idom[label]:
+                df[runner].add(label)
+                runner = idom[runner]
+    return df
+
+
+def _max_temp(instrs):
+    best = -1
+    for ins in instrs:
+        for name in uses(ins) + ((dest(ins),) if dest(ins) else ()):
+            if is_temp(name):
+                best = max(best, int(name[1:]))
+    return best
+
+
+def _phi_uses(ins):
+    return tuple(ins[2].values())
+
+
+def _uses(ins):
+    return _phi_uses(ins) if ins[0] == 'phi' else uses(ins)
+
+
+class SSAFunction:
+    """Região em forma SSA: CFG, dominadores e contador de temporários novos."""
+
+    def __init__(self, instrs):
+        self.cfg = build_cfg(instrs)
+        remove_unreachable(self.cfg)
+        self.idom = dominators(self.cfg)
+        self.tree = dominator_tree(self.idom)
+        self.next_temp = _max_temp(instrs) + 1
+        self.unsafe = set()
+
+    def fresh(self):
+        name = f"t{self.next_temp}"
+        self.next_temp += 1
+        return name
+
+    def walk(self):
+        """Percurso da árvore de dominadores: ('enter', rótulo) / ('exit', rótulo)."""
+        stack = [('enter', self.cfg.entry)]
+        while stack:
+            event, label = stack.pop()
+            yield event, label
+            if event == 'enter':
+                stack.append(('exit', label))
+                for child in reversed(self.tree[label]):
+                    stack.append(('enter', child))
+
+
+def to_ssa(instrs):
+    """Constrói o CFG da região e o converte para SSA."""
+    fn = SSAFunction(instrs)
+    cfg = fn.cfg
+    reachable = fn.idom
+
+    def_blocks = {}
+    for b in cfg:
+        if b.label not in reachable:
+            continue
+        for ins in b.body:
+            d = dest(ins)
+            if d is not None:
+                def_blocks.setdefault(d, []).append(b.label)
+
+    multi = {v for v, blocks in def_blocks.items() if len(blocks) > 1}
+    # variáveis nomeadas reescritas não são versionadas: ficam fora da GVN
+    fn.unsafe = {v for v in multi if not is_temp(v)}
+    versioned = multi - fn.unsafe
+
+    # inserção de phi na fronteira de dominância iterada
+    df = dominance_frontiers(cfg, fn.idom)
+    phis = {label: {} for label in reachable}
+    for v in versioned:
+        work = list(set(def_blocks[v]))
+        has_phi = set()
+        while work:
+            label = work.pop()
+            for y in df[label]:
+                if y not in has_phi:
+                    has_phi.add(y)
+                    phis[y][v] = ('phi', v, {})
+                    if y not in def_blocks[v]:
+                        work.append(y)
+
+    # renomeação ao longo da árvore de dominadores
+    stacks = {v: [] for v in versioned}
+    pushed = {}
+
+    def current(name):
+        s = stacks.get(name)
+        return s[-1] if s else name
+
+    for event, label in fn.walk():
+        b = cfg.blocks[label]
+        if event == 'exit':
+            for v in pushed.pop(label):
+                stacks[v].pop()
+            continue
+
+        defined = []
+        new_phis = []
+        for v, phi in phis[label].items():
+            name = fn.fresh()
+            stacks[v].append(name)
+            defined.append(v)
+            new_phis.append(('phi', name, phi[2]))
+        body = []
+        for ins in b.body:
+            ins = replace_uses(ins, {u: current(u) for u in uses(ins) if u in stacks})
+            d = dest(ins)
+            if d in stacks:
+                name = fn.fresh()
+                stacks[d].append(name)
+                defined.append(d)
+                ins = (ins[0], name) + ins[2:]
+            body.append(ins)
+        b.body = new_phis + body
+        b.term = _rename_term(b.term, current, stacks)
+
+        # o dicionário de operandos é compartilhado com o phi já renomeado
+        for s in b.successors():
+            for v, phi in phis[s].items():
+                phi[2][label] = current(v)
+        pushed[label] = defined
+
+    return fn
+
+
+def _rename_term(term, current, stacks):
+    if term[0] == 'br' and term[1] in stacks:
+        return ('br', current(term[1]), term[2], term[3])
+    if term[0] == 'return' and term[1] in stacks:
+        return ('return', current(term[1]))
+    return term
+
+
+def _expression_key(ins, vn):
+    """Chave de valor para instruções puras, ou None."""
+    kind = ins[0]
+    if kind == 'binop':
+        a, b = vn(ins[3]), vn(ins[4])
+        if ins[2] in _COMMUTATIVE and b < a:
+            a, b = b, a
+        return ('binop', ins[2], a, b)
+    if kind == 'prim' and ins[2] != 'CONS':
+        args = tuple(vn(a) for a in ins[3])
+        if ins[2] == 'EQ' and len(args) == 2 and args[1] < args[0]:
+            args = (args[1], args[0])
+        return ('prim', ins[2], args)
+    if kind == 'callp' and ins[2] in _PURE_CALLS:
+        return ('callp', ins[2], tuple(vn(a) for a in ins[3]))
+    return None
+
+
+def global_value_numbering(fn):
+    """
+    Numeração de valores com tabela com escopo na árvore de dominadores:
+    uma expressão já calculada em um bloco dominante vira cópia do nome que
+    a calculou. Phis cujos operandos têm todos o mesmo valor também viram cópia.
+    retorna: quantidade de instruções substituídas
+    """
+    values = {}
+    table = {}
+    available = set()
+    undo = {}
+    replaced = 0
+
+    def vn(name):
+        if is_constant(name):
+            return 'const:' + name
+        return values.get(name, name)
+
+    for event, label in fn.walk():
+        if event == 'exit':
+            keys, names = undo.pop(label)
+            for k in keys:
+                del table[k]
+            available.difference_update(names)
+            continue
+
+        b = fn.cfg.blocks[label]
+        keys = []
+        names = []
+        body = []
+        for ins in b.body:
+            d = dest(ins) if ins[0] != 'phi' else ins[1]
+            operands = _uses(ins)
+            if any(u in fn.unsafe for u in operands) or d in fn.unsafe:
+                body.append(ins)
+                continue
+
+            if ins[0] == 'phi':
+                args = set(vn(a) for a in ins[2].values())
+                if len(args) == 1:
+                    leader = args.pop()
+                    if leader.startswith('const:'):
+                        leader = leader[len('const:'):]
+                    if is_constant(leader) or leader in available:
+                        ins = ('copy', d, leader)
+                        replaced += 1
+                values[d] = vn(ins[2]) if ins[0] == 'copy' else d
+            elif ins[0] == 'copy':
+                values[d] = vn(ins[2])
+            else:
+                key = _expression_key(ins, vn)
+                if key is not None and key in table:
+                    ins = ('copy', d, table[key])
+                    values[d] = vn(table[key])
+                    replaced += 1
+                else:
+                    if key is not None:
+                        table[key] = d
+                        keys.append(key)
+                    if d is not None:
+                        values[d] = d
+            if d is not None:
+                available.add(d)
+                names.append(d)
+            body.append(ins)
+
+        # phis substituídos por cópias precisam ficar depois dos phis restantes
+        phis = [ins for ins in body if ins[0] == 'phi']
+        rest = [ins for ins in body if ins[0] != 'phi']
+        b.body = phis + rest
+        undo[label] = (keys, names)
+    return replaced
+
+
+def from_ssa(fn):
+    """Troca cada phi por cópias nos predecessores e lineariza o CFG."""
+    cfg = fn.cfg
+    preds = cfg.predecessors()
+    for label in list(cfg.order):
+        b = cfg.blocks[label]
+        phis = [ins for ins in b.body if ins[0] == 'phi']
+        if not phis:
+            continue
+        b.body = [ins for ins in b.body if ins[0] != 'phi']
+        for p in preds[label]:
+            if p not in fn.idom:
+                continue
+            copies = [('copy', phi[1], phi[2][p]) for phi in phis if p in phi[2]]
+            pred = cfg.blocks[p]
+            if len(pred.successors()) > 1:
+                # aresta crítica: as cópias vão para um bloco novo no meio dela
+                edge = _split_edge(cfg, pred, label)
+                edge.body = copies
+            else:
+                pred.body.extend(copies)
+    return linearize(cfg)
+
+
+def _split_edge(cfg, pred, target):
+    label = f"{pred.label}_{target}"
+    edge = BasicBlock(label)
+    edge.term = ('goto', target)
+    term = pred.term
+    pred.term = ('br', term[1],
+                 label if term[2] == target else term[2],
+                 label if term[3] == target else term[3])
+    cfg.blocks[label] = edge
+    cfg.order.insert(cfg.order.index(pred.label) + 1, label)
+    return edge
+
+
+def gvn(instrs):
+    """Passe de otimização: SSA, numeração global de valores e volta do SSA."""
+    if not instrs:
+        return instrs
+    fn = to_ssa(instrs)
+    if global_value_numbering(fn) == 0:
+        return instrs
+    return from_ssa(fn)
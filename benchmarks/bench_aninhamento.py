@@ -0,0 +1,92 @@
+# bench_aninhamento.py
+# Expressões aninhadas em profundidades muito maiores que o limite de
+# recursão do Python: eval_expr, compile_expr e eval_batch (este só com
+# NumPy instalado) de Parte_1/interpretador.py e analyze_and_generate
+# (Parte_2/codigo_intermediario.py), que percorrem a AST com pilha
+# explícita. Para cada profundidade informa o tempo por nó e o pico de
+# memória alocada durante o percurso (tracemalloc, medido numa execução
+# separada), que deve crescer linearmente com a profundidade.
+#
+# Uso: python benchmarks/bench_aninhamento.py [profundidade ...]
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+import interpretador
+
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+import codigo_intermediario as ci
+from cache_ply import cached_parser
+from ir import IRBuffer
+
+
+def nested_binop(depth):
+    """(+ x (- 1 (+ x (- 1 ... x))))"""
+    ops = ['+', '-', '*']
+    head = "".join(f"({ops[i % 3]} {'x' if i % 2 else 1} " for i in range(depth))
+    return head + "x" + ")" * depth
+
+
+def nested_if(depth):
+    """(defun f (x) (if (< x 1) x (if (< x 2) x ... x)))"""
+    head = "".join(f"(if (< x {i}) (+ x {i}) " for i in range(depth))
+    return "(defun f (x) " + head + "x" + ")" * depth + ")"
+
+
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    depths = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    print(f"limite de recursão do Python: {sys.getrecursionlimit()}")
+    ci_parser = cached_parser(ci, start='expr')
+    ci_scanner = ci.make_scanner()
+    interpretador.env['x'] = 2
+
+    for depth in depths:
+        print(f"profundidade {depth}")
+        ast = interpretador.parser.parse(nested_binop(depth), lexer=interpretador.scanner)
+        nodes = 2 * depth + 1
+        rows = [('eval_expr', nodes, lambda: interpretador.eval_expr(ast)),
+                ('compile_expr', nodes, lambda: interpretador.compile_expr(ast)(interpretador.env))]
+        if numpy is not None:
+            columns = {'x': numpy.arange(4)}
+            rows.append(('eval_batch', nodes, lambda: interpretador.eval_batch(ast, columns)))
+
+        for name, source in (('binop', nested_binop(depth)), ('if', nested_if(depth))):
+            node = ci_parser.parse(source, lexer=ci_scanner)
+            functions = {'f': {'params': ['x'], 'body': None}}
+            nodes = (2 if name == 'binop' else 7) * depth + 1
+
+            def fused(node=node, functions=functions):
+                errors = []
+                ctx = ci.CodegenContext(functions)
+                ci.analyze_and_generate(node, {'x': 'x'}, IRBuffer(), ctx, errors)
+                assert not errors, errors[:3]
+
+            rows.append((f"uma passada ({name})", nodes, fused))
+
+        for label, nodes, fn in rows:
+            elapsed, peak = measure(fn)
+            print(f"  {label:<20} {elapsed * 1000:9.1f} ms  {elapsed / nodes * 1e6:6.2f} us/nó  "
+                  f"pico {peak / 1024:9.1f} KiB ({peak / depth:6.0f} B/nível)")
+
+
+if __name__ == "__main__":
+    main()
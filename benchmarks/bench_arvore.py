@@ -0,0 +1,99 @@
+# bench_arvore.py
+# Memória da AST de programas gerados: os nós de arvore.py, com
+# hash-consing, contra a mesma árvore em dicts (um por ocorrência, como o
+# parser montava antes), somando sys.getsizeof de cada objeto alcançável
+# uma vez só, e comparadas ao tamanho do fonte. Informa também quantos nós
+# distintos a árvore tem e o tempo de parse e da análise semântica com a
+# geração de código (compile com profile).
+#
+# Uso: python benchmarks/bench_arvore.py [escala]
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+import geradores
+from arvore import Node
+
+
+def as_dicts(ast):
+    """
+    A AST em dicts, uma cópia por ocorrência; os lexemas também são
+    cópias, como as fatias do fonte que o scanner devolve.
+    """
+    def copy(node):
+        if node.type == "symbol":
+            lexeme = node.lexeme
+            return {"type": "symbol", "token": node.token,
+                    "lexeme": lexeme[:1] + lexeme[1:] if len(lexeme) > 1 else lexeme}
+        d = node.as_dict()
+        for key, value in d.items():
+            if isinstance(value, Node):
+                pending.append((d, key, value))
+            elif isinstance(value, tuple):
+                # args (nós) ou params (nomes)
+                d[key] = items = list(value)
+                for i, item in enumerate(value):
+                    if isinstance(item, Node):
+                        pending.append((items, i, item))
+        return d
+
+    top = [None] * len(ast)
+    pending = [(top, i, node) for i, node in enumerate(ast)]
+    while pending:
+        parent, key, node = pending.pop()
+        parent[key] = copy(node)
+    return top
+
+
+def deep_size(root):
+    """(bytes, nós distintos) de tudo o que root alcança, cada objeto uma vez."""
+    seen = set()
+    size = nodes = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, Node):
+            nodes += 1
+            stack.extend(getattr(obj, name) for name in obj.__slots__)
+        elif isinstance(obj, dict):
+            nodes += 1
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return size, nodes
+
+
+def main():
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    workloads = [("defuns", geradores.small_defuns, 2000),
+                 ("aritmetica", geradores.nested_arith, 2000),
+                 ("if", geradores.wide_if, 4096),
+                 ("cons", geradores.cons_lists, 200)]
+    print(f"{'programa':<11} {'fonte':>9} {'nós':>8} {'distintos':>9} "
+          f"{'dicts':>10} {'arvore.py':>10} {'parse':>9} {'sem+codegen':>12}")
+    for name, generator, size in workloads:
+        source = generator(max(1, int(size * scale)))
+        result = ci.compile(source, optimize=False, profile=True)
+        times = {phase: seconds for phase, seconds, _ in result["profile"].phases}
+        ast = result["ast"]
+
+        nodes_bytes, unique = deep_size(ast)
+        dict_bytes, _ = deep_size(as_dicts(ast))
+
+        kib = len(source) / 1024
+        print(f"{name:<11} {kib:5.0f} KiB {ci.count_nodes(ast):8d} {unique:9d} "
+              f"{dict_bytes / 1024 / kib:8.1f}x {nodes_bytes / 1024 / kib:9.1f}x "
+              f"{times['parse'] * 1000:6.1f} ms {times['semantic+codegen'] * 1000:9.1f} ms")
+    print("(dicts e arvore.py: memória da AST dividida pelo tamanho do fonte)")
+
+
+if __name__ == "__main__":
+    main()
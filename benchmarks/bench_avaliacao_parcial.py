@@ -0,0 +1,75 @@
+# bench_avaliacao_parcial.py
+# Compilação e execução de programas gerados com e sem a avaliação parcial
+# (avaliacao_parcial.py): tempo de compile(), instruções do IR final, tempo
+# de carga e execução na maquina_virtual e o combustível gasto. Confere que
+# o valor do programa é o mesmo nos dois casos. Em fib parte das chamadas
+# esgota o combustível, e o último programa chama uma função que não
+# termina (e por isso não é executado).
+#
+# Uso: python benchmarks/bench_avaliacao_parcial.py [escala]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+import geradores
+import maquina_virtual
+from avaliacao_parcial import PartialEvaluator
+
+
+def fib_program(count):
+    # de fib 10 a fib 17: as maiores passam do combustível de uma chamada
+    calls = "".join(f"(fib {10 + i % 8})\n" for i in range(count))
+    return "(defun fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))\n" + calls
+
+
+def loop_program(count):
+    return "(defun laco (n) (laco (+ n 1)))\n" + "".join(
+        f"(if (< {i} 0) (laco {i}) {i})\n" for i in range(count)) + "(laco 0)\n"
+
+
+def measure(source, evaluator, run=True):
+    ci.partial_evaluator = evaluator
+    start = time.perf_counter()
+    result = ci.compile(source)
+    compiled = time.perf_counter() - start
+    if not result["sem_ok"]:
+        raise RuntimeError(f"programa gerado com erros: {result['errors'][:3]}")
+    value = None
+    start = time.perf_counter()
+    if run:
+        value = maquina_virtual.load_ir(result["ir"]).run()
+    executed = time.perf_counter() - start
+    return compiled, executed, len(result["ir"]), value, result["partial_eval"]
+
+
+def main():
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    workloads = [("defuns", geradores.small_defuns, 400, True),
+                 ("aritmetica", geradores.nested_arith, 2000, True),
+                 ("argumentos", geradores.long_args, 500, True),
+                 ("if", geradores.wide_if, 1024, True),
+                 ("cons", geradores.cons_lists, 40, True),
+                 ("fib", fib_program, 40, True),
+                 ("laco", loop_program, 200, False)]
+    print(f"{'programa':<11} {'':>4} {'compile':>10} {'execução':>10} {'IR':>6} "
+          f"{'combustível':>11}")
+    for name, generator, size, run in workloads:
+        source = generator(max(1, int(size * scale)))
+        values = []
+        for label, evaluator in (("sem", None), ("com", PartialEvaluator())):
+            compiled, executed, instrs, value, stats = measure(source, evaluator, run)
+            values.append(maquina_virtual.format_value(value))
+            fuel = stats["fuel_used"] if stats else "-"
+            print(f"{name if label == 'sem' else '':<11} {label:>4} {compiled * 1000:7.1f} ms "
+                  f"{executed * 1000:7.1f} ms {instrs:6d} {fuel:>11}")
+        assert values[0] == values[1], (name, values)
+    print("(laco não é executado: a chamada que não termina fica no IR residual)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# bench_compile_concorrente.py
+# Vazão de codigo_intermediario.compile servindo pedidos a partir de um pool
+# de threads de vida longa, contra um processo novo por pedido (o que era
+# necessário quando o estado da compilação ficava em variáveis globais).
+# Confere que os resultados das threads são iguais aos da execução em série.
+#
+# Uso: python benchmarks/bench_compile_concorrente.py [pedidos] [threads]
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+from bench_stream import make_program
+from ir import format_ir
+
+# executado em um processo filho por pedido
+CHILD = "import sys, codigo_intermediario as ci; ci.compile(sys.stdin.read())"
+
+
+def summary(result):
+    ir = result.get("ir")
+    return result["sem_ok"], tuple(result.get("errors", ())), ir and tuple(format_ir(ir))
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    programs = [make_program(20, seed) for seed in range(requests)]
+
+    start = time.perf_counter()
+    expected = [summary(ci.compile(p)) for p in programs]
+    t_serial = time.perf_counter() - start
+
+    with ThreadPoolExecutor(threads) as pool:
+        pool.submit(ci.compile, "1").result()  # cria os parsers das threads
+        start = time.perf_counter()
+        got = list(pool.map(lambda p: summary(ci.compile(p)), programs))
+        t_pool = time.perf_counter() - start
+    assert got == expected
+
+    sample = min(requests, 20)
+    start = time.perf_counter()
+    for p in programs[:sample]:
+        subprocess.run([sys.executable, "-c", CHILD], input=p, text=True, check=True,
+                       cwd=os.path.join(ROOT, 'Parte_2'), stdout=subprocess.DEVNULL)
+    t_spawn = (time.perf_counter() - start) * requests / sample
+
+    print(f"{requests} pedidos de ~{sum(map(len, programs)) // requests} caracteres")
+    print(f"  em série            {requests / t_serial:8.1f} pedidos/s")
+    print(f"  pool de {threads:<2} threads    {requests / t_pool:8.1f} pedidos/s")
+    print(f"  processo por pedido {requests / t_spawn:8.1f} pedidos/s  (amostra de {sample})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_eval_batch.py
+# Mesma expressão avaliada sobre N linhas de variáveis: eval_expr linha a
+# linha (mudando o env global), a forma compilada em closures e eval_batch
+# com colunas NumPy (Parte_1/interpretador.py).
+#
+# Uso: python benchmarks/bench_eval_batch.py [linhas]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+
+import numpy as np
+
+import interpretador
+
+SOURCE = "(+ (* x 3) (- (* y y) (/ x (+ y 1))))"
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ast = interpretador.parser.parse(SOURCE, lexer=interpretador.lexer)
+    rng = np.random.default_rng(0)
+    xs = rng.integers(0, 1000, rows)
+    ys = rng.integers(0, 1000, rows)
+
+    start = time.perf_counter()
+    batch = interpretador.eval_batch(ast, {'x': xs, 'y': ys})
+    t_batch = time.perf_counter() - start
+
+    # os laços por linha são medidos numa amostra e extrapolados
+    sample = min(rows, 100_000)
+    x_list, y_list = xs[:sample].tolist(), ys[:sample].tolist()
+    env = interpretador.env
+
+    start = time.perf_counter()
+    for x, y in zip(x_list, y_list):
+        env['x'] = x
+        env['y'] = y
+        interpretador.eval_expr(ast)
+    t_tree = (time.perf_counter() - start) * rows / sample
+
+    code = interpretador.compile_expr(ast)
+    start = time.perf_counter()
+    for x, y in zip(x_list, y_list):
+        code({'x': x, 'y': y})
+    t_closure = (time.perf_counter() - start) * rows / sample
+
+    env['x'], env['y'] = x_list[-1], y_list[-1]
+    assert abs(interpretador.eval_expr(ast) - batch[sample - 1]) < 1e-9
+
+    print(f"{rows} linhas: {SOURCE}")
+    print(f"eval_expr  : {t_tree * 1000:10.1f} ms")
+    print(f"closures   : {t_closure * 1000:10.1f} ms  ({t_tree / t_closure:.1f}x)")
+    print(f"eval_batch : {t_batch * 1000:10.1f} ms  ({t_tree / t_batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
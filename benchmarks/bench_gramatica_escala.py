@@ -0,0 +1,63 @@
+# bench_gramatica_escala.py
+# Escala da análise sintática com o número de itens de uma lista da
+# gramática: N forms de nível superior (expr_list) e uma chamada com N
+# argumentos (expr_list em sintatica.py, elements em
+# codigo_intermediario.py). Com listas recursivas à esquerda o tempo por
+# item fica constante de 10^2 a 10^6; a coluna "x" é a razão entre o tempo
+# por item e o da primeira linha.
+#
+# Em codigo_intermediario.py o símbolo inicial é expr_list, para medir só a
+# gramática (p_program faria semântica e geração de código).
+#
+# Uso: python benchmarks/bench_gramatica_escala.py [expoente máximo]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+import sintatica
+
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+import codigo_intermediario
+from cache_ply import cached_parser
+
+
+def forms(n):
+    return "(+ x 1)\n" * n
+
+
+def call(n):
+    return "(f " + " ".join(str(i % 10) for i in range(n)) + ")"
+
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    ci_parser = cached_parser(codigo_intermediario, start='expr_list')
+    cases = [
+        ('sintatica', 'forms', sintatica.parser, sintatica.scanner, forms),
+        ('sintatica', 'args', sintatica.parser, sintatica.scanner, call),
+        ('codigo_intermediario', 'forms', ci_parser, codigo_intermediario.make_scanner(), forms),
+        ('codigo_intermediario', 'args', ci_parser, codigo_intermediario.make_scanner(), call),
+    ]
+    for grammar, kind, parser, scanner, make in cases:
+        print(f"{grammar} ({kind})")
+        parser.parse(make(100), lexer=scanner)  # aquecimento
+        base = None
+        for e in range(2, top + 1):
+            n = 10 ** e
+            data = make(n)
+            elapsed = float('inf')
+            for _ in range(3 if n <= 10 ** 4 else 1):
+                start = time.perf_counter()
+                result = parser.parse(data, lexer=scanner)
+                elapsed = min(elapsed, time.perf_counter() - start)
+            assert result is not None
+            per_item = elapsed / n
+            base = base or per_item
+            print(f"  N=10^{e}  {elapsed:9.3f} s  {per_item * 1e6:7.2f} us/item  "
+                  f"{per_item / base:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
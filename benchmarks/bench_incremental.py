@@ -0,0 +1,75 @@
+# bench_incremental.py
+# Ciclo de edição e recompilação com codigo_intermediario.IncrementalCompiler
+# contra compile() do programa inteiro (os dois sem otimização). Mede a
+# compilação inicial (cache vazio), a reabertura com o cache em disco e
+# edições de uma função: só o corpo (só ela é recompilada) e a aridade (ela
+# e quem a chama). Confere que o IR é o mesmo da compilação completa.
+#
+# Uso: python benchmarks/bench_incremental.py [forms]
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+from bench_stream import make_program
+from ir import format_ir
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def same_ir(a, b):
+    return a["sem_ok"] and b["sem_ok"] and format_ir(a["ir"]) == format_ir(b["ir"])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    forms = list(ci.iter_forms(io.StringIO(make_program(count))))
+    source = "\n".join(forms)
+    folder = tempfile.mkdtemp()
+    cache = os.path.join(folder, "prog.marshal")
+    try:
+        t_full, full = timed(lambda: ci.compile(source, optimize=False))
+        print(f"{len(forms)} forms, {len(source) / 1024:.0f} KiB")
+        print(f"  compile() completo          {t_full * 1000:9.1f} ms")
+
+        compiler = ci.IncrementalCompiler(cache)
+        t, result = timed(lambda: compiler.compile(source))
+        assert same_ir(result, full)
+        print(f"  incremental, cache vazio    {t * 1000:9.1f} ms  {result['stats']}")
+
+        t, result = timed(lambda: ci.IncrementalCompiler(cache).compile(source))
+        assert same_ir(result, full)
+        print(f"  reabrindo o cache do disco  {t * 1000:9.1f} ms  {result['stats']}")
+
+        # edita o corpo da função do meio
+        k = next(i for i in range(len(forms) // 2, len(forms)) if forms[i].startswith("(defun"))
+        name = forms[k].split()[1]
+        edits = [
+            ("corpo de " + name, forms[k].replace("(x y)", "(x y) (+ 0", 1) + ")"),
+            ("aridade de " + name, forms[k].replace("(x y)", "(x y z)", 1)),
+        ]
+        for label, new_form in edits:
+            edited = "\n".join(forms[:k] + [new_form] + forms[k + 1:])
+            t, result = timed(lambda: compiler.compile(edited))
+            reference = ci.compile(edited, optimize=False)
+            assert result["sem_ok"] == reference["sem_ok"]
+            assert result["sem_ok"] is False or same_ir(result, reference)
+            print(f"  editando {label:<18} {t * 1000:9.1f} ms  {result['stats']}"
+                  f"{'' if result['sem_ok'] else '  (erros: chamadas com aridade antiga)'}")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_inicializacao.py
+# Custo de início dos front ends.
+#
+# 1) Processo novo por execução: com as tabelas PLY ainda não geradas (frio)
+#    e lidas de __plycache__ (quente). A linha "python + ply" é o piso: só o
+#    interpretador e o import do PLY.
+# 2) Dentro de um processo: construção do lexer + parser no modo padrão do
+#    PLY com a tabela inválida (o que acontecia quando outro front end
+#    sobrescrevia parsetab.py: validação, geração LALR e parser.out) contra
+#    cached_lexer/cached_parser.
+#
+# Uso: python benchmarks/bench_inicializacao.py [processos]
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRONT_ENDS = [
+    ('interpretador', 'Parte_1', "import interpretador"),
+    ('sintatica', 'Parte_1', "import sintatica"),
+    ('codigo_intermediario', 'Parte_2',
+     "import codigo_intermediario as m; m.make_parser()"),
+]
+
+# executado em um processo filho, no diretório do front end
+BUILD_TIMES = """
+import json, sys, tempfile, time
+import ply.lex as lex, ply.yacc as yacc
+import {name} as m
+from cache_ply import cached_lexer, cached_parser
+
+def best(fn, runs={runs}):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+out = tempfile.mkdtemp()
+def default():
+    lex.lex(module=m)
+    yacc.yacc(module=m, outputdir=out, write_tables=False)
+
+def cached():
+    cached_lexer(m)
+    cached_parser(m)
+
+print(json.dumps({{"default": best(default), "cached": best(cached)}}))
+"""
+
+
+def spawn(cwd, code):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def clear_cache(cwd, name):
+    for path in glob.glob(os.path.join(cwd, '__plycache__', name + '_*')):
+        os.remove(path)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    floor = min(spawn(ROOT, "import ply.lex, ply.yacc") for _ in range(runs))
+    print("processo novo (melhor de %d)" % runs)
+    print(f"  {'python + ply':<22} {floor * 1000:8.1f} ms")
+
+    for name, part, code in FRONT_ENDS:
+        cwd = os.path.join(ROOT, part)
+        cold = []
+        for _ in range(runs):
+            clear_cache(cwd, name)
+            cold.append(spawn(cwd, code))
+        warm = [spawn(cwd, code) for _ in range(runs)]
+        print(f"  {name:<22} frio {min(cold) * 1000:8.1f} ms   "
+              f"quente {min(warm) * 1000:8.1f} ms")
+
+    print("construção de lexer + parser no mesmo processo")
+    for name, part, _ in FRONT_ENDS:
+        cwd = os.path.join(ROOT, part)
+        child = subprocess.run([sys.executable, "-c", BUILD_TIMES.format(name=name, runs=runs)],
+                               cwd=cwd, check=True, capture_output=True, text=True)
+        t = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"  {name:<22} PLY padrão {t['default'] * 1000:8.2f} ms   "
+              f"cache {t['cached'] * 1000:8.2f} ms   "
+              f"({t['default'] / t['cached']:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_ir.py
+# Tempo de geração de código e memória por instrução do IR compacto
+# (ir.IRBuffer) comparado com as mesmas instruções como tuplas e como texto.
+#
+# Uso: python benchmarks/bench_ir.py [num_funcoes] [profundidade]
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+
+import codigo_intermediario
+from ir import IRBuffer, format_ir, parse_ir
+
+
+def make_program(nfuncs, depth, seed=0):
+    rnd = random.Random(seed)
+
+    def expr(d):
+        if d == 0:
+            return rnd.choice(['x', 'y', '3', '7'])
+        return f"({rnd.choice('+-*')} {expr(d - 1)} {expr(d - 1)})"
+
+    forms = [f"(defun f{i} (x y) (if (< x y) {expr(depth)} {expr(depth)}))"
+             for i in range(nfuncs)]
+    forms.append("(f0 2 3)")
+    return "\n".join(forms)
+
+
+def retained(build):
+    """Bytes alocados e mantidos pelo objeto devolvido por build()."""
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    nfuncs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    lexer, parser = codigo_intermediario.make_parser()
+    codigo_intermediario.partial_evaluator = None
+    codigo_intermediario.optimizer = None
+    codigo_intermediario.allocator = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = parser.parse(make_program(nfuncs, depth), lexer=lexer)
+    ast = result["ast"]
+    functions = codigo_intermediario.collect_defuns(ast)
+
+    def codegen():
+        ctx = codigo_intermediario.CodegenContext(functions)
+        code = IRBuffer()
+        errors = []
+        for node in ast:
+            codigo_intermediario.analyze_and_generate(node, {}, code, ctx, errors)
+        # inclui o empacotamento das instruções pendentes em registros
+        code.nbytes()
+        return code
+
+    code = codegen()
+    best = timed(codegen, repeat=5)
+
+    n = len(code)
+    text = format_ir(code)
+    view_time = timed(lambda: list(code))
+    parse_time = timed(lambda: parse_ir(text))
+    _, buf_bytes = retained(codegen)
+    _, tuple_bytes = retained(lambda: list(code))
+    _, text_bytes = retained(lambda: format_ir(code))
+
+    print(f"{n} instruções, geração de código {best * 1000:.1f} ms "
+          f"({n / best:.0f} instr/s)")
+    print(f"leitura como tuplas: IRBuffer {view_time * 1000:.1f} ms, "
+          f"texto (parse_ir) {parse_time * 1000:.1f} ms")
+    print(f"IRBuffer : {buf_bytes / n:6.1f} bytes/instrução")
+    print(f"tuplas   : {tuple_bytes / n:6.1f} bytes/instrução")
+    print(f"texto    : {text_bytes / n:6.1f} bytes/instrução")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# bench_lote.py
+# Vazão do modo --batch de codigo_intermediario.py (compile_files): gera N
+# arquivos num diretório temporário e compila com 1 processo e com um
+# processo por CPU, informando arquivos/s e linhas/s.
+#
+# Uso: python benchmarks/bench_lote.py [arquivos] [forms por arquivo]
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+from bench_stream import make_program
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    forms = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    folder = tempfile.mkdtemp()
+    try:
+        for i in range(count):
+            with open(os.path.join(folder, f"p{i:05d}.lisp"), 'w') as f:
+                f.write(make_program(forms, seed=i))
+        paths = list(ci.find_sources([folder]))
+
+        cpus = os.cpu_count() or 1
+        print(f"{count} arquivos de {forms} forms, {cpus} CPUs")
+        for jobs in sorted({1, cpus}):
+            with open(os.devnull, 'w') as out:
+                files, lines, failed, elapsed = ci.compile_files(paths, out, jobs)
+            assert files == count and not failed
+            print(f"  {jobs:>3} processo(s): {elapsed:7.2f} s  {files / elapsed:8.1f} arquivos/s  "
+                  f"{lines / elapsed:9.0f} linhas/s")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
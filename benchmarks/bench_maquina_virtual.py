@@ -0,0 +1,80 @@
+# bench_maquina_virtual.py
+# Vazão da máquina virtual (Parte_2/maquina_virtual.py) comparada ao
+# interpretador de árvore eval_expr e à forma compilada em closures
+# (compile_expr), ambos de Parte_1/interpretador.py.
+#
+# Uso: python benchmarks/bench_maquina_virtual.py [profundidade] [repeticoes]
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+
+import interpretador
+import codigo_intermediario
+import maquina_virtual
+
+
+def make_expr(depth, ops=('+', '-', '*', '+')):
+    """Expressão aritmética binária balanceada com 2^depth - 1 operadores."""
+    counter = [0]
+
+    def build(d):
+        if d == 0:
+            counter[0] += 1
+            return str(counter[0] % 9 + 1)
+        op = ops[d % len(ops)]
+        return f"({op} {build(d - 1)} {build(d - 1)})"
+
+    return build(depth)
+
+
+def bench(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - start
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    source = make_expr(depth)
+
+    ast = interpretador.parser.parse(source, lexer=interpretador.lexer)
+
+    lexer, parser = codigo_intermediario.make_parser()
+    # a expressão é constante: sem desativar a avaliação parcial e o
+    # otimizador ela viraria um único 'return', e a comparação mediria só o
+    # custo de entrar na VM
+    codigo_intermediario.partial_evaluator = None
+    codigo_intermediario.optimizer = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = parser.parse(source, lexer=lexer)
+    program = maquina_virtual.load_ir(result["ir"])
+
+    compiled = interpretador.compile_expr(ast)
+    env = interpretador.env
+
+    expected = interpretador.eval_expr(ast)
+    got = program.run()
+    assert expected == got, (expected, got)
+    assert expected == compiled(env)
+
+    t_tree = bench(lambda: interpretador.eval_expr(ast), repeat)
+    t_closure = bench(lambda: compiled(env), repeat)
+    t_vm = bench(program.run, repeat)
+
+    nodes = 2 ** (depth + 1) - 1
+    print(f"expressão: profundidade {depth}, {nodes} nós, {len(program.code)} instruções")
+    print(f"eval_expr : {repeat / t_tree:12.0f} avaliações/s")
+    print(f"closures  : {repeat / t_closure:12.0f} avaliações/s  ({t_tree / t_closure:.2f}x)")
+    print(f"VM        : {repeat / t_vm:12.0f} execuções/s  ({t_tree / t_vm:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# bench_memoria.py
+# Memória de cada fase da compilação de um programa gerado (compile com
+# memory=True), quanto o rastreamento com tracemalloc custa em tempo, e em
+# quanto tempo um orçamento (Budget) interrompe uma compilação grande
+# comparado a deixá-la terminar.
+#
+# Uso: python benchmarks/bench_memoria.py [funções]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+import geradores
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    source = geradores.small_defuns(count)
+    print(f"{count} funções, fonte de {len(source) / 1024:.0f} KiB")
+
+    t_plain, plain = timed(lambda: ci.compile(source))
+    t_prof, _ = timed(lambda: ci.compile(source, profile=True))
+    t_mem, result = timed(lambda: ci.compile(source, memory=True))
+    assert ci.format_ir(result["ir"]) == ci.format_ir(plain["ir"])
+    print(f"  sem medir {t_plain * 1000:9.1f} ms   profile {t_prof * 1000:9.1f} ms"
+          f"   memory {t_mem * 1000:9.1f} ms  ({t_mem / t_plain:4.1f}x)")
+    print(f"  {'fase':<10} {'pico':>10} {'retida':>10}")
+    for phase, _, counts in result["profile"].phases:
+        print(f"  {phase:<10} {counts['mem_peak'] / 1024:8.1f} KiB"
+              f" {counts['mem_retained'] / 1024:8.1f} KiB")
+
+    # limites em torno de um quarto do que a compilação usa
+    nodes = result["profile"].phases[1][2]["nodes"]
+    instrs = len(plain["ir"])
+    for label, budget in (("max_nodes", ci.Budget(max_nodes=nodes // 4)),
+                          ("max_ir", ci.Budget(max_ir=instrs // 4)),
+                          ("max_bytes", ci.Budget(max_bytes=256 * 1024))):
+        t_stop, stopped = timed(lambda: ci.compile(source, budget=budget))
+        info = stopped.get("budget")
+        where = f"na fase {info['phase']}" if info else "não estourou"
+        print(f"  orçamento {label:<9} {t_stop * 1000:9.1f} ms  {where}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# bench_reescrita.py
+# Efeito das regras de reescrita (reescrita.py) num programa gerado cheio
+# dos padrões que elas simplificam ((* x 1), (+ x 0), (exp x 2), (car
+# (cons a b))...): tempo de compile(), instruções do IR final, tempo de
+# execução na maquina_virtual e quantas vezes cada regra disparou. A
+# avaliação parcial fica desligada, senão as chamadas com argumentos
+# constantes seriam calculadas na compilação e não sobraria o que executar.
+#
+# Uso: python benchmarks/bench_reescrita.py [funções] [chamadas]
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+
+import codigo_intermediario as ci
+import maquina_virtual
+from reescrita import RewriteEngine
+
+
+def make_program(count, calls, seed=0):
+    """count funções recursivas (n desce até 0) com os padrões das regras."""
+    rnd = random.Random(seed)
+    patterns = ["(* {x} 1)", "(+ 0 {x})", "(- {x} 0)", "(exp {v} 2)", "(exp {v} 3)",
+                "(car (cons {x} {y}))",
+                "(if (eq (cdr (cons {y} nil)) nil) {x} 0)", "(+ {x} (* {y} 0))"]
+
+    def expr(depth):
+        if depth == 0:
+            return rnd.choice(['n', 'k', '1', '2'])
+        return rnd.choice(patterns).format(x=expr(depth - 1), y=expr(depth - 1),
+                                           v=rnd.choice(['n', 'k']))
+
+    parts = []
+    for i in range(count):
+        parts.append(f"(defun f{i} (n k)\n  (if (< n 1) k (f{i} (- n 1) (mod {expr(3)} 1000))))\n")
+    parts.append("".join(f"(f{rnd.randrange(count)} {calls} {i})\n" for i in range(count)))
+    return "".join(parts)
+
+
+def measure(source):
+    start = time.perf_counter()
+    result = ci.compile(source)
+    compiled = time.perf_counter() - start
+    program = maquina_virtual.load_ir(result["ir"])
+    start = time.perf_counter()
+    value = program.run()
+    return compiled, time.perf_counter() - start, len(result["ir"]), value, result["rewrites"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    source = make_program(count, calls)
+    ci.partial_evaluator = None
+    print(f"{count} funções, {calls} iterações por chamada, fonte de {len(source) / 1024:.0f} KiB")
+
+    ci.rewriter = None
+    t_plain, e_plain, n_plain, v_plain, _ = measure(source)
+    ci.rewriter = RewriteEngine()
+    t_rules, e_rules, n_rules, v_rules, fired = measure(source)
+    assert maquina_virtual.format_value(v_plain) == maquina_virtual.format_value(v_rules)
+
+    print(f"  {'':<10} {'compile':>10} {'execução':>10} {'IR':>7}")
+    print(f"  {'sem regras':<10} {t_plain * 1000:7.1f} ms {e_plain * 1000:7.1f} ms {n_plain:7d}")
+    print(f"  {'com regras':<10} {t_rules * 1000:7.1f} ms {e_rules * 1000:7.1f} ms {n_rules:7d}"
+          f"   ({e_plain / e_rules:4.2f}x na execução)")
+    print("  disparos:")
+    for name, n in fired.items():
+        print(f"    {name:<12} {n:6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_scanner.py
+# Vazão do scanner escrito à mão (scanner.py) contra o lexer do PLY em um
+# programa de vários megabytes, para as gramáticas de Parte_1/sintatica.py e
+# Parte_2/codigo_intermediario.py. Mede só a análise léxica e também a
+# análise sintática completa de sintatica.py com cada um dos dois lexers.
+#
+# Uso: python benchmarks/bench_scanner.py [megabytes]
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+
+import codigo_intermediario
+import sintatica
+
+
+def make_source(size, seed=0, lists=True):
+    """
+    Funções com corpos aleatórios até somar size caracteres. Sem lists, não
+    usa cons/car/nil (que a gramática de sintatica.py não aceita).
+    """
+    rnd = random.Random(seed)
+    atoms = ['x', 'y', 'nil', '42', '7', '1000'] if lists else ['x', 'y', '42', '7', '1000']
+
+    def expr(d):
+        r = rnd.random()
+        if d == 0 or r < 0.2:
+            return rnd.choice(atoms)
+        if r < 0.3:
+            return f"(if (<= {expr(d - 1)} {expr(d - 1)}) {expr(d - 1)} {expr(d - 1)})"
+        if r < 0.4:
+            if lists:
+                return f"(cons {expr(d - 1)} (car {expr(d - 1)}))"
+            return f"(g{rnd.randrange(10)} {expr(d - 1)} {expr(d - 1)})"
+        return f"({rnd.choice(['+', '-', '*', '/', '<', '>='])} {expr(d - 1)} {expr(d - 1)})"
+
+    parts = []
+    total = 0
+    i = 0
+    while total < size:
+        form = f"; função {i}\n(defun f{i} (x y)\n  {expr(5)})\n"
+        parts.append(form)
+        total += len(form)
+        i += 1
+    return "".join(parts)
+
+
+def best(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def ply_tokens(lexer, data):
+    lexer.input(data)
+    return sum(1 for _ in lexer)
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    data = make_source(int(megabytes * 1024 * 1024))
+    mb = len(data) / (1024 * 1024)
+    print(f"entrada: {mb:.1f} MB")
+
+    front_ends = [
+        ('sintatica', sintatica.lexer, sintatica.scanner),
+        ('codigo_intermediario', codigo_intermediario.make_parser()[0],
+         codigo_intermediario.make_scanner()),
+    ]
+    for name, lexer, scanner in front_ends:
+        t_ply, n_ply = best(lambda: ply_tokens(lexer, data))
+        t_scan, n_scan = best(lambda: len(scanner.tokenize(data)))
+        assert n_ply == n_scan, (n_ply, n_scan)
+        print(f"{name:<22} {n_ply} tokens")
+        print(f"  PLY     : {mb / t_ply:6.2f} MB/s  {n_ply / t_ply:10.0f} tokens/s")
+        print(f"  scanner : {mb / t_scan:6.2f} MB/s  {n_scan / t_scan:10.0f} tokens/s"
+              f"  ({t_ply / t_scan:.1f}x)")
+
+    # análise sintática completa (sintatica.py não faz semântica nem IR)
+    data = make_source(int(megabytes * 1024 * 1024), lists=False)
+    parser = sintatica.parser
+    t_ply, ast_ply = best(lambda: parser.parse(data, lexer=sintatica.lexer), repeat=2)
+    t_scan, ast_scan = best(lambda: parser.parse(data, lexer=sintatica.scanner), repeat=2)
+    assert ast_ply == ast_scan
+    print(f"parse sintatica: PLY {t_ply:.2f} s, scanner {t_scan:.2f} s "
+          f"({t_ply / t_scan:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench_serializacao.py
+# Tamanho e tempo de carga da AST e do IR de um programa gerado, no formato
+# binário de serializacao.py (lido para a memória e mapeado com mmap)
+# contra JSON (o IR em JSON é a lista de linhas de format_ir, que precisa
+# de parse_ir na volta) e contra analisar o fonte de novo. Confere que o
+# que foi carregado é igual ao original.
+#
+# Uso: python benchmarks/bench_serializacao.py [forms]
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import codigo_intermediario as ci
+import serializacao
+from arvore import as_json
+from bench_stream import make_program
+from ir import IRBuffer, format_ir, parse_ir
+
+
+def best(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = make_program(count)
+    # o programa é constante: a avaliação parcial deixaria o IR com um 'return'
+    ci.partial_evaluator = None
+    result = ci.compile(source)
+    ast, ir = result["ast"], result["ir"]
+    folder = tempfile.mkdtemp()
+    try:
+        rows = []
+        for label, obj, dump_bin, dump_json, load_json, reparse in (
+                ("AST", ast, serializacao.dumps_ast, lambda x: json.dumps(x, default=as_json),
+                 json.loads,
+                 lambda: ci.compile(source, optimize=False)["ast"]),
+                ("IR", ir, serializacao.dumps_ir, lambda x: json.dumps(format_ir(x)),
+                 lambda text: IRBuffer(parse_ir(json.loads(text))),
+                 lambda: ci.compile(source)["ir"])):
+            t_dump_bin, data = best(lambda: dump_bin(obj))
+            t_dump_json, text = best(lambda: dump_json(obj))
+            path = os.path.join(folder, label)
+            with open(path, 'wb') as f:
+                f.write(data)
+            t_json, from_json = best(lambda: load_json(text))
+            t_bin, from_bin = best(lambda: serializacao.load_path(path))
+            t_mmap, from_mmap = best(lambda: serializacao.load_path(path, use_mmap=True))
+            t_src, _ = best(reparse, repeat=1)
+            # o JSON volta como dicts e o binário como nós de outra NodeTable:
+            # a comparação é pelo texto
+            show = format_ir if label == "IR" else lambda x: json.dumps(x, default=as_json)
+            obj, from_json, from_bin, from_mmap = (
+                show(x) for x in (obj, from_json, from_bin, from_mmap))
+            assert from_json == obj and from_bin == obj and from_mmap == obj
+            rows.append((label, len(text.encode('utf-8')), len(data), t_dump_json, t_dump_bin,
+                         t_json, t_bin, t_mmap, t_src))
+
+        print(f"{count} forms, fonte de {len(source) / 1024:.0f} KiB")
+        for (label, size_json, size_bin, t_dump_json, t_dump_bin,
+             t_json, t_bin, t_mmap, t_src) in rows:
+            print(f"  {label}")
+            print(f"    tamanho   JSON {size_json / 1024:9.1f} KiB  binário {size_bin / 1024:9.1f} KiB"
+                  f"  ({size_json / size_bin:4.1f}x menor)")
+            print(f"    gravação  JSON {t_dump_json * 1000:9.1f} ms   binário {t_dump_bin * 1000:9.1f} ms")
+            print(f"    carga     JSON {t_json * 1000:9.1f} ms   binário {t_bin * 1000:9.1f} ms"
+                  f"  mmap {t_mmap * 1000:8.1f} ms  recompilando o fonte {t_src * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench_stream.py
+# Compilação em fluxo (codigo_intermediario.compile_stream) contra
+# parser.parse do programa inteiro, para programas gerados de tamanhos
+# crescentes. Cada medida roda em um processo novo e informa o tempo total,
+# o tempo até a primeira linha de IR e o pico de memória (RSS) do processo.
+# Otimização e alocação de registradores ficam desligadas nos dois modos.
+#
+# Uso: python benchmarks/bench_stream.py [forms ...]
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# executado em um processo filho, no diretório Parte_2
+CHILD = """
+import io, json, os, resource, sys, time
+import codigo_intermediario as ci
+
+class Out(io.TextIOBase):
+    first = None
+    def write(self, s):
+        if self.first is None:
+            self.first = time.perf_counter()
+        return len(s)
+
+out = Out()
+start = time.perf_counter()
+if sys.argv[1] == 'stream':
+    with open(sys.argv[2]) as f:
+        ci.compile_stream(f, out)
+else:
+    ci.partial_evaluator = ci.optimizer = ci.allocator = None
+    lexer, parser = ci.make_parser()
+    with open(sys.argv[2]) as f:
+        data = f.read()
+    sys.stdout = out
+    parser.parse(data, lexer=lexer)
+    sys.stdout = sys.__stdout__
+end = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"total": end - start, "first": out.first - start, "rss_kb": rss}))
+"""
+
+
+def make_program(forms, seed=0):
+    """forms definições e expressões; cada função só chama as anteriores."""
+    rnd = random.Random(seed)
+    defined = []
+
+    def expr(d, calls):
+        r = rnd.random()
+        if d == 0 or r < 0.2:
+            return rnd.choice(['x', 'y', '42', '7'])
+        if r < 0.35:
+            return f"(if (<= {expr(d - 1, calls)} 0) {expr(d - 1, calls)} {expr(d - 1, calls)})"
+        if r < 0.5 and calls:
+            return f"(f{rnd.choice(defined[-50:])} {expr(d - 1, calls)} {expr(d - 1, calls)})"
+        return f"({rnd.choice(['+', '-', '*', '<'])} {expr(d - 1, calls)} {expr(d - 1, calls)})"
+
+    parts = []
+    for i in range(forms):
+        if rnd.random() < 0.8:
+            parts.append(f"; f{i}\n(defun f{i} (x y)\n  {expr(4, bool(defined))})\n")
+            defined.append(i)
+        else:
+            body = expr(3, False).replace('x', '1').replace('y', '2')
+            parts.append(body + "\n")
+    return "".join(parts)
+
+
+def run(mode, path):
+    child = subprocess.run([sys.executable, "-c", CHILD, mode, path],
+                           cwd=os.path.join(ROOT, 'Parte_2'), check=True,
+                           capture_output=True, text=True)
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 4000, 16000]
+    print(f"{'forms':>8} {'MB':>6} {'modo':>7} {'total':>9} {'1a linha':>10} {'pico RSS':>10}")
+    for forms in sizes:
+        with tempfile.NamedTemporaryFile('w', suffix='.lisp', delete=False) as f:
+            f.write(make_program(forms))
+            path = f.name
+        try:
+            mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in ('batch', 'stream'):
+                r = run(mode, path)
+                print(f"{forms:>8} {mb:>6.1f} {mode:>7} {r['total']:>8.2f}s "
+                      f"{r['first'] * 1000:>8.1f}ms {r['rss_kb'] / 1024:>8.1f}MB")
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# bench_suite.py
+# Suíte de benchmarks de todas as frentes: para cada gerador de
+# geradores.py mede cada fase de cada frente que aceita o programa
+#   Parte_1/interpretador  lex, parse, eval (eval_expr)
+#   Parte_1/sintatica      lex, parse
+#   Parte_2                lex, parse, semantic+codegen, [partial_eval],
+#                          rewrite, [codegen], optimize, regalloc, emit (fases de
+#                          compile(profile=True)), load e eval (maquina_virtual)
+# e informa o melhor de --repeat execuções. Os programas gerados não
+# dependem de entrada, então a avaliação parcial fica desligada (com ela
+# tudo é calculado na compilação e as fases seguintes ficam sem trabalho);
+# --partial-eval a liga e acrescenta a fase partial_eval. Com -o grava os
+# resultados em JSON (com o commit, a versão do Python e a máquina), e
+# --compare confere uma execução contra um JSON anterior, saindo com 1 se
+# alguma fase ficou mais lenta que --threshold.
+#
+# Uso: python benchmarks/bench_suite.py [-o atual.json] [--compare base.json]
+#                                        [--scale 0.5] [--repeat 3] [--only defuns,if]
+#                                        [--partial-eval]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+import interpretador
+import sintatica
+
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import codigo_intermediario as ci
+import geradores
+import maquina_virtual
+
+# nome -> (gerador, tamanho na escala 1, frentes que aceitam o programa)
+WORKLOADS = {
+    'defuns': (geradores.small_defuns, 400, ('Parte_1/sintatica', 'Parte_2')),
+    'aritmetica': (geradores.nested_arith, 2000,
+                   ('Parte_1/interpretador', 'Parte_1/sintatica', 'Parte_2')),
+    'argumentos': (geradores.long_args, 500, ('Parte_1/sintatica', 'Parte_2')),
+    'if': (geradores.wide_if, 1024, ('Parte_1/sintatica', 'Parte_2')),
+    'cons': (geradores.cons_lists, 40, ('Parte_2',)),
+}
+
+
+def run_parte1(module, source, evaluate):
+    """Fases de um parser de Parte_1: [(fase, segundos, contadores)]."""
+    clock = time.perf_counter
+    scanner = module.scanner
+    start = clock()
+    tokens = scanner.input_all(source)
+    lexed = clock()
+    ast = module.parser.parse(None, lexer=scanner)
+    parsed = clock()
+    phases = [("lex", lexed - start, {"tokens": tokens}), ("parse", parsed - lexed, {})]
+    if evaluate:
+        value = interpretador.eval_expr(ast, {'x': 3})
+        phases.append(("eval", clock() - parsed, {"value": value}))
+    return phases
+
+
+def run_parte2(source):
+    result = ci.compile(source, profile=True)
+    if not result["sem_ok"]:
+        raise RuntimeError(f"programa gerado com erros: {result['errors'][:3]}")
+    # os passes de otimização ficam dentro de optimize
+    phases = [(phase, seconds, {k: v for k, v in counts.items() if k != "passes"})
+              for phase, seconds, counts in result["profile"].phases]
+    start = time.perf_counter()
+    program = maquina_virtual.load_ir(result["ir"])
+    loaded = time.perf_counter()
+    value = program.run()
+    phases.append(("load", loaded - start, {"instrs": len(program.code)}))
+    phases.append(("eval", time.perf_counter() - loaded, {"value": value}))
+    return phases
+
+
+def measure(front_end, source, repeat):
+    """Melhor tempo de cada fase em repeat execuções."""
+    best = {}
+    for _ in range(repeat):
+        if front_end == 'Parte_2':
+            phases = run_parte2(source)
+        elif front_end == 'Parte_1/interpretador':
+            phases = run_parte1(interpretador, source, evaluate=True)
+        else:
+            phases = run_parte1(sintatica, source, evaluate=False)
+        for phase, seconds, counts in phases:
+            if phase not in best or seconds < best[phase][0]:
+                best[phase] = (seconds, counts)
+    return [(phase, seconds, counts) for phase, (seconds, counts) in best.items()]
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, base_path, threshold):
+    """Imprime atual / base por fase; devolve as fases acima de threshold."""
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    before = {(r["front_end"], r["workload"], r["size"], r["phase"]): r["seconds"]
+              for r in base["results"]}
+    print(f"\ncomparação com {base_path} (commit {base['meta'].get('commit')})")
+    slower = []
+    for r in results:
+        key = (r["front_end"], r["workload"], r["size"], r["phase"])
+        if key not in before or before[key] <= 0:
+            continue
+        ratio = r["seconds"] / before[key]
+        mark = ""
+        # fases muito curtas são ruído de medição
+        if ratio > threshold and r["seconds"] > 0.001:
+            mark = "  << mais lento"
+            slower.append(key)
+        print(f"  {r['front_end']:<22} {r['workload']:<11} {r['phase']:<9} "
+              f"{before[key] * 1000:9.2f} -> {r['seconds'] * 1000:9.2f} ms  {ratio:5.2f}x{mark}")
+    return slower
+
+
+def main():
+    cli = argparse.ArgumentParser(description="Suíte de benchmarks das frentes do compilador.")
+    cli.add_argument('-o', '--output', help="grava os resultados neste arquivo JSON")
+    cli.add_argument('--compare', help="JSON de uma execução anterior para comparar")
+    cli.add_argument('--threshold', type=float, default=1.25,
+                     help="razão atual/base a partir da qual a fase conta como "
+                          "mais lenta (padrão: 1.25)")
+    cli.add_argument('--scale', type=float, default=1.0, help="multiplica os tamanhos")
+    cli.add_argument('--repeat', type=int, default=3, help="execuções por medida")
+    cli.add_argument('--only', help="geradores separados por vírgula")
+    cli.add_argument('--partial-eval', action='store_true',
+                     help="com a avaliação parcial do compilador")
+    args = cli.parse_args()
+    if not args.partial_eval:
+        ci.partial_evaluator = None
+
+    names = args.only.split(',') if args.only else list(WORKLOADS)
+    results = []
+    for name in names:
+        generator, size, front_ends = WORKLOADS[name]
+        size = max(1, int(size * args.scale))
+        source = generator(size)
+        print(f"{name} (tamanho {size}, {len(source) / 1024:.0f} KiB)")
+        for front_end in front_ends:
+            text = geradores.arith_expr(size) if front_end == 'Parte_1/interpretador' else source
+            for phase, seconds, counts in measure(front_end, text, args.repeat):
+                print(f"  {front_end:<22} {phase:<9} {seconds * 1000:10.2f} ms  "
+                      + "  ".join(f"{k} {v}" for k, v in counts.items() if k != "value"))
+                results.append({"front_end": front_end, "workload": name, "size": size,
+                                "phase": phase, "seconds": seconds, "counts": counts})
+
+    if args.output:
+        meta = {"commit": git_commit(), "date": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                "python": platform.python_version(), "machine": platform.machine(),
+                "scale": args.scale, "repeat": args.repeat,
+                "partial_eval": args.partial_eval}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"meta": meta, "results": results}, f, indent=1, default=str)
+        print(f"\nresultados em {args.output}")
+
+    if args.compare:
+        slower = compare(results, args.compare, args.threshold)
+        if slower:
+            print(f"{len(slower)} fase(s) mais lenta(s) que {args.threshold}x")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
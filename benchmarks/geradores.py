@@ -0,0 +1,78 @@
+# geradores.py
+# Geradores de programas sintéticos para os benchmarks, parametrizados pelo
+# tamanho. Todos produzem texto no dialeto de Parte_2/codigo_intermediario.py
+# que compila sem erros semânticos e termina com uma expressão cujo valor a
+# máquina virtual consegue calcular; arith_expr produz uma única expressão
+# aritmética, que é o que Parte_1/interpretador.py aceita.
+import random
+
+
+def arith_expr(depth, var='x'):
+    """(+ x (- 3 (* 1 (+ x ...)))): aninhada depth níveis à direita."""
+    head = []
+    for i in range(depth):
+        op = '+-*'[i % 3]
+        left = '1' if op == '*' else var if i % 2 == 0 else str(i % 9 + 1)
+        head.append(f"({op} {left} ")
+    return "".join(head) + var + ")" * depth
+
+
+def nested_arith(depth):
+    """Função com uma expressão aritmética de depth níveis, e uma chamada."""
+    return f"(defun g (x)\n  {arith_expr(depth)})\n(g 3)\n"
+
+
+def small_defuns(count, seed=0):
+    """
+    count funções pequenas de dois parâmetros, cada uma seguida de uma
+    chamada; a maioria chama a anterior (cadeias de até 8 chamadas).
+    """
+    rnd = random.Random(seed)
+    parts = []
+    for i in range(count):
+        k = rnd.randrange(1, 9)
+        if i % 8:
+            body = f"(+ (f{i - 1} x {k}) (* y {k}))"
+        else:
+            body = f"(- (* x {k}) y)"
+        parts.append(f"(defun f{i} (x y)\n  {body})\n(f{i} {k} {i % 5})\n")
+    return "".join(parts)
+
+
+def long_args(count):
+    """Uma função de count parâmetros que soma todos, chamada com count argumentos."""
+    params = [f"a{i}" for i in range(count)]
+    body = "".join(f"(+ {p} " for p in params[:-1]) + params[-1] + ")" * (count - 1)
+    args = " ".join(str(i % 10) for i in range(count))
+    return f"(defun soma ({' '.join(params)})\n  {body})\n(soma {args})\n"
+
+
+def wide_if(leaves, calls=32):
+    """
+    Árvore de busca binária de ifs com leaves folhas sobre x, e calls
+    chamadas com valores espalhados pelo intervalo.
+    """
+    def tree(lo, hi):
+        # folhas lo..hi-1; a pilha de chamadas cresce com log2(leaves)
+        if hi - lo == 1:
+            return str(lo % 100)
+        mid = (lo + hi) // 2
+        return f"(if (< x {mid}) {tree(lo, mid)} {tree(mid, hi)})"
+
+    step = max(1, leaves // calls)
+    uses = "".join(f"(classifica {i})\n" for i in range(0, leaves, step))
+    return f"(defun classifica (x)\n  {tree(0, leaves)})\n{uses}"
+
+
+def cons_lists(count, length=50):
+    """
+    count listas literais de length elementos montadas com cons, somadas
+    por uma função recursiva com car, cdr e eq.
+    """
+    parts = ["(defun soma_lista (l)\n"
+             "  (if (eq l nil) 0 (+ (car l) (soma_lista (cdr l)))))\n"]
+    for i in range(count):
+        items = [str((i + j) % 10) for j in range(length)]
+        literal = "".join(f"(cons {v} " for v in items) + "nil" + ")" * length
+        parts.append(f"(soma_lista {literal})\n")
+    return "".join(parts)
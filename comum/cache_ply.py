@@ -0,0 +1,157 @@
+# cache_ply.py
+# Construção do lexer e do parser PLY com as tabelas guardadas em
+# __plycache__/, ao lado do módulo que define a gramática. É o mesmo
+# arquivo para Parte_1 e Parte_2, que o importam de comum/.
+#
+# Cada gramática tem os próprios arquivos de tabela. O nome do arquivo leva
+# um hash (CRC-32 e Adler-32) do código-fonte do módulo que define a
+# gramática, então uma gramática alterada nunca lê tabelas antigas. Com isso
+# o PLY roda em modo otimizado (sem revalidar a gramática a cada início) e
+# sem gerar parser.out.
+#
+# O PLY escreve as tabelas como módulos Python; aqui elas são convertidas
+# para marshal, que carrega sem compilar código-fonte (mesmo com
+# PYTHONDONTWRITEBYTECODE). O arquivo final é escrito em um temporário e
+# renomeado, para que processos iniciados ao mesmo tempo nunca leiam um
+# arquivo pela metade. Dentro de um processo, só uma thread gera tabelas por
+# vez; as que esperavam leem a tabela que ela gravou.
+import marshal
+import os
+import threading
+import types
+import zlib
+
+import ply.lex as lex
+import ply.yacc as yacc
+
+CACHE_DIR = '__plycache__'
+
+# geração de tabelas: uma thread por vez (os temporários do PLY e o seu
+# estado global não são feitos para gerações simultâneas)
+_generating = threading.Lock()
+
+
+def cache_dir(module):
+    """Diretório das tabelas de module: __plycache__/ ao lado do seu arquivo."""
+    return os.path.join(os.path.dirname(os.path.abspath(module.__file__)), CACHE_DIR)
+
+
+def grammar_key(module):
+    """Nome do arquivo do módulo seguido do hash do seu código-fonte."""
+    path = module.__file__
+    with open(path, 'rb') as f:
+        source = f.read()
+    digest = f"{zlib.crc32(source):08x}{zlib.adler32(source):08x}"
+    name = os.path.splitext(os.path.basename(path))[0]
+    return f"{name}_{digest}"
+
+
+def _prune(folder, key):
+    """Remove tabelas de versões anteriores do mesmo módulo."""
+    module_name = key.rsplit('_', 1)[0]
+    for entry in os.listdir(folder):
+        if entry.startswith(module_name + '_') and not entry.startswith(key):
+            rest = entry[len(module_name) + 1:]
+            # só nomes <módulo>_<hash>_...: não confunde "a" com "a_b"
+            if len(rest) > 16 and rest[16] == '_':
+                try:
+                    os.remove(os.path.join(folder, entry))
+                except OSError:
+                    pass
+
+
+def _load_table(name, path):
+    with open(path, 'rb') as f:
+        data = marshal.load(f)
+    table = types.ModuleType(name)
+    table.__dict__.update(data)
+    table.__file__ = path
+    return table
+
+
+def _temp_name(name):
+    """Nome dos temporários desta thread: processos e threads não se cruzam."""
+    return f"{name}_{os.getpid()}_{threading.get_ident()}"
+
+
+def _from_cache(name, path, build):
+    """build(tabela) com a tabela gravada em path, ou None se ela não existe ou está ilegível."""
+    if os.path.exists(path):
+        try:
+            return build(_load_table(name, path))
+        except Exception:
+            pass
+    return None
+
+
+def _save_table(py_path, path):
+    """Converte a tabela escrita pelo PLY em py_path para marshal em path."""
+    if not os.path.exists(py_path):
+        return
+    namespace = {}
+    with open(py_path) as f:
+        exec(compile(f.read(), py_path, 'exec'), namespace)
+    os.remove(py_path)
+    data = {k: v for k, v in namespace.items()
+            if k.startswith('_') and not k.startswith('__')}
+    tmp_path = _temp_name(path)
+    with open(tmp_path, 'wb') as f:
+        marshal.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def cached_lexer(module):
+    """Lexer de module, lendo (ou gerando) a tabela em cache_dir(module)."""
+    key = grammar_key(module)
+    name = key + '_lextab'
+    folder = cache_dir(module)
+    path = os.path.join(folder, name + '.marshal')
+
+    def build(table):
+        return lex.lex(module=module, optimize=True, lextab=table)
+
+    lexer = _from_cache(name, path, build)
+    if lexer is not None:
+        return lexer
+    with _generating:
+        # outra thread pode ter gerado a tabela enquanto esta esperava
+        lexer = _from_cache(name, path, build)
+        if lexer is not None:
+            return lexer
+        os.makedirs(folder, exist_ok=True)
+        tmp_name = _temp_name(name)
+        lexer = lex.lex(module=module, optimize=True, lextab=tmp_name, outputdir=folder)
+        _save_table(os.path.join(folder, tmp_name + '.py'), path)
+        _prune(folder, key)
+    return lexer
+
+
+def cached_parser(module, start=None):
+    """
+    Parser LALR de module, lendo (ou gerando) as tabelas em
+    cache_dir(module). Cada símbolo inicial (start) tem a sua própria tabela.
+    """
+    key = grammar_key(module)
+    name = key + (f'_{start}' if start else '') + '_parsetab'
+    folder = cache_dir(module)
+    path = os.path.join(folder, name + '.marshal')
+
+    def build(table):
+        return yacc.yacc(module=module, start=start, optimize=True, debug=False,
+                         write_tables=False, tabmodule=table)
+
+    parser = _from_cache(name, path, build)
+    if parser is not None:
+        return parser
+    with _generating:
+        # outra thread pode ter gerado a tabela enquanto esta esperava
+        parser = _from_cache(name, path, build)
+        if parser is not None:
+            return parser
+        os.makedirs(folder, exist_ok=True)
+        tmp_name = _temp_name(name)
+        parser = yacc.yacc(module=module, start=start, optimize=True, debug=False,
+                           tabmodule=tmp_name, outputdir=folder)
+        _save_table(os.path.join(folder, tmp_name + '.py'), path)
+        _prune(folder, key)
+    return parser
@@ -0,0 +1,156 @@
+# scanner.py
+# Analisador léxico escrito à mão para a sintaxe de S-expressões, como
+# alternativa mais rápida ao lexer do PLY.
+#
+# Uma única passada pelo texto: uma expressão regular só corta o texto em
+# lexemas (sem grupos nem funções por regra) e a classe do primeiro
+# caractere decide o que cada lexema é (espaço, quebra de linha,
+# comentário, identificador, número ou operador). Operadores e palavras
+# reservadas saem direto de uma tabela. tokenize() devolve tuplas
+# (type, value, lineno, lexpos); input()/token() entregam objetos Token, e o
+# parser do PLY aceita o scanner no lugar do lexer:
+#     parser.parse(data, lexer=Scanner.from_module(modulo))
+import re
+from functools import partial
+
+_SKIP, _NEWLINE, _ID, _NUMBER = range(4)
+
+
+class Token:
+    """Token com os atributos que o PLY lê (type, value, lineno, lexpos)."""
+
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __repr__(self):
+        return f"Token({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+def _make_token(item, new=object.__new__, cls=Token):
+    # sem __init__: atribuição direta dos slots é a construção mais barata
+    token = new(cls)
+    token.type, token.value, token.lineno, token.lexpos = item
+    return token
+
+
+class Scanner:
+    """
+    Lexer com a interface usada pelo PLY (input/token).
+    reserved: palavra -> tipo; operators: texto literal -> tipo.
+    """
+
+    def __init__(self, reserved, operators, ignore=' \t\r\n', comment=';', floats=False,
+                 leading_zeros=True):
+        self.reserved = dict(reserved)
+        self.ignore = ignore
+        self.comment = comment
+        self.floats = floats
+        # sem leading_zeros, '012' são dois números (0 e 12), como em 0|[1-9][0-9]*
+        self.leading_zeros = leading_zeros
+        # lista para guardar as mensagens de caractere inválido; None imprime
+        self.errors = None
+        # operadores alfabéticos (div, mod, exp) são palavras reservadas
+        self.operators = {}
+        for text, kind in operators.items():
+            if text[0].isalpha() or text[0] == '_':
+                self.reserved.setdefault(text, kind)
+            else:
+                self.operators[text] = kind
+
+        self._fixed = dict(self.operators)
+        self._fixed.update(self.reserved)
+
+        classes = {}
+        for ch in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_':
+            classes[ch] = _ID
+        for ch in '0123456789':
+            classes[ch] = _NUMBER
+        for ch in ignore:
+            classes[ch] = _SKIP
+        classes['\n'] = _NEWLINE
+        if comment:
+            classes[comment] = _SKIP
+        self._classes = classes
+
+        number = r'[0-9]+' if leading_zeros else r'0|[1-9][0-9]*'
+        if floats:
+            number = r'[0-9]+\.[0-9]+|' + number
+        spaces = ''.join(ch for ch in ignore if ch != '\n')
+        parts = [r'\n', r'[A-Za-z_][A-Za-z0-9_]*', number]
+        if spaces:
+            parts.insert(0, '[%s]+' % re.escape(spaces))
+        if comment:
+            parts.append(re.escape(comment) + r'[^\n]*')
+        # operadores mais longos primeiro ('<=' antes de '<'); '.' pega o resto
+        parts.extend(re.escape(op) for op in sorted(self.operators, key=len, reverse=True))
+        parts.append('.')
+        self._lexemes = re.compile('|'.join(parts)).findall
+        self.token = partial(next, iter(()), None)
+
+    @classmethod
+    def from_module(cls, module, **options):
+        """
+        Scanner com as regras de um módulo de gramática PLY: 'reserved',
+        't_ignore', a presença de t_COMMENT, as regras t_NOME que são texto
+        literal e o formato aceito por t_NUMBER.
+        """
+        operators = {}
+        for name in getattr(module, 'tokens', ()):
+            rule = getattr(module, 't_' + name, None)
+            if isinstance(rule, str):
+                text = re.sub(r'\\(.)', r'\1', rule)
+                if re.fullmatch(rule, text):
+                    operators[text] = name
+        options.setdefault('ignore', getattr(module, 't_ignore', ' \t\r\n'))
+        options.setdefault('comment', ';' if hasattr(module, 't_COMMENT') else None)
+        number = getattr(getattr(module, 't_NUMBER', None), '__doc__', None)
+        if number:
+            options.setdefault('floats', re.fullmatch(number, '1.5') is not None)
+            options.setdefault('leading_zeros', re.fullmatch(number, '01') is not None)
+        return cls(getattr(module, 'reserved', {}), operators, **options)
+
+    def input(self, data):
+        # token() é o próprio next() do iterador: o parser não paga uma
+        # chamada de função Python por token
+        self.token = partial(next, map(_make_token, self.scan(data)), None)
+
+    def input_all(self, data):
+        """
+        Como input(), mas lê data inteira já aqui, para medir a análise
+        léxica separada do parse. Devolve o número de tokens.
+        """
+        tokens = list(map(_make_token, self.scan(data)))
+        self.token = partial(next, iter(tokens), None)
+        return len(tokens)
+
+    def tokenize(self, data):
+        """Lista de tuplas (type, value, lineno, lexpos) com os tokens de data."""
+        return list(self.scan(data))
+
+    def scan(self, data):
+        """Gera as tuplas (type, value, lineno, lexpos) à medida que lê data."""
+        fixed = self._fixed.get
+        classes = self._classes.get
+        floats = self.floats
+        pos = 0
+        lineno = 1
+
+        for text in self._lexemes(data):
+            kind = fixed(text)
+            if kind is not None:
+                yield (kind, text, lineno, pos)
+            else:
+                cls = classes(text[0])
+                if cls is _ID:
+                    yield ('ID', text, lineno, pos)
+                elif cls is _NUMBER:
+                    value = float(text) if floats and '.' in text else int(text)
+                    yield ('NUMBER', value, lineno, pos)
+                elif cls is _NEWLINE:
+                    lineno += 1
+                elif cls is not _SKIP:
+                    msg = f"Caractere inválido: {text!r} na linha {lineno}"
+                    if self.errors is None:
+                        print(msg)
+                    else:
+                        self.errors.append(msg)
+            pos += len(text)
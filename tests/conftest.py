@@ -0,0 +1,10 @@
+# conftest.py
+# Os testes importam os módulos de Parte_1, Parte_2 e comum como os
+# benchmarks: pelos diretórios de cada parte no sys.path.
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_1'))
+sys.path.insert(0, os.path.join(ROOT, 'Parte_2'))
+sys.path.insert(0, os.path.join(ROOT, 'comum'))
@@ -0,0 +1,49 @@
+# test_arvore.py
+# NodeTable: subárvores repetidas são o mesmo objeto, e números iguais pelo
+# == mas de outra classe ou de outro sinal (2 e 2.0, 0.0 e -0.0) continuam
+# nós diferentes.
+import math
+
+import codigo_intermediario as ci
+from arvore import NodeTable
+
+
+def test_repeated_subtrees_are_shared():
+    ast = ci.compile("(defun f (x) (cons (* x 2) (* x 2))) (cons (f 3) (f 3)) (f 3)",
+                     optimize=False)["ast"]
+    defun, pair, call = ast
+    body = defun.body
+    assert body.args[0] is body.args[1]
+    assert body.args[0].args[0] is body.args[1].args[0]
+    assert pair.args[0] is pair.args[1] is call
+    assert pair.operator is body.operator
+
+
+def test_table():
+    nodes = NodeTable()
+    x = nodes.symbol('ID', 'x')
+    assert nodes.symbol('ID', 'x') is x
+    plus = nodes.symbol('PLUS', '+')
+    sum_ = nodes.application(plus, [x, nodes.number(1)])
+    assert nodes.application(plus, (x, nodes.number(1))) is sum_
+    assert nodes.if_(sum_, x, nodes.nil()) is nodes.if_(sum_, x, nodes.nil())
+    assert nodes.defun('f', ['x'], sum_) is nodes.defun('f', ('x',), sum_)
+    # depois de clear os nós continuam válidos, mas não são reaproveitados
+    nodes.clear()
+    assert nodes.symbol('ID', 'x') is not x
+
+
+def test_numbers_equal_by_value_stay_apart():
+    nodes = NodeTable()
+    values = [2, 2.0, 0, 0.0, -0.0]
+    numbers = [nodes.number(v) for v in values]
+    assert len({id(n) for n in numbers}) == len(values)
+    for node, value in zip(numbers, values):
+        assert node is nodes.number(value)
+        assert type(node.value) is type(value) and repr(node.value) == repr(value)
+    # nan != nan, mas é o mesmo literal
+    assert nodes.number(math.nan) is nodes.number(float('nan'))
+    # os filhos entram pela identidade: (+ 2 x) e (+ 2.0 x) são nós diferentes
+    plus, x = nodes.symbol('PLUS', '+'), nodes.symbol('ID', 'x')
+    assert nodes.application(plus, (nodes.number(2), x)) is not \
+        nodes.application(plus, (nodes.number(2.0), x))
@@ -0,0 +1,59 @@
+# test_avaliacao_parcial.py
+# Com só a avaliação parcial ligada, o programa vale o mesmo que sem ela.
+import pytest
+
+import codigo_intermediario as ci
+from avaliacao_parcial import PartialEvaluator
+from programas import PROGRAMS, assert_equivalent, configure, random_programs, run
+
+
+@pytest.mark.parametrize("source", [
+    "(+ (/ 0 (- 0 5)) 0)",
+    "(defun f (a) (+ a 0)) (f (/ 0 (- 0 5)))",
+    "(defun f (a) a) (cons (f (/ 0 (- 0 5))) (f (/ 0 5)))",
+    "(defun f (a) a) (cons (f 1) (f (/ 2 2)))",
+])
+def test_signed_zero_and_reals(source, monkeypatch):
+    configure(monkeypatch, partial_evaluator=PartialEvaluator())
+    assert run(source) == run(source, optimize=False)
+
+
+def test_shared_list_from_residual_call(monkeypatch):
+    # (f ...) tem valor conhecido, mas g fica residual (big gasta o
+    # combustível): o argumento tem que continuar sendo a chamada, com os
+    # dois lados do par sendo a mesma lista para eq
+    source = ("(defun f (x) (cons x x))"
+              " (defun big (n) (if (= n 0) 0 (big (- n 1))))"
+              " (defun g (p n) (if (eq (car p) (cdr p)) (+ (big n) 1) (big n)))"
+              " (g (f (cons 1 2)) 20000)")
+    configure(monkeypatch, partial_evaluator=PartialEvaluator())
+    assert run(source, optimize=False) == "1"
+    assert run(source) == "1"
+
+
+def test_literal_lists(monkeypatch):
+    configure(monkeypatch, partial_evaluator=PartialEvaluator())
+    # escrita como cons de literais: continua o mesmo literal
+    result = ci.compile("(cons 1 (cons 2 nil))")
+    assert result["partial_eval"]["folded"] == 2
+    assert run("(cons 1 (cons 2 nil))") == "(1 2)"
+    # calculada por uma chamada: fica residual
+    source = "(defun f (x) (cons x x)) (f (cons 1 2))"
+    assert ci.compile(source)["partial_eval"]["removed"] == []
+    assert run(source) == run(source, optimize=False)
+    # mas o valor conhecido ainda serve a quem está em cima
+    source = "(defun f (x) (cons x x)) (+ (car (cdr (f (cons 1 2)))) 1)"
+    assert ci.compile(source)["partial_eval"]["removed"] == ['f']
+    assert run(source) == run(source, optimize=False) == "2"
+
+
+def test_programs(monkeypatch):
+    configure(monkeypatch, partial_evaluator=PartialEvaluator())
+    assert_equivalent(PROGRAMS + random_programs(150, seed=5))
+
+
+def test_constant_call_is_folded(monkeypatch):
+    configure(monkeypatch, partial_evaluator=PartialEvaluator())
+    result = ci.compile("(defun fat (n) (if (< n 2) 1 (* n (fat (- n 1))))) (fat 10)")
+    assert list(result["ir"]) == [('copy', 't0', '3628800'), ('return', 't0')]
+    assert result["partial_eval"]["removed"] == ['fat']
@@ -0,0 +1,142 @@
+# test_cache_ply.py
+# cache_ply com uma gramática pequena escrita em um diretório temporário:
+# cache vazio, tabelas reaproveitadas sem escrever nada, tabela corrompida
+# gerada de novo, tabelas de uma versão anterior da gramática removidas e
+# threads pedindo lexer e parser com o cache vazio.
+import importlib.util
+import marshal
+import os
+import sys
+import threading
+
+import cache_ply
+
+GRAMMAR = '''
+tokens = ('NUMBER', 'PLUS', 'TIMES')
+
+t_PLUS = r'\\+'
+t_TIMES = r'\\*'
+t_ignore = ' '
+
+def t_NUMBER(t):
+    r'\\d+'
+    t.value = int(t.value)
+    return t
+
+def t_error(t):
+    t.lexer.skip(1)
+
+precedence = (('left', 'PLUS'), ('left', 'TIMES'))
+
+def p_sum(p):
+    'expr : expr PLUS expr'
+    p[0] = p[1] + p[3]
+
+def p_product(p):
+    'expr : expr TIMES expr'
+    p[0] = p[1] * p[3]
+
+def p_number(p):
+    'expr : NUMBER'
+    p[0] = p[1]
+
+def p_error(p):
+    pass
+'''
+
+
+def load_grammar(folder, monkeypatch, extra=""):
+    path = folder / "gramatica_teste.py"
+    path.write_text(GRAMMAR + extra, encoding='utf-8')
+    spec = importlib.util.spec_from_file_location("gramatica_teste", path)
+    module = importlib.util.module_from_spec(spec)
+    # o PLY procura as regras pelo módulo em sys.modules
+    monkeypatch.setitem(sys.modules, "gramatica_teste", module)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cache_files(module):
+    return sorted(os.listdir(cache_ply.cache_dir(module)))
+
+
+def cache_paths(module):
+    return [os.path.join(cache_ply.cache_dir(module), f) for f in cache_files(module)]
+
+
+def parse(module, text):
+    return cache_ply.cached_parser(module).parse(text, lexer=cache_ply.cached_lexer(module))
+
+
+def test_cold_cache(tmp_path, monkeypatch):
+    module = load_grammar(tmp_path, monkeypatch)
+    assert parse(module, "2 + 3 * 4") == 14
+    key = cache_ply.grammar_key(module)
+    assert cache_files(module) == [key + '_lextab.marshal', key + '_parsetab.marshal']
+
+
+def test_warm_cache(tmp_path, monkeypatch):
+    module = load_grammar(tmp_path, monkeypatch)
+    parse(module, "1")
+    before = {path: os.stat(path).st_mtime_ns for path in cache_paths(module)}
+
+    def save_table(py_path, path):
+        raise AssertionError(f"tabela gerada de novo: {path}")
+    monkeypatch.setattr(cache_ply, '_save_table', save_table)
+    assert parse(module, "6 * 7") == 42
+    assert {path: os.stat(path).st_mtime_ns for path in cache_paths(module)} == before
+
+
+def test_corrupt_cache(tmp_path, monkeypatch):
+    module = load_grammar(tmp_path, monkeypatch)
+    parse(module, "1")
+    for path in cache_paths(module):
+        with open(path, 'wb') as f:
+            f.write(b"lixo")
+    assert parse(module, "2 * 3 + 4") == 10
+    # as tabelas foram escritas de novo e voltam a ser lidas
+    for path in cache_paths(module):
+        with open(path, 'rb') as f:
+            assert isinstance(marshal.load(f), dict)
+    assert len(cache_files(module)) == 2
+
+
+def test_old_versions_are_pruned(tmp_path, monkeypatch):
+    module = load_grammar(tmp_path, monkeypatch)
+    parse(module, "1")
+    first = cache_files(module)
+
+    # outra versão da gramática: outro hash, e as tabelas antigas somem
+    changed = load_grammar(tmp_path, monkeypatch, extra="\n# versão 2\n")
+    assert parse(changed, "6 * 7") == 42
+    files = cache_files(changed)
+    assert not set(first) & set(files)
+    assert len(files) == 2
+    assert all(f.startswith(cache_ply.grammar_key(changed)) for f in files)
+
+
+def test_threads_on_a_cold_cache(tmp_path, monkeypatch):
+    module = load_grammar(tmp_path, monkeypatch)
+    barrier = threading.Barrier(12)
+    results, errors = [], []
+
+    def work():
+        try:
+            barrier.wait()
+            lexer = cache_ply.cached_lexer(module)
+            parser = cache_ply.cached_parser(module)
+            results.append(parser.parse("2 + 3 * 4", lexer=lexer))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert results == [14] * 12
+    # só as duas tabelas finais: nenhum temporário de thread sobrou
+    files = cache_files(module)
+    assert len(files) == 2
+    assert all(f.endswith('.marshal') for f in files)
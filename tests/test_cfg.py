@@ -0,0 +1,99 @@
+# test_cfg.py
+# Cada simplificação de cfg.py sobre trechos pequenos de IR: blocos
+# inalcançáveis, saltos para a instrução seguinte, threading de saltos,
+# desvios constantes ou com destinos iguais e fusão de blocos.
+from cfg import build_cfg, linearize, merge_blocks, remove_unreachable, simplify_cfg, thread_jumps
+
+# if x then t0 = 1 else t0 = 2; o lado verdadeiro passa por um bloco vazio (L1)
+THREAD = [('if', 'v_x', 'L1'), ('copy', 't0', '2'), ('goto', 'L3'),
+          ('label', 'L1'), ('goto', 'L2'),
+          ('label', 'L2'), ('copy', 't0', '1'),
+          ('label', 'L3'), ('return', 't0')]
+
+
+def blocks(cfg):
+    return [(b.label, b.body, b.term) for b in cfg]
+
+
+def test_build_cfg_closes_every_block():
+    cfg = build_cfg(THREAD)
+    assert blocks(cfg) == [
+        ('_B1', [], ('br', 'v_x', 'L1', '_B2')),
+        ('_B2', [('copy', 't0', '2')], ('goto', 'L3')),
+        ('L1', [], ('goto', 'L2')),
+        ('L2', [('copy', 't0', '1')], ('goto', 'L3')),
+        ('L3', [], ('return', 't0')),
+    ]
+    assert cfg.predecessors()['L3'] == ['_B2', 'L2']
+
+
+def test_unreachable_blocks():
+    code = [('copy', 't0', '1'), ('goto', 'L1'),
+            ('copy', 't1', '2'),
+            ('label', 'L1'), ('return', 't0')]
+    cfg = build_cfg(code)
+    assert remove_unreachable(cfg)
+    assert [b.label for b in cfg] == ['_B1', 'L1']
+    assert not remove_unreachable(cfg)
+    assert simplify_cfg(code) == [('copy', 't0', '1'), ('return', 't0')]
+
+
+def test_goto_to_next_instruction():
+    code = [('copy', 't0', '1'), ('goto', 'L1'), ('label', 'L1'), ('return', 't0')]
+    assert linearize(build_cfg(code)) == [('copy', 't0', '1'), ('return', 't0')]
+
+
+def test_jump_threading():
+    cfg = build_cfg(THREAD)
+    assert thread_jumps(cfg)
+    assert cfg.blocks['_B1'].term == ('br', 'v_x', 'L2', '_B2')
+    assert not thread_jumps(cfg)
+    assert simplify_cfg(THREAD) == [
+        ('if', 'v_x', 'L2'), ('copy', 't0', '2'), ('goto', 'L3'),
+        ('label', 'L2'), ('copy', 't0', '1'),
+        ('label', 'L3'), ('return', 't0')]
+
+
+def test_constant_and_redundant_branches():
+    # nil é falso: sobra só o lado falso
+    code = [('if', 'nil', 'L1'), ('copy', 't0', '2'), ('goto', 'L2'),
+            ('label', 'L1'), ('copy', 't0', '1'),
+            ('label', 'L2'), ('return', 't0')]
+    assert simplify_cfg(code) == [('copy', 't0', '2'), ('return', 't0')]
+    taken = [('if', '3', 'L1')] + code[1:]
+    assert simplify_cfg(taken) == [('copy', 't0', '1'), ('return', 't0')]
+    # os dois destinos iguais
+    assert simplify_cfg([('if', 'v_x', 'L1'), ('label', 'L1'), ('return', '1')]) == [('return', '1')]
+
+
+def test_merge_blocks():
+    code = [('copy', 't0', '1'), ('goto', 'L1'),
+            ('label', 'L2'), ('return', 't1'),
+            ('label', 'L1'), ('binop', 't1', '+', 't0', '1'), ('goto', 'L2')]
+    cfg = build_cfg(code)
+    assert merge_blocks(cfg)
+    assert blocks(cfg) == [('_B1', [('copy', 't0', '1'), ('binop', 't1', '+', 't0', '1')],
+                            ('return', 't1'))]
+    assert simplify_cfg(code) == [('copy', 't0', '1'), ('binop', 't1', '+', 't0', '1'),
+                                  ('return', 't1')]
+
+
+def test_merge_keeps_join_points():
+    # L3 tem dois predecessores: não é fundido em nenhum deles
+    cfg = build_cfg(THREAD)
+    thread_jumps(cfg)
+    remove_unreachable(cfg)
+    merge_blocks(cfg)
+    assert 'L3' in cfg.blocks
+    assert sorted(cfg.predecessors()['L3']) == ['L2', '_B2']
+
+
+def test_function_entry_and_cycles():
+    fn = [('label', 'func_f'), ('arg', 'v_x', 0), ('goto', 'L1'),
+          ('label', 'L1'), ('return', 'v_x')]
+    assert simplify_cfg(fn) == [('label', 'func_f'), ('arg', 'v_x', 0), ('return', 'v_x')]
+    # laço de blocos vazios: o threading não pode girar para sempre
+    loop = [('copy', 't0', '1'), ('goto', 'L1'),
+            ('label', 'L1'), ('goto', 'L2'),
+            ('label', 'L2'), ('goto', 'L1')]
+    assert simplify_cfg(loop) == [('copy', 't0', '1'), ('label', 'L1'), ('goto', 'L1')]
@@ -0,0 +1,147 @@
+# test_codigo_intermediario.py
+# compile() de ponta a ponta: o valor de programas na maquina_virtual.
+import io
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+import codigo_intermediario as ci
+import maquina_virtual
+from arvore import as_json, dumps_json
+from ir import is_temp
+from programas import PROGRAMS, run
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("(defun fat (n) (if (< n 2) 1 (* n (fat (- n 1))))) (fat 10)", "3628800"),
+    ("(defun fib (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))) (fib 12)", "144"),
+    ("(defun par (n) (if (= n 0) t (impar (- n 1))))\n"
+     "(defun impar (n) (if (= n 0) nil (par (- n 1))))\n"
+     "(cons (par 10) (impar 10))", "(t)"),
+])
+def test_recursive_calls(source, expected, monkeypatch):
+    monkeypatch.setattr(ci, 'partial_evaluator', None)
+    assert run(source, optimize=False) == expected
+    assert run(source) == expected
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("(defun f (t0) (+ t0 1)) (f 5)", "6"),
+    ("(defun f (t1 x) (+ t1 (* x 2))) (f 5 3)", "11"),
+    ("(defun f (t3 t0) (if (< t3 t0) t3 (- t3 t0))) (f 9 4)", "5"),
+    ("(defun f (NIL) (+ NIL 1)) (f 5)", "6"),
+])
+def test_variables_named_like_temporaries(source, expected, monkeypatch):
+    monkeypatch.setattr(ci, 'partial_evaluator', None)
+    assert run(source, optimize=False) == expected
+    assert run(source) == expected
+
+
+def test_parameters_are_not_temporaries():
+    ir = ci.compile("(defun f (t0 x) (+ t0 x)) (f 1 2)", optimize=False)["ir"]
+    params = [ins[1] for ins in ir if ins[0] == 'arg']
+    assert len(params) == 2
+    assert not any(is_temp(p) for p in params)
+
+
+def test_stream_collects_errors(capsys):
+    out = io.StringIO()
+    compiler = ci.compile_stream(io.StringIO("(defun f (x) (+ x 1))\n(defun g x 1)\n(f 1 @)\n(f 3)\n"),
+                                 out)
+    assert capsys.readouterr().out == ""
+    assert len(compiler.errors) == 2
+    assert compiler.errors[0].startswith("form 2: Erro de sintaxe")
+    assert compiler.errors[1].startswith("form 3: Caractere inválido: '@'")
+    # com erros o programa não ganha o 'return' final
+    assert len(compiler.finish()) == 0
+
+
+def test_stream_matches_compile():
+    source = PROGRAMS[2]
+    out = io.StringIO()
+    compiler = ci.compile_stream(io.StringIO(source), out)
+    assert compiler.errors == []
+    program = maquina_virtual.load_ir([l for l in out.getvalue().splitlines() if l])
+    assert maquina_virtual.format_value(program.run()) == run(source, optimize=False)
+
+
+def test_compile_file_records(tmp_path):
+    path = tmp_path / "prog.lisp"
+    path.write_text("(defun f (x)\n  (* x 2))\n(f 21)", encoding='utf-8')
+    line, ok, lines = ci.compile_file(str(path))
+    record = json.loads(line)
+    assert ok and record["ok"]
+    assert lines == record["lines"] == 3
+
+    line, ok, lines = ci.compile_file(str(tmp_path / "nao_existe.lisp"))
+    missing = json.loads(line)
+    assert not ok and lines == 0
+    assert missing.keys() == record.keys()
+    assert missing["ast"] is None and missing["ir"] is None
+
+
+def test_batch_with_deep_nesting(tmp_path):
+    # mais fundo que o limite de recursão do json.dumps
+    depth = 5000
+    deep = tmp_path / "fundo.lisp"
+    deep.write_text("(+ 1 " * depth + "1" + ")" * depth, encoding='utf-8')
+    small = tmp_path / "raso.lisp"
+    small.write_text("(defun f (x) (* x 2)) (f 21)", encoding='utf-8')
+    out = io.StringIO()
+    files, lines, failed, _ = ci.compile_files([str(deep), str(small)], out, jobs=2)
+    assert (files, lines, failed) == (2, 2, 0)
+    first, second = out.getvalue().splitlines()
+    assert first.startswith('{"file": "%s", "ok": true' % deep)
+    assert first.count('"type": "application"') == depth
+    assert json.loads(second)["ok"]
+
+    # o mesmo texto que json.dumps, onde ele consegue
+    result = ci.compile(PROGRAMS[1])
+    record = {"ast": result["ast"], "x": [1.5, None, True, (), {}, "é"]}
+    assert dumps_json(record) == json.dumps(record, ensure_ascii=False, default=as_json)
+
+
+def test_budget_nodes_stop_the_parse():
+    result = ci.compile("(+ 1 2) " * 1000, budget=ci.Budget(max_nodes=50))
+    assert not result["sem_ok"]
+    # o parse para no primeiro nó a mais, não no fim
+    assert result["budget"] == {"phase": "parse", "limit": "nós da AST", "value": 51, "max": 50}
+    # a avaliação parcial cria nós, que não contam
+    assert ci.compile("(+ 1 2)", budget=ci.Budget(max_nodes=4))["sem_ok"]
+
+
+def test_tracing_shared_by_concurrent_budgets(monkeypatch):
+    assert not tracemalloc.is_tracing()
+    check = ci.Compilation.check_budget
+    lost = []
+
+    def checked(self, phase, ir=None):
+        if not tracemalloc.is_tracing():
+            lost.append(phase)
+        return check(self, phase, ir)
+
+    monkeypatch.setattr(ci.Compilation, 'check_budget', checked)
+    sources = [PROGRAMS[i % len(PROGRAMS)] * (1 + i % 3) for i in range(16)]
+    results = [None] * len(sources)
+
+    def work(i):
+        results[i] = ci.compile(sources[i], budget=ci.Budget(max_bytes=1 << 30))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(len(sources))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert lost == []
+    assert all(r is not None and "budget" not in r for r in results)
+    assert not tracemalloc.is_tracing()
+
+    # ligado por fora: continua ligado
+    tracemalloc.start()
+    try:
+        ci.compile(PROGRAMS[0], budget=ci.Budget(max_bytes=1 << 30))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,88 @@
+# test_incremental.py
+# IncrementalCompiler: depois de cada edição, o IR montado a partir do
+# cache é o mesmo de compile(source, optimize=False) e só os forms afetados
+# são compilados de novo, inclusive com o cache lido do disco.
+import codigo_intermediario as ci
+from otimizacao import PassManager
+from programas import PROGRAMS, configure, random_programs
+from registradores import RegisterAllocator
+
+BASE = """(defun quad (x) (* x x))
+(defun soma (a b) (+ (quad a) (quad b)))
+(defun fat (n) (if (< n 2) 1 (* n (fat (- n 1)))))
+(soma 3 4)
+(fat (soma 1 2))
+"""
+
+# (edição de BASE, forms compilados de novo)
+EDITS = [
+    (BASE, 0),
+    # corpo de uma função: só ela
+    (BASE.replace("(* x x)", "(* x (+ x 0))"), 1),
+    # form novo no fim
+    (BASE + "(quad 9)\n", 1),
+    # aridade de quad muda: ela e quem a chama
+    (BASE.replace("quad (x) (* x x)", "quad (x y) (* x y)")
+         .replace("(quad a)", "(quad a a)").replace("(quad b)", "(quad b b)"), 2),
+    # quad removida: soma, que a chama, fica com erro
+    (BASE.replace("(defun quad (x) (* x x))\n", ""), 1),
+    # erro de sintaxe: nada é analisado
+    (BASE.replace("(fat (soma 1 2))", "(fat (soma 1 2)"), 0),
+    # os mesmos forms em outra ordem
+    ("\n".join(reversed(BASE.strip().splitlines())), 0),
+]
+
+
+def same_result(incremental, full):
+    assert incremental["sem_ok"] == full["sem_ok"]
+    if full["sem_ok"]:
+        assert list(incremental["ir"]) == list(full["ir"])
+    else:
+        assert sorted(incremental["errors"]) == sorted(full["errors"])
+
+
+def test_edits_match_full_build():
+    compiler = ci.IncrementalCompiler()
+    assert compiler.compile(BASE)["stats"]["compiled"] == 5
+    for source, compiled in EDITS:
+        result = compiler.compile(source)
+        same_result(result, ci.compile(source, optimize=False))
+        assert result["stats"]["compiled"] == compiled, source
+        assert result["stats"]["forms"] == len(ci.split_forms(source))
+        # e de volta ao original
+        same_result(compiler.compile(BASE), ci.compile(BASE, optimize=False))
+
+
+def test_programs_match_full_build():
+    compiler = ci.IncrementalCompiler()
+    for source in PROGRAMS + random_programs(60, seed=17):
+        same_result(compiler.compile(source), ci.compile(source, optimize=False))
+
+
+def test_disk_cache(tmp_path):
+    path = str(tmp_path / "cache" / "prog.marshal")
+    first = ci.IncrementalCompiler(path).compile(BASE)
+    assert first["stats"]["compiled"] == 5
+
+    # outro compilador (outro processo) lê o cache do disco
+    compiler = ci.IncrementalCompiler(path)
+    second = compiler.compile(BASE)
+    assert second["stats"]["compiled"] == 0
+    assert list(second["ir"]) == list(first["ir"])
+    edited = BASE.replace("(soma 3 4)", "(soma 5 6)")
+    assert compiler.compile(edited)["stats"]["compiled"] == 1
+    same_result(ci.IncrementalCompiler(path).compile(edited), ci.compile(edited, optimize=False))
+
+    # cache ilegível: compila tudo de novo
+    with open(path, 'wb') as f:
+        f.write(b"lixo")
+    third = ci.IncrementalCompiler(path).compile(BASE)
+    assert third["stats"]["compiled"] == 5
+    assert list(third["ir"]) == list(first["ir"])
+
+
+def test_optimized_build(monkeypatch):
+    configure(monkeypatch, optimizer=PassManager(), allocator=RegisterAllocator())
+    compiler = ci.IncrementalCompiler()
+    for source in [BASE] + [source for source, _ in EDITS]:
+        same_result(compiler.compile(source, optimize=True), ci.compile(source))
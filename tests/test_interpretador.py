@@ -0,0 +1,66 @@
+# test_interpretador.py
+# Interpretador de Parte_1: eval_expr, as closures de compile_expr e o lote
+# de eval_batch dão o mesmo resultado, inclusive com aninhamento profundo
+# (nenhum dos caminhos pode estourar a pilha do Python).
+import random
+
+import pytest
+
+import interpretador as it
+
+DEPTHS = [1, it.CLOSURE_MAX_DEPTH - 1, it.CLOSURE_MAX_DEPTH, it.CLOSURE_MAX_DEPTH + 1, 100_000]
+
+
+def nested(depth, right=False):
+    """(+ (+ ... (+ x 1) ... 1) 1) com depth somas (ou aninhado à direita)."""
+    expr = ('id', 'x')
+    for _ in range(depth):
+        expr = ('binop', '+', ('number', 1), expr) if right else ('binop', '+', expr, ('number', 1))
+    return expr
+
+
+def random_expr(rnd, depth):
+    if depth == 0 or rnd.random() < 0.25:
+        return rnd.choice([('id', 'x'), ('id', 'y'), ('number', rnd.randint(0, 9))])
+    op = rnd.choice(['+', '-', '*', '<', '>=', '=', '!='])
+    return ('binop', op, random_expr(rnd, depth - 1), random_expr(rnd, depth - 1))
+
+
+def test_parse_and_evaluate():
+    expr = it.parse("(+ x (* 2 (- 7 3)))")
+    assert expr == ('binop', '+', ('id', 'x'),
+                    ('binop', '*', ('number', 2), ('binop', '-', ('number', 7), ('number', 3))))
+    assert it.evaluate("(+ x (* 2 (- 7 3)))", {'x': 1}) == 9
+    assert it.evaluate("(exp 2 10)", {}) == 1024
+
+
+@pytest.mark.parametrize("depth", DEPTHS)
+@pytest.mark.parametrize("right", [False, True])
+def test_deep_nesting(depth, right):
+    expr = nested(depth, right)
+    assert it.expr_depth(expr) == depth + 1
+    assert it.eval_expr(expr, {'x': 5}) == depth + 5
+    assert it.compile_expr(expr)({'x': 5}) == depth + 5
+    assert it.eval_compiled(expr, [{'x': 0}, {'x': 2}]) == [depth, depth + 2]
+
+
+def test_closures_match_eval_expr():
+    rnd = random.Random(14)
+    envs = [{'x': x, 'y': y} for x in range(-2, 3) for y in range(-2, 3)]
+    for _ in range(300):
+        expr = random_expr(rnd, 6)
+        assert it.eval_compiled(expr, envs) == [it.eval_expr(expr, e) for e in envs], expr
+
+
+def test_eval_batch_matches_eval_expr():
+    np = pytest.importorskip("numpy")
+    rnd = random.Random(9)
+    xs, ys = np.arange(-3, 4), np.arange(4, -3, -1)
+    envs = [{'x': int(x), 'y': int(y)} for x, y in zip(xs, ys)]
+    for _ in range(200):
+        expr = random_expr(rnd, 5)
+        expected = [it.eval_expr(expr, e) for e in envs]
+        assert it.eval_batch(expr, {'x': xs, 'y': ys}).tolist() == expected, expr
+
+    deep = nested(100_000)
+    assert it.eval_batch(deep, {'x': xs}).tolist() == [x + 100_000 for x in range(-3, 4)]
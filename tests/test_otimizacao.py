@@ -0,0 +1,40 @@
+# test_otimizacao.py
+# O IR otimizado calcula o mesmo que o IR sem otimização na maquina_virtual,
+# com o pipeline padrão, com cada passe sozinho e com o compilador inteiro.
+import pytest
+
+import codigo_intermediario as ci
+from otimizacao import PASSES, PassManager
+from programas import PROGRAMS, assert_equivalent, configure, random_programs
+
+RANDOM = random_programs(150, seed=3)
+
+
+def test_default_pipeline(monkeypatch):
+    configure(monkeypatch, optimizer=PassManager())
+    assert_equivalent(PROGRAMS + RANDOM)
+
+
+@pytest.mark.parametrize("name", sorted(PASSES))
+def test_each_pass_alone(name, monkeypatch):
+    configure(monkeypatch, optimizer=PassManager([name]))
+    assert_equivalent(PROGRAMS + RANDOM[:60])
+
+
+def test_whole_compiler():
+    # avaliação parcial, regras de reescrita, otimização e alocação
+    assert_equivalent(PROGRAMS + RANDOM)
+
+
+def test_constant_expression_folds(monkeypatch):
+    configure(monkeypatch, optimizer=PassManager())
+    source = "(+ (* 2 3) (- 10 4))"
+    plain = ci.compile(source, optimize=False)["ir"]
+    optimized = ci.compile(source)["ir"]
+    assert len(optimized) < len(plain)
+    assert list(optimized)[-1] == ('return', '12')
+
+
+def test_unknown_pass_is_rejected():
+    with pytest.raises(ValueError):
+        PassManager(['constant_folding', 'nao_existe'])
@@ -0,0 +1,82 @@
+# test_perfil.py
+# CompileStats: as fases de compile(profile=True) na ordem em que rodam,
+# com os contadores de cada uma, a memória com memory=True e o relatório
+# de --profile na linha de comando (e no JSON de --batch).
+import json
+import os
+import subprocess
+import sys
+
+import codigo_intermediario as ci
+from programas import PROGRAMS, configure
+
+SOURCE = PROGRAMS[1]
+SCRIPT = os.path.join(os.path.dirname(ci.__file__), "codigo_intermediario.py")
+
+
+def phases(result):
+    return {ph["phase"]: ph for ph in result["profile"].as_dict()["phases"]}
+
+
+def test_phases_and_counts(monkeypatch):
+    configure(monkeypatch)
+    result = ci.compile(SOURCE, profile=True)
+    stats = phases(result)
+    assert list(stats) == ["lex", "parse", "semantic+codegen", "emit"]
+    assert stats["lex"]["chars"] == len(SOURCE)
+    assert stats["lex"]["tokens"] == len(ci.make_scanner().tokenize(SOURCE))
+    assert stats["parse"]["forms"] == len(result["ast"]) == 2
+    assert stats["parse"]["nodes"] == ci.count_nodes(result["ast"])
+    codegen = stats["semantic+codegen"]
+    assert (codegen["functions"], codegen["errors"]) == (1, 0)
+    # a geração ainda não tem o return final
+    assert codegen["ir_instrs"] == len(result["ir"]) - 1
+    assert all(ph["seconds"] >= 0 for ph in stats.values())
+    assert result["profile"].total() == sum(ph["seconds"] for ph in stats.values())
+    # sem profile, nada é medido
+    assert "profile" not in ci.compile(SOURCE)
+
+
+def test_optimizing_pipeline():
+    stats = phases(ci.compile(SOURCE, profile=True))
+    assert list(stats) == ["lex", "parse", "semantic+codegen", "partial_eval", "rewrite",
+                           "codegen", "optimize", "regalloc", "emit"]
+    # fib 12 é calculada na compilação: o programa vira uma cópia
+    assert stats["partial_eval"]["calls_folded"] == 1
+    assert stats["codegen"]["ir_instrs"] == 1
+    assert [p["pass"] for p in stats["optimize"]["passes"]] == ci.optimizer.pipeline
+
+
+def test_memory():
+    stats = phases(ci.compile(SOURCE, memory=True))
+    for ph in stats.values():
+        assert ph["mem_peak"] >= 0
+        assert len(ph["mem_top"]) <= ci.CompileStats.TOP_SITES
+    assert any(ph["mem_top"] for ph in stats.values())
+
+
+def test_report():
+    profile = ci.compile(SOURCE, profile=True)["profile"]
+    lines = profile.report()
+    names = [l.split()[0] for l in lines if not l.startswith(" ")]
+    assert names == [ph["phase"] for ph in profile.as_dict()["phases"]] + ["total"]
+
+
+def test_command_line(tmp_path):
+    path = tmp_path / "fib.lisp"
+    path.write_text(SOURCE, encoding='utf-8')
+    run = subprocess.run([sys.executable, SCRIPT, "--profile", str(path)],
+                         capture_output=True, text=True, check=True)
+    assert run.stdout.split() == ["return", "144"]
+    report = run.stderr[run.stderr.index(f"=== FASES: {path} ==="):].splitlines()[1:]
+    assert [l.split()[0] for l in report if not l.startswith(" ")] == \
+        ["lex", "parse", "semantic+codegen", "partial_eval", "rewrite", "codegen",
+         "optimize", "regalloc", "emit", "total"]
+
+    out = tmp_path / "ir.jsonl"
+    subprocess.run([sys.executable, SCRIPT, "--batch", "--profile", "-j", "1", "-o", str(out),
+                    str(path)], capture_output=True, check=True)
+    record = json.loads(out.read_text(encoding='utf-8'))
+    assert [ph["phase"] for ph in record["profile"]["phases"]][:3] == \
+        ["lex", "parse", "semantic+codegen"]
+    assert record["profile"]["seconds"] > 0
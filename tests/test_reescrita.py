@@ -0,0 +1,80 @@
+# test_reescrita.py
+# As regras de reescrita não mudam o valor dos programas, inclusive com
+# comparações, eq, t e nil como operandos aritméticos, e disparam onde os
+# operandos são comprovadamente números.
+import pytest
+
+import codigo_intermediario as ci
+from avaliacao_parcial import PartialEvaluator
+from programas import PROGRAMS, assert_equivalent, configure, random_programs, run
+from reescrita import RULES, RewriteEngine, Rule
+
+RANDOM = random_programs(200, seed=25)
+
+# operandos que não são números: nenhuma regra aritmética pode disparar
+NOT_NUMBERS = [
+    "(defun f (a b) (* (< a b) 1)) (f 1 2)",
+    "(defun f (a b) (+ 0 (eq a b))) (f 1 1)",
+    "(defun f (a) (- a 0)) (f t)",
+    "(defun f (a) (* a 1)) (f nil)",
+    "(defun f (a) (exp a 1)) (f t)",
+    "(defun f (a) (exp a 2)) (f t)",
+    "(defun f (a) (exp a 0)) (f nil)",
+    "(defun f (a b) (* (>= a b) 0)) (f 2 1)",
+    "(defun f (a) (+ (car (cons t a)) 0)) (f 1)",
+    "(+ t 0)",
+]
+
+
+@pytest.mark.parametrize("source", NOT_NUMBERS)
+def test_non_numeric_operands(source, monkeypatch):
+    configure(monkeypatch, rewriter=RewriteEngine())
+    assert run(source) == run(source, optimize=False)
+    fired = ci.compile(source)["rewrites"]
+    assert not any(n for name, n in fired.items() if name not in ('car_cons', 'cdr_cons'))
+
+
+def test_programs(monkeypatch):
+    configure(monkeypatch, rewriter=RewriteEngine())
+    assert_equivalent(PROGRAMS + NOT_NUMBERS + RANDOM)
+
+
+def test_with_partial_evaluation(monkeypatch):
+    configure(monkeypatch, partial_evaluator=PartialEvaluator(), rewriter=RewriteEngine())
+    assert_equivalent(PROGRAMS + NOT_NUMBERS + RANDOM)
+
+
+@pytest.mark.parametrize("source, expected, rules", [
+    ("(defun f (x) (+ (* x 1) (exp x 2))) (f 3)", "12", {'mul_um': 1, 'exp_dois': 1}),
+    ("(defun f (x) (- (exp x 3) 0)) (f 2)", "8", {'sub_zero': 1, 'exp_tres': 1}),
+    ("(defun f (x) (car (cons (+ 0 x) (* x 0)))) (f 5)", "5",
+     {'car_cons': 1, 'soma_zero': 1}),
+])
+def test_rules_fire_on_numbers(source, expected, rules, monkeypatch):
+    configure(monkeypatch, rewriter=RewriteEngine())
+    fired = ci.compile(source)["rewrites"]
+    for name, n in rules.items():
+        assert fired[name] == n, name
+    assert run(source) == expected == run(source, optimize=False)
+
+
+def test_reals_keep_integer_rules_off(monkeypatch):
+    # com / no programa, x pode ser real: (+ x 0) e (* x 0) ficam
+    configure(monkeypatch, rewriter=RewriteEngine())
+    source = "(defun f (x) (cons (+ x 0) (* x 0))) (f (/ 0 (- 0 5)))"
+    fired = ci.compile(source)["rewrites"]
+    assert fired['soma_zero'] == fired['mul_zero'] == 0
+    assert run(source) == run(source, optimize=False)
+
+
+def test_rule_declarations(monkeypatch):
+    assert len(RewriteEngine().rules) == len(RULES)
+    with pytest.raises(ValueError):
+        Rule("ruim", "(foo ?x)", "?x")
+    with pytest.raises(ValueError):
+        Rule("ruim", "(+ ?x 0)", "?x", "positivo ?x")
+
+    configure(monkeypatch, rewriter=RewriteEngine([("dobro", "(+ ?x ?x)", "(* 2 ?x)", "numero ?x")]))
+    source = "(defun f (x) (+ (- x 1) (- x 1))) (f 4)"
+    assert ci.compile(source)["rewrites"] == {'dobro': 1}
+    assert run(source) == "6"
@@ -0,0 +1,48 @@
+# test_registradores.py
+# Depois da alocação de registradores (com ou sem derramamento) o programa
+# vale o mesmo na maquina_virtual, e nenhuma região usa mais registradores
+# do que o pedido ou do que o máximo de temporários vivos.
+import re
+
+import pytest
+
+import codigo_intermediario as ci
+from otimizacao import PassManager
+from programas import PROGRAMS, assert_equivalent, configure, random_programs, run
+from registradores import RegisterAllocator
+
+RANDOM = random_programs(100, seed=4)
+
+
+@pytest.mark.parametrize("num_registers", [None, 1, 2, 4])
+def test_allocation_keeps_values(num_registers, monkeypatch):
+    configure(monkeypatch, allocator=RegisterAllocator(num_registers))
+    assert_equivalent(PROGRAMS + RANDOM)
+
+
+def test_allocation_after_optimization(monkeypatch):
+    configure(monkeypatch, optimizer=PassManager(), allocator=RegisterAllocator(3))
+    assert_equivalent(PROGRAMS + RANDOM)
+
+
+def registers(ir):
+    names = set()
+    for ins in ir:
+        for a in ins[1:]:
+            names.update(a if isinstance(a, tuple) else [a])
+    return {a for a in names if isinstance(a, str) and re.fullmatch(r"t\d+", a)}
+
+
+def test_spills_past_the_register_limit(monkeypatch):
+    # três produtos vivos ao mesmo tempo
+    source = "(defun f (a b c) (+ (* a b) (+ (* b c) (* a c)))) (f 2 3 4)"
+    configure(monkeypatch, allocator=RegisterAllocator(2))
+    result = ci.compile(source)
+    assert registers(result["ir"]) <= {'t0', 't1'}
+    assert result["regalloc"][0]["spilled"] > 0
+    assert run(source) == "26"
+
+    configure(monkeypatch, allocator=RegisterAllocator())
+    for st in ci.compile(source)["regalloc"]:
+        assert st["spilled"] == 0
+        assert st["registers"] <= st["max_live"]
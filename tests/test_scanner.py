@@ -0,0 +1,47 @@
+# test_scanner.py
+# O scanner de comum/ e o lexer do PLY de cada gramática (interpretador,
+# sintatica e codigo_intermediario) dão os mesmos tokens para o mesmo
+# texto: o REPL usa o lexer e o resto usa o scanner.
+import pytest
+
+import codigo_intermediario as ci
+import interpretador
+import sintatica
+from programas import PROGRAMS, random_programs
+
+# operadores alfabéticos e identificadores que começam como eles
+WORDS = [
+    "(div 7 2)", "(mod 7 3)", "(exp 2 10)",
+    "(+ x (div (mod 17 5) (exp 2 2)))",
+    "(divide 1) (modulo x) (expo 2) (divmod 1 2) (xdiv 3) (_div 4)",
+    "(<= 1 2) (>= 2 1) (!= 1 2) (< 1 2) (> 2 1) (= 1 1) (/ 6 3) (* 2 3) (- 3 1)",
+    "(defun f (x y)\n  (if (< x y) x y))\n(f 1 2)",
+    "(cons 1 nil) (car (cons 1 2)) (cdr x) (eq t nil) (cond 1)",
+]
+CORPUS = WORDS + PROGRAMS + random_programs(40, seed=11)
+
+
+def ply_tokens(lexer, source):
+    lexer.input(source)
+    return [(tok.type, tok.value, tok.lexpos) for tok in iter(lexer.token, None)]
+
+
+def scanner_tokens(scanner, source):
+    return [(kind, value, pos) for kind, value, _, pos in scanner.tokenize(source)]
+
+
+@pytest.mark.parametrize("lexer, scanner", [
+    (interpretador.lexer, interpretador.scanner),
+    (sintatica.lexer, sintatica.scanner),
+    (ci.make_parser()[0], ci.make_scanner()),
+], ids=["interpretador", "sintatica", "codigo_intermediario"])
+def test_same_tokens(lexer, scanner):
+    for source in CORPUS:
+        assert ply_tokens(lexer, source) == scanner_tokens(scanner, source), source
+
+
+def test_reserved_operators_parse():
+    assert interpretador.parse("(div 7 (mod 5 3))") == \
+        ('binop', 'div', ('number', 7), ('binop', 'mod', ('number', 5), ('number', 3)))
+    assert sintatica.parser.parse("(exp 2 10)", lexer=sintatica.lexer) == \
+        ("program", [("binop", "exp", ("number", 2), ("number", 10))])
@@ -0,0 +1,120 @@
+# test_serializacao.py
+# Ida e volta pelo formato binário: a AST volta com os mesmos nós (e os
+# mesmos bytes ao gravar de novo), o IR com as mesmas instruções e o mesmo
+# valor na maquina_virtual, lendo de bytes, de arquivo e por mmap.
+import gc
+import json
+import math
+
+import pytest
+
+import codigo_intermediario as ci
+import maquina_virtual
+import serializacao
+from arvore import NodeTable, as_json
+from avaliacao_parcial import PartialEvaluator
+from programas import PROGRAMS, random_programs
+
+SOURCES = PROGRAMS + random_programs(60, seed=18)
+
+
+def as_text(ast):
+    # o mesmo JSON da saída do compilador
+    return json.dumps(ast, default=as_json)
+
+
+def value(ir):
+    try:
+        return maquina_virtual.format_value(maquina_virtual.load_ir(ir).run())
+    except Exception as e:
+        return ('erro', type(e).__name__)
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_round_trip(optimize):
+    for source in SOURCES:
+        result = ci.compile(source, optimize=optimize)
+        data = serializacao.dumps_ast(result["ast"])
+        ast = serializacao.loads(data)
+        assert as_text(ast) == as_text(result["ast"])
+        assert serializacao.dumps_ast(ast) == data
+
+        data = serializacao.dumps_ir(result["ir"])
+        ir = serializacao.loads(data)
+        assert list(ir) == list(result["ir"])
+        assert serializacao.dumps_ir(ir) == data
+        assert value(ir) == value(result["ir"])
+
+
+def test_shared_subtrees_and_large_numbers():
+    nodes = NodeTable()
+    plus = nodes.symbol('PLUS', '+')
+    x = nodes.symbol('ID', 'x')
+    big = nodes.number(-(10 ** 40))
+    shared = nodes.application(plus, (x, big))
+    ast = [nodes.application(plus, (shared, shared)), nodes.nil()]
+    loaded = serializacao.loads(serializacao.dumps_ast(ast))
+    assert as_text(loaded) == as_text(ast)
+    # a subárvore repetida volta compartilhada
+    assert loaded[0].args[0] is loaded[0].args[1]
+
+
+def test_reals():
+    nodes = NodeTable()
+    plus = nodes.symbol('PLUS', '+')
+    values = [2, 2.0, 0.0, -0.0, 0.1, -1e300, 1e-320, math.inf, -math.inf, math.nan]
+    ast = [nodes.application(plus, (nodes.number(v), nodes.number(v))) for v in values]
+    loaded = serializacao.loads(serializacao.dumps_ast(ast))
+    for node, value in zip(loaded, values):
+        got = node.args[0].value
+        assert type(got) is type(value)
+        assert repr(got) == repr(value)
+        assert node.args[0] is node.args[1]
+    # 2 e 2.0, 0.0 e -0.0 continuam nós diferentes
+    assert len({id(node.args[0]) for node in loaded}) == len(values)
+    # os reais vêm da avaliação parcial
+    ast = ci.compile("(defun f (x) (/ x 4)) (cons (f 1) (f 0)) (/ 0 (- 0 4))",
+                     optimize=False)["ast"]
+    forms = PartialEvaluator().run(ast, ci.SymbolTable(ast).functions, NodeTable())
+    data = serializacao.dumps_ast(forms)
+    loaded = serializacao.loads(data)
+    assert as_text(loaded) == as_text(forms)
+    assert repr(loaded[1].value) == '-0.0'
+    assert serializacao.dumps_ast(loaded) == data
+
+
+def test_gc_is_left_alone():
+    data = serializacao.dumps_ast(ci.compile(PROGRAMS[1])["ast"])
+    assert gc.isenabled()
+    serializacao.loads(data)
+    assert gc.isenabled()
+    gc.disable()
+    try:
+        serializacao.loads(data)
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_files(tmp_path, use_mmap):
+    result = ci.compile(PROGRAMS[1])
+    ast_path, ir_path = tmp_path / "prog.ast", tmp_path / "prog.ir"
+    with open(ast_path, 'wb') as f:
+        serializacao.dump_ast(result["ast"], f)
+    with open(ir_path, 'wb') as f:
+        serializacao.dump_ir(result["ir"], f)
+    assert as_text(serializacao.load_path(str(ast_path), use_mmap)) == as_text(result["ast"])
+    ir = serializacao.load_path(str(ir_path), use_mmap)
+    assert list(ir) == list(result["ir"])
+    assert value(ir) == "144"
+    with open(ir_path, 'rb') as f:
+        assert list(serializacao.load(f)) == list(result["ir"])
+
+
+def test_malformed_data():
+    data = serializacao.dumps_ir(ci.compile(PROGRAMS[0])["ir"])
+    for bad in [b"", b"XXXX\x01I\x00", data[:4] + b"\x09" + data[5:], data[:-3],
+                data[:5] + b"Z" + data[6:]]:
+        with pytest.raises(serializacao.SerialError):
+            serializacao.loads(bad)
@@ -0,0 +1,48 @@
+# test_sintatica.py
+# As listas da gramática de sintatica.py (forms do programa, argumentos de
+# chamada e parâmetros de defun) com 10^4 itens: a AST sai inteira e na
+# ordem, pelo lexer do PLY e pelo scanner.
+import pytest
+
+import sintatica
+
+N = 10 ** 4
+
+
+def parse(source, lexer):
+    return sintatica.parser.parse(source, lexer=lexer)
+
+
+@pytest.fixture(params=["lexer", "scanner"])
+def lexer(request):
+    return getattr(sintatica, request.param)
+
+
+def test_call_arguments(lexer):
+    source = "(f " + " ".join(str(i) for i in range(N)) + ")"
+    assert parse(source, lexer) == \
+        ("program", [("call", "f", [("number", i) for i in range(N)])])
+
+
+def test_defun_parameters(lexer):
+    params = [f"x{i}" for i in range(N)]
+    source = f"(defun f ({' '.join(params)}) (g {' '.join(params)}))"
+    assert parse(source, lexer) == ("program", [
+        ("defun", "f", params, ("call", "g", [("id", p) for p in params]))])
+
+
+def test_top_level_forms(lexer):
+    source = "\n".join(f"(+ {i} x)" for i in range(N))
+    assert parse(source, lexer) == \
+        ("program", [("binop", "+", ("number", i), ("id", "x")) for i in range(N)])
+
+
+def test_long_bodies(lexer):
+    # corpo de defun e ramos de if com chamadas de 10^4 argumentos
+    args = " ".join(f"(* {i} y)" for i in range(N))
+    source = f"(defun f (y) (if (< y 0) (g {args}) (h {args}))) (f 1)"
+    body = [("binop", "*", ("number", i), ("id", "y")) for i in range(N)]
+    assert parse(source, lexer) == ("program", [
+        ("defun", "f", ["y"], ("if", ("binop", "<", ("id", "y"), ("number", 0)),
+                               ("call", "g", body), ("call", "h", body))),
+        ("call", "f", [("number", 1)])])
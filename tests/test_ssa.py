@@ -0,0 +1,31 @@
+# test_ssa.py
+# A numeração global de valores (ssa.gvn) não muda o valor dos programas e
+# reaproveita expressões repetidas, inclusive entre blocos dominados.
+import pytest
+
+import codigo_intermediario as ci
+from otimizacao import PassManager
+from programas import PROGRAMS, assert_equivalent, configure, random_programs, run
+
+
+@pytest.mark.parametrize("pipeline", [['gvn'], ['gvn', 'dead_temp_elimination'],
+                                      ['simplify_cfg', 'gvn', 'copy_propagation']])
+def test_gvn_keeps_values(pipeline, monkeypatch):
+    configure(monkeypatch, optimizer=PassManager(pipeline))
+    assert_equivalent(PROGRAMS + random_programs(150, seed=6))
+
+
+def binops(source, op):
+    return [ins for ins in ci.compile(source)["ir"] if ins[0] == 'binop' and ins[2] == op]
+
+
+@pytest.mark.parametrize("source, op, expected", [
+    ("(defun f (x) (* (+ x 1) (+ x 1))) (f 4)", '+', "25"),
+    ("(defun f (x y) (- (* x y) (* y x))) (f 3 5)", '*', "0"),
+    # (+ x 1) da condição domina os dois ramos
+    ("(defun f (x) (if (< (+ x 1) 3) (+ x 1) (- (+ x 1) 1))) (cons (f 1) (f 5))", '+', "(2 . 5)"),
+])
+def test_redundant_expression_is_computed_once(source, op, expected, monkeypatch):
+    configure(monkeypatch, optimizer=PassManager(['gvn', 'dead_temp_elimination']))
+    assert len(binops(source, op)) == 1
+    assert run(source) == expected